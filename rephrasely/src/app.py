@@ -1,193 +1,856 @@
-import os
-from flask import Flask, request, json, render_template_string, jsonify
-from threading import Thread
-import requests
+import hmac
+import logging
+import threading
+import time
+from functools import partial
+from typing import Mapping
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from flask import Blueprint, Flask, request, json, render_template_string, jsonify
 
-from rephrasely.src.grok_llm_rephrasely import rephrasely_method
-from rephrasely.src.os_env import get_user_environment_variable
-from rephrasely.src.set_env_os import set_env_variables
+from rephrasely.src.cancellation import CancelRegistry, CancelToken, JobCancelled
+from rephrasely.src.channel_context import ChannelContextCache, LazyContext
+from rephrasely.src.input_tiering import TIER_SKIP, TIER_SMALL, classify, output_budget
+from rephrasely.src.job_executor import JobExecutor, QueueFullError
+from rephrasely.src.job_queue import DurableJobQueue
+from rephrasely.src.long_text import rephrase_chunked, split_for_blocks
+from rephrasely.src.llm_router import LLMRouter, OllamaProvider, providers_from_spec
+from rephrasely.src.metrics import (
+    ABORTED_LLM_CALLS, CACHE_BYTES, CACHE_ENTRIES, CACHE_EVICTIONS, CACHE_LOOKUPS, CANCELLED_JOBS,
+    CANCELLED_SECONDS, COMMAND_ACK_SECONDS, CONTENT_TYPE, JOBS_IN_FLIGHT,
+    OLLAMA_MODEL_LOAD_SECONDS, OLLAMA_MODEL_LOADS, OLLAMA_MODEL_READY, OLLAMA_REQUESTS,
+    OUTBOX_MESSAGES, QUEUE_DEPTH, REGISTRY, REPHRASE_SECONDS, UNAUTHORIZED_LOOKUPS,
+)
+from rephrasely.src.ollama_lifecycle import READY as OLLAMA_READY, OllamaModelManager
+from rephrasely.src.ollama_scheduler import OllamaScheduler
+from rephrasely.src.modal_updates import CoalescingUpdater
+from rephrasely.src.outbox import Outbox, OutboxFullError, OutboxMessage, outcome_unknown
+from rephrasely.src.rephrase_cache import RephraseCache
+from rephrasely.src.settings import Settings, settings
+from rephrasely.src.slack_client import SlackClient
+from rephrasely.src.token_store import TokenStore
+from rephrasely.src.tracing import configure as configure_tracing, tracer
+from rephrasely.src.translation_memory import TranslationMemory
 
-app = Flask(__name__)
+logger = logging.getLogger(__name__)
 
-SLACK_API_BASE = "https://slack.com/api"
-SLACK_VIEWS_OPEN = f"{SLACK_API_BASE}/views.open"
-SLACK_VIEWS_UPDATE = f"{SLACK_API_BASE}/views.update"
-SLACK_CHAT_POST = f"{SLACK_API_BASE}/chat.postMessage"
+# Routes; create_app() mounts them on a Flask app
+bp = Blueprint("rephrasely", __name__)
 
+# One pooled, rate-limit-aware client for every Slack Web API call (no I/O until used)
+slack = SlackClient()
 
-CLIENT_ID = get_user_environment_variable("SLACK_CLIENT_ID") or ""
-CLIENT_SECRET = get_user_environment_variable("SLACK_CLIENT_SECRET") or ""
-REDIRECT_URI = ( get_user_environment_variable("SLACK_REDIRECT_URI") or
-                "https://rephrasely.com.ar/slack/oauth/callback")
+# trigger_ids expire 3s after the slash command; don't retry past that
+VIEWS_OPEN_DEADLINE = 2.5
+# How long a finished job waits for views.open to hand over the view_id
+VIEW_WAIT_TIMEOUT = 30
 
-if not CLIENT_ID or not CLIENT_SECRET:
-    raise ValueError("SLACK_CLIENT_ID and SLACK_CLIENT_SECRET must be set in environment variables.")
+# plain_text_input initial_value is limited to 3000 characters per block
+MAX_INPUT_CHARS = 3000
+# Separator between input blocks, encoded in the block_id suffix
+BLOCK_SEPARATORS = {"p": "\n\n", "n": "\n", "s": " "}
 
-def _auth_headers():
-    token = get_user_environment_variable("SLACK_USER_TOKEN")
+# conversations.history is Tier 3: skip context rather than wait for the rate limit
+# or a slow response (also used as the HTTP timeout)
+CONTEXT_FETCH_DEADLINE = 1.5
+
+# Section text blocks are limited to 3000 characters
+PARTIAL_TEXT_LIMIT = 2900
+# Seconds a best-effort views.update (streamed partials) may take; a late
+# partial is worthless and the final update waits for it
+PARTIAL_UPDATE_TIMEOUT = 3
+
+WORKING_TEXT = ":hourglass_flowing_sand: Working on your suggestion…"
+BUSY_TEXT = (
+    ":no_entry: Rephrasely is busy right now. "
+    "Please close this and try again in a moment."
+)
+
+OUTBOX_FULL_TEXT = "Rephrasely is busy sending messages. Please try again in a moment."
+OAUTH_DISABLED_TEXT = "Slack OAuth is not configured (SLACK_CLIENT_ID / SLACK_CLIENT_SECRET)."
+NOT_AUTHORIZED_TEXT = (
+    ":key: Rephrasely sends messages as you, so it needs your permission first. "
+    "<{url}|Authorize Rephrasely>, then run the command again."
+)
+
+
+class Services:
+    """
+    Everything the pipeline builds from the settings: pools, queues, LLM
+    routers, caches and stores. One per process, see `services()`.
+
+    Args:
+        config: Startup snapshot for sizing pools and caches; values read per
+            request (secrets, tokens, redirect URI) go through settings() and hot-reload.
+    """
+
+    def __init__(self, config: Settings):
+        self.config = config
+        if not _oauth_configured(config):
+            logger.warning("SLACK_CLIENT_ID and SLACK_CLIENT_SECRET are not set; Slack OAuth is disabled.")
+
+        # Per-request span timelines at /debug/traces (needs REPHRASELY_DEBUG_TOKEN);
+        # payloads (redacted) only for a sample
+        configure_tracing(
+            enabled=config.get_bool("REPHRASELY_TRACING", True),
+            capacity=config.get_int("REPHRASELY_TRACE_BUFFER", 200),
+            payload_sample_rate=config.get_float("REPHRASELY_TRACE_PAYLOAD_SAMPLE", 0.0),
+        )
+
+        # User tokens per (team_id, user_id); users without one are sent to the
+        # OAuth install link, never given someone else's token
+        self.tokens = TokenStore(db_path=config.get("REPHRASELY_TOKEN_DB", "~/.rephrasely/tokens.db"))
+
+        # Background rephrase jobs: bounded pool + bounded fair-share queue
+        queue_size = config.get_int("REPHRASELY_QUEUE_SIZE", 32)
+        self.executor = JobExecutor(workers=config.get_int("REPHRASELY_WORKERS", 4), max_queue=queue_size)
+        # view_id -> in-flight job, so closing the modal cancels its work
+        self.inflight = CancelRegistry(self.executor)
+
+        # Optional durable queue: jobs are run by separate worker processes
+        # (python -m rephrasely.src.worker) instead of this process's thread pool
+        self.job_queue = None
+        job_db = config.get("REPHRASELY_JOB_DB", "")
+        if job_db:
+            self.job_queue = DurableJobQueue(
+                job_db,
+                visibility_timeout=config.get_float("REPHRASELY_JOB_VISIBILITY", 120),
+                max_attempts=config.get_int("REPHRASELY_JOB_ATTEMPTS", 3),
+                max_queued=queue_size,
+            )
+
+        # LLM backends, in preference order, e.g. "grok:grok-3-latest,ollama"
+        self.llm_providers = config.get("REPHRASELY_PROVIDERS", "grok")
+        hedge_after = config.get_float("REPHRASELY_HEDGE_AFTER", 0)
+        llm_timeout = config.get_float("REPHRASELY_LLM_TIMEOUT", 60)
+        providers = providers_from_spec(self.llm_providers)
+        self.router = LLMRouter(providers, hedge_after=hedge_after or None, attempt_timeout=llm_timeout)
+
+        # Input tiering: allow-listed replies ("Thanks!") skip the LLM, short inputs go
+        # to the small/fast providers (REPHRASELY_SMALL_PROVIDERS, e.g. "ollama"), the
+        # rest to the main ones. Every call gets max_tokens derived from the input length.
+        # REPHRASELY_SKIP_MAX_WORDS > 0 also skips clean-looking English, which is
+        # never checked for grammar or spelling, so it is off by default.
+        self.tiering = config.get_bool("REPHRASELY_TIERING", True)
+        self.skip_max_words = config.get_int("REPHRASELY_SKIP_MAX_WORDS", 0)
+        self.small_max_words = config.get_int("REPHRASELY_SMALL_MAX_WORDS", 30)
+        small_providers = providers_from_spec(config.get("REPHRASELY_SMALL_PROVIDERS", ""))
+        self.small_router = self.router
+        if small_providers:
+            self.small_router = LLMRouter(
+                small_providers, hedge_after=hedge_after or None, attempt_timeout=llm_timeout
+            )
+
+        # Keep local Ollama models warm so the router never waits on a cold load, and
+        # admit requests in order, no more at once than the server's OLLAMA_NUM_PARALLEL
+        ollama_providers = [p for p in providers + small_providers if isinstance(p, OllamaProvider)]
+        self.ollama_manager = None
+        self.ollama_scheduler = None
+        if ollama_providers:
+            self.ollama_manager = OllamaModelManager(
+                list(dict.fromkeys(p.model for p in ollama_providers)),
+                base_url=config.get("OLLAMA_BASE_URL", "http://localhost:11434"),
+                keep_alive=config.get("OLLAMA_KEEP_ALIVE", "30m"),
+                probe_interval=config.get_float("OLLAMA_PROBE_INTERVAL", 60),
+            )
+            self.ollama_scheduler = OllamaScheduler(
+                parallelism=config.get_int("OLLAMA_NUM_PARALLEL", 1),
+            )
+            for p in ollama_providers:
+                p.lifecycle = self.ollama_manager
+                p.scheduler = self.ollama_scheduler
+            self.ollama_manager.start()
+
+        # Rephrase results cache (temperature=0 -> same input, same output)
+        self.cache = RephraseCache(
+            max_bytes=config.get_int("REPHRASELY_CACHE_MB", 8) * 1024 * 1024,
+            ttl=config.get_float("REPHRASELY_CACHE_TTL", 7 * 24 * 3600),
+            db_path=config.get("REPHRASELY_CACHE_DB"),
+        )
+
+        # Sentence-level translation memory: only unseen sentences go to the LLM
+        self.translation_memory = None
+        if config.get_bool("REPHRASELY_TM", True):
+            self.translation_memory = TranslationMemory(
+                max_entries=config.get_int("REPHRASELY_TM_ENTRIES", 20000),
+            )
+
+        # Long messages are split into chunks rephrased in parallel
+        self.long_text_chars = config.get_int("REPHRASELY_LONG_TEXT_CHARS", 2000)
+        self.chunk_chars = config.get_int("REPHRASELY_CHUNK_CHARS", 1500)
+        self.chunk_parallel = config.get_int("REPHRASELY_CHUNK_PARALLEL", 4)
+        self.chunk_overlap = config.get_int("REPHRASELY_CHUNK_OVERLAP", 200)
+
+        # Opt-in: short texts get several tone variants (e.g. "formal,neutral,casual")
+        # from a single LLM call. Variants are not streamed and skip the
+        # translation memory, so they are off by default.
+        self.variant_tones = config.get_list("REPHRASELY_VARIANTS", "")
+        self.variants_max_chars = config.get_int("REPHRASELY_VARIANTS_MAX_CHARS", 600)
+
+        # Recent channel messages are given to the LLM as context (token budget, 0 disables)
+        self.context_tokens = config.get_int("REPHRASELY_CONTEXT_TOKENS", 300)
+        # Per-channel ring of recent messages, refreshed with small incremental fetches
+        self.context_cache = ChannelContextCache(
+            partial(
+                get_latest_messages, deadline=CONTEXT_FETCH_DEADLINE, timeout=CONTEXT_FETCH_DEADLINE
+            ),
+            ring_size=config.get_int("REPHRASELY_CONTEXT_MESSAGES", 20),
+            ttl=config.get_float("REPHRASELY_CONTEXT_TTL", 600),
+        )
+
+        # Stream tokens into the modal while the LLM generates (coalesced for rate limits)
+        self.stream_updates = config.get_bool("REPHRASELY_STREAM", True)
+        self.stream_min_interval = config.get_float("REPHRASELY_STREAM_INTERVAL", 1.0)
+
+        # Messages are posted by background senders; the interaction ack never waits on Slack
+        self.outbox = Outbox(
+            _send_outbox_message,
+            notify=_notify_dead_letter,
+            workers=config.get_int("REPHRASELY_OUTBOX_WORKERS", 2),
+            max_attempts=config.get_int("REPHRASELY_OUTBOX_ATTEMPTS", 5),
+        )
+
+        self._export_metrics()
+
+    def _export_metrics(self):
+        """Expose the counters the services keep in their stats() on /metrics."""
+        QUEUE_DEPTH.labels("executor").set_function(_stat(self.executor.stats, "queue_depth"))
+        if self.job_queue is not None:
+            QUEUE_DEPTH.labels("durable").set_function(self.job_queue.depth)
+
+        cache = self.cache.stats
+        CACHE_LOOKUPS.labels("rephrase", "hit").set_function(_stat(cache, "hits"))
+        CACHE_LOOKUPS.labels("rephrase", "miss").set_function(_stat(cache, "misses"))
+        CACHE_EVICTIONS.labels("rephrase").set_function(_stat(cache, "evictions"))
+        CACHE_ENTRIES.labels("rephrase").set_function(_stat(cache, "entries"))
+        CACHE_BYTES.labels("rephrase").set_function(_stat(cache, "bytes"))
+
+        if self.translation_memory is not None:
+            memory = self.translation_memory.stats
+            CACHE_LOOKUPS.labels("translation_memory", "hit").set_function(_stat(memory, "exact_hits"))
+            CACHE_LOOKUPS.labels("translation_memory", "miss").set_function(_stat(memory, "llm_segments"))
+            CACHE_ENTRIES.labels("translation_memory").set_function(_stat(memory, "entries"))
+
+        tokens = self.tokens.stats
+        CACHE_LOOKUPS.labels("tokens", "hit").set_function(_stat(tokens, "hits"))
+        CACHE_LOOKUPS.labels("tokens", "miss").set_function(_stat(tokens, "misses"))
+        CACHE_ENTRIES.labels("tokens").set_function(_stat(tokens, "cached"))
+        UNAUTHORIZED_LOOKUPS.set_function(_stat(tokens, "unauthorized"))
+
+        inflight = self.inflight.stats
+        CANCELLED_JOBS.labels("queued").set_function(_stat(inflight, "cancelled_queued"))
+        CANCELLED_JOBS.labels("running").set_function(_stat(inflight, "cancelled_running"))
+        ABORTED_LLM_CALLS.set_function(_stat(inflight, "aborted_llm_calls"))
+        CANCELLED_SECONDS.set_function(_stat(inflight, "wasted_seconds"))
+
+        outbox = self.outbox.stats
+        QUEUE_DEPTH.labels("outbox").set_function(_stat(outbox, "pending"))
+        for event, key in (("queued", "queued"), ("sent", "sent"), ("retried", "retries"),
+                           ("duplicate", "duplicates"), ("dead_lettered", "dead_lettered")):
+            OUTBOX_MESSAGES.labels(event).set_function(_stat(outbox, key))
+
+        if self.ollama_scheduler is not None:
+            scheduler = self.ollama_scheduler.stats
+            QUEUE_DEPTH.labels("ollama").set_function(_stat(scheduler, "queued"))
+            OLLAMA_REQUESTS.set_function(_stat(scheduler, "completed"))
+        if self.ollama_manager is not None:
+            for model in self.ollama_manager.models:
+                status = partial(_model_status, self.ollama_manager, model)
+                OLLAMA_MODEL_READY.labels(model).set_function(
+                    lambda status=status: status()["state"] == OLLAMA_READY
+                )
+                OLLAMA_MODEL_LOADS.labels(model).set_function(_stat(status, "loads"))
+                OLLAMA_MODEL_LOAD_SECONDS.labels(model).set_function(_stat(status, "load_time"))
+
+
+def _stat(stats, name: str):
+    """Scrape-time reader for one value of a `stats()` dict."""
+    return lambda: stats()[name]
+
+
+def _model_status(manager: OllamaModelManager, model: str) -> dict:
+    return manager.status()[model]
+
+
+_services: Services | None = None
+_services_lock = threading.Lock()
+
+
+def services() -> Services:
+    """
+    This process's services, built on first use. A pre-forking WSGI server
+    imports the app in its master process; building them here instead means
+    every worker starts its own threads and database connections after the
+    fork, and a process that never handles a request never pays for them.
+    """
+    global _services  # pylint: disable=global-statement
+    if _services is None:
+        with _services_lock:
+            if _services is None:
+                _services = Services(settings())
+    return _services
+
+
+def create_app() -> Flask:
+    """
+    The Flask app with Rephrasely's routes. Cheap to call and starts no
+    threads: settings, pools, routers and caches are loaded by `services()`
+    when a request first needs them.
+    """
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    return app
+
+
+def _user_token(team_id: str | None, user_id: str | None) -> str | None:
+    token = services().tokens.get(team_id, user_id)
     if not token:
-        app.logger.error("SLACK_USER_TOKEN is missing. Complete OAuth first.")
+        logger.warning("No Slack token for user %s/%s. Complete OAuth first.", team_id, user_id)
         return None
-    return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+    return token
 
-@app.route("/")
-def home():
-    """Home page with Slack app authorization link."""
-    auth_url = (
+def _oauth_configured(current: Settings) -> bool:
+    return bool(current.slack_client_id and current.slack_client_secret)
+
+
+def _install_url(current: Settings) -> str:
+    """Slack's OAuth authorize URL for installing the app for one user."""
+    return (
         "https://slack.com/oauth/v2/authorize"
-        f"?client_id={CLIENT_ID}"
+        f"?client_id={current.slack_client_id}"
         f"&scope=chat:write"
-        f"&user_scope=chat:write"
-        f"&redirect_uri={REDIRECT_URI}"
+        # History scopes let the channel context be read with the user's token
+        f"&user_scope=chat:write,channels:history,groups:history,im:history,mpim:history"
+        f"&redirect_uri={current.slack_redirect_uri}"
     )
+
+
+@bp.route("/")
+def home():
+    """Home page with Slack app authorization link."""
+    current = settings()
+    if not _oauth_configured(current):
+        return OAUTH_DISABLED_TEXT, 503
     return render_template_string(
         '<a href="{{auth_url}}">Authorize Slack App</a>',
-        auth_url=auth_url,
+        auth_url=_install_url(current),
+    )
+
+
+@bp.route("/metrics")
+def metrics_endpoint():
+    """Prometheus scrape endpoint (bearer REPHRASELY_METRICS_TOKEN, if set)."""
+    expected = settings().get("REPHRASELY_METRICS_TOKEN")
+    if expected and request.headers.get("Authorization") != f"Bearer {expected}":
+        return "Unauthorized", 401
+    return REGISTRY.render(), 200, {"Content-Type": CONTENT_TYPE}
+
+
+def _debug_allowed() -> bool:
+    """
+    Bearer REPHRASELY_DEBUG_TOKEN; the debug endpoints are off while it is
+    unset. The source address is not trusted: behind a local reverse proxy
+    every request comes from 127.0.0.1.
+    """
+    expected = settings().get("REPHRASELY_DEBUG_TOKEN")
+    if not expected:
+        return False
+    return hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {expected}")
+
+
+@bp.route("/debug/traces")
+def debug_traces():
+    """Recent traces (?slowest=1 orders by duration, ?limit=N)."""
+    if not _debug_allowed():
+        return "Not found", 404
+    traces = tracer.recent(
+        limit=request.args.get("limit", 50, type=int),
+        slowest=request.args.get("slowest", "") not in ("", "0"),
     )
+    return jsonify([t.summary() for t in traces])
 
 
-@app.route("/slack/oauth/callback")
+@bp.route("/debug/traces/<trace_id>")
+def debug_trace(trace_id: str):
+    """One trace's span timeline and captured payloads."""
+    if not _debug_allowed():
+        return "Not found", 404
+    trace = tracer.get(trace_id)
+    if trace is None:
+        return "Unknown trace", 404
+    return jsonify(trace.as_dict())
+
+
+@bp.route("/slack/oauth/callback")
 def oauth_callback():
     """Handles OAuth callback and displays the user token to save."""
     code = request.args.get("code")
     if not code:
         return "Missing ?code param", 400
 
-    res = requests.post(
-        "https://slack.com/api/oauth.v2.access",
+    current = settings()
+    if not _oauth_configured(current):
+        return OAUTH_DISABLED_TEXT, 503
+    data = slack.api_call(
+        "oauth.v2.access",
         data={
-            "client_id": CLIENT_ID,
-            "client_secret": CLIENT_SECRET,
+            "client_id": current.slack_client_id,
+            "client_secret": current.slack_client_secret,
             "code": code,
-            "redirect_uri": REDIRECT_URI,
+            "redirect_uri": current.slack_redirect_uri,
         },
         timeout=10,
     )
-    data = res.json()
     if not data.get("ok"):
         return jsonify(data), 400
 
-    user_token = data["authed_user"]["access_token"]
-    set_env_variables({"SLACK_USER_TOKEN": user_token}, persist=True)
-    os.environ["SLACK_USER_TOKEN"] = user_token
-    return (
-        "Your user token:<br>"
-        f"<code>{user_token}</code><br><br>"
-        "<strong>Save this as SLACK_USER_TOKEN in your .env</strong>"
+    authed_user = data["authed_user"]
+    services().tokens.put(
+        data.get("team", {}).get("id", ""), authed_user["id"], authed_user["access_token"],
+        scope=authed_user.get("scope", ""),
     )
+    return "Rephrasely is authorized for your Slack user. You can close this page."
 
 
 # ----------------------------------------------------------
 
 
-@app.route("/slack/rephrasely", methods=["POST"])
+@bp.route("/slack/rephrasely", methods=["POST"])
+@COMMAND_ACK_SECONDS.time()
 def handle_command():
     """
-    Slash command entrypoint:
-    1) Open a quick 'Working…' modal immediately (within 3s).
-    2) Kick off background work; when done, update the modal to the editable version.
+    Slash command over HTTP: the response is the ack.
+    """
+    run_slash_command(request.form)
+    # Respond immediately to avoid timeout
+    return "", 200
+
+
+@tracer.trace("slash_command")
+def run_slash_command(data: Mapping[str, str]):
+    """
+    Slash command pipeline, shared by the HTTP route and Socket Mode:
+    1) Queue the LLM work right away so it runs while the modal opens.
+    2) Open a quick 'Working…' modal (within 3s) and hand its view_id to the job.
+    3) When the job is done, it updates the modal to the editable version.
+    `data` holds the command's fields (trigger_id, channel_id, user_id, team_id, text).
     """
-    data = request.form
     trigger_id = data.get("trigger_id")
     channel_id = data.get("channel_id")
+    user_id = data.get("user_id")
+    team_id = data.get("team_id")
     original_text = data.get("text", "")
+    token = _user_token(team_id, user_id)
+    if not token:
+        send_install_prompt(data.get("response_url"))
+        return
+    svc = services()
 
-    # 1) Open quick "Working..." modal synchronously
-    view_id = open_working_modal(trigger_id, channel_id)
+    if svc.job_queue is not None:
+        enqueue_durable_job(trigger_id, channel_id, original_text, team_id, user_id, token=token)
+        return
 
-    # 2) Process in background and update the modal when done
-    Thread(
-        target=process_and_update_modal,
-        args=(view_id, channel_id, original_text),
-        daemon=True,
-    ).start()
+    # 1) Start processing in the worker pool before views.open returns
+    view_future: Future = Future()
+    cancel = CancelToken()
+    try:
+        job = svc.executor.submit(
+            user_id or channel_id,
+            process_and_update_modal,
+            view_future, channel_id, original_text, cancel, slack_token=token,
+        )
+    except QueueFullError:
+        # Overloaded: tell the user right away instead of queueing more work
+        open_working_modal(trigger_id, channel_id, BUSY_TEXT, token=token)
+        return
 
-    # Respond immediately to avoid timeout
-    return "", 200
+    # 2) Open quick "Working..." modal, mentioning the queue if any
+    status = WORKING_TEXT
+    if job.ahead:
+        status = f":hourglass_flowing_sand: You're in the queue ({job.ahead} ahead of you)…"
+    view_id = open_working_modal(trigger_id, channel_id, status, token=token)
+    if not view_id:
+        # Nowhere to show a result: drop the job if it's still queued, else stop its LLM call
+        cancel.cancel()
+        svc.executor.cancel(job)
+        view_future.set_result("")
+        return
+    tracer.bind_view(view_id)
+    svc.inflight.register(view_id, job, cancel)
+    view_future.set_result(view_id)
+
+
+def send_install_prompt(response_url: str | None):
+    """
+    Tell a user who hasn't authorized the app (ephemerally, via the command's
+    response_url) where to do it.
+    """
+    current = settings()
+    if not response_url or not _oauth_configured(current):
+        logger.error("Can't send the install link: no response_url or OAuth is not configured.")
+        return
+    text = NOT_AUTHORIZED_TEXT.format(url=_install_url(current))
+    if not slack.respond(response_url, {"response_type": "ephemeral", "text": text}):
+        logger.error("Sending the install link failed.")
 
 
-def process_and_update_modal(view_id: str, channel_id: str, original_text: str):
+def enqueue_durable_job(trigger_id: str, channel_id: str, original_text: str,
+                        team_id: str | None = None, user_id: str | None = None, *, token: str):
+    """
+    Durable mode: open the modal first (jobs are keyed by view_id), then
+    queue the job for the worker processes.
+    """
+    job_queue = services().job_queue
+    if job_queue.is_full():
+        open_working_modal(trigger_id, channel_id, BUSY_TEXT, token=token)
+        return
+
+    ahead = job_queue.depth()
+    status = WORKING_TEXT
+    if ahead:
+        status = f":hourglass_flowing_sand: You're in the queue ({ahead} ahead of you)…"
+    view_id = open_working_modal(trigger_id, channel_id, status, token=token)
+    tracer.bind_view(view_id)
+    if view_id:
+        job_queue.enqueue(
+            view_id, channel_id, original_text, model=services().llm_providers,
+            team_id=team_id or "", user_id=user_id or "",
+        )
+
+
+def _view_id_now(view_ref: "str | Future") -> str:
+    """
+    Return the view_id if the modal is already open, else "" (don't block).
+    """
+    if isinstance(view_ref, Future):
+        return view_ref.result() if view_ref.done() else ""
+    return view_ref
+
+
+def _wait_view_id(view_ref: "str | Future") -> str:
+    """
+    Block until views.open has finished and return its view_id ("" on failure).
+    """
+    if not isinstance(view_ref, Future):
+        return view_ref
+    try:
+        return view_ref.result(timeout=VIEW_WAIT_TIMEOUT)
+    except FutureTimeoutError:
+        return ""
+
+
+def process_and_update_modal(
+    view_ref: "str | Future",
+    channel_id: str,
+    original_text: str,
+    cancel: CancelToken | None = None,
+    slack_token: str | None = None,
+):
     """
     Runs LLM processing and updates the modal with the final editable content.
+    `view_ref` is the view_id, or a Future that resolves to it once views.open
+    returns (the LLM call starts without waiting for it). If `cancel` fires
+    (the user closed the modal), the LLM call is aborted and nothing is updated.
+    `slack_token` is the invoking user's token (default token if omitted).
+    """
+    start = time.monotonic()
+    # Executor jobs inherit the slash command's trace; durable workers start their own
+    view_id = view_ref if isinstance(view_ref, str) else ""
+    with tracer.trace("rephrase_job", view_id=view_id) as span, JOBS_IN_FLIGHT.track_inprogress():
+        tier, outcome = _rephrase_and_update(view_ref, channel_id, original_text, cancel, slack_token)
+        span.set(tier=tier, outcome=outcome, chars=len(original_text or ""))
+    REPHRASE_SECONDS.labels(tier, outcome).observe(time.monotonic() - start)
+
+
+def _rephrase_and_update(view_ref: "str | Future", channel_id: str, original_text: str,
+                         cancel: CancelToken | None, slack_token: str | None) -> tuple[str, str]:
+    """
+    Body of `process_and_update_modal`; returns (tier, outcome) for metrics.
     """
-    prompt = "Translate: " + (original_text or "")
+    cancel = cancel or CancelToken()
+    original_text = original_text or ""
+    svc = services()
 
+    # Pick the model tier locally; clean English needs no LLM at all
+    llm = svc.router
+    profile = None
+    if svc.tiering:
+        profile = classify(
+            original_text, skip_max_words=svc.skip_max_words, small_max_words=svc.small_max_words
+        )
+        if profile.tier == TIER_SMALL:
+            llm = svc.small_router
+
+    # Fetched only if an LLM call is needed: cache hits never pay conversations.history
+    channel_context = None
+    if svc.context_tokens > 0 and not (profile and profile.tier == TIER_SKIP):
+        channel_context = LazyContext(partial(_fetch_channel_context, channel_id, slack_token))
+
+    def push_partial(text: str):
+        # Partial text before the modal is open is simply not shown yet
+        view_id = _view_id_now(view_ref)
+        if view_id:
+            update_modal_partial(view_id, channel_id, text, token=slack_token)
+
+    updater = None
+    if svc.stream_updates:
+        updater = CoalescingUpdater(push_partial, min_interval=svc.stream_min_interval)
+
+    tier = profile.tier if profile is not None else "none"
+    outcome = "ok"
     try:
-        modified_text = rephrasely_method(prompt)
+        if profile is not None and profile.tier == TIER_SKIP:
+            modified_text = original_text
+        elif len(svc.variant_tones) > 1 and len(original_text) <= svc.variants_max_chars:
+            # Variants come from one structured (non-streaming) call
+            modified_text = rephrase_variants_cached(
+                original_text, cancel=cancel, channel_context=channel_context, llm=llm
+            )
+        else:
+            modified_text = rephrase_text(
+                original_text, on_delta=updater, cancel=cancel,
+                channel_context=channel_context, llm=llm,
+            )
+    except JobCancelled:
+        svc.inflight.record_abort(cancel, llm_call_aborted=True)
+        logger.info("Rephrase cancelled: the modal was closed.")
+        return tier, "cancelled"
     # pylint: disable=broad-except
     except Exception as e:
         # Fallback message if LLM fails
-        modified_text = f"(Error generating suggestion: {e})\n\n{prompt}"
+        modified_text = f"(Error generating suggestion: {e})\n\n{original_text}"
+        outcome = "error"
+    finally:
+        if updater is not None:
+            # No partial may land after the result
+            updater.close(timeout=PARTIAL_UPDATE_TIMEOUT)
+
+    # Join on views.open (the LLM may have finished first)
+    view_id = _wait_view_id(view_ref)
+    if not view_id:
+        logger.error("views.open failed; dropping generated suggestion.")
+        return tier, "no_view"
+    svc.inflight.unregister(view_id)
+    if cancel.cancelled:
+        # Closed after the LLM had already answered: the work was wasted
+        svc.inflight.record_abort(cancel, llm_call_aborted=False)
+        return tier, "cancelled"
 
     # Swap the modal content to the real editable view
-    update_modal_with_result(view_id, channel_id, modified_text)
+    update_modal_with_result(view_id, channel_id, modified_text, token=slack_token)
+    return tier, outcome
+
+
+def _fetch_channel_context(channel_id: str, token: str | None) -> str:
+    svc = services()
+    with tracer.span("channel_context"):
+        return svc.context_cache.context(channel_id, svc.context_tokens, token=token)
+
+
+def build_prompt(text: str, context: str = "", channel_context: str = "") -> str:
+    """
+    Prompt for one piece of text, optionally with preceding text and recent
+    channel messages as context.
+    """
+    prompt = text
+    if context or channel_context:
+        prompt = f"Text to rephrase:\n{text}"
+    if context:
+        prompt = (
+            "Context (the text right before this part; do not include it in your answer):\n"
+            f"{context}\n\n{prompt}"
+        )
+    if channel_context:
+        prompt = (
+            "Recent messages in the conversation (for tone and terminology only; "
+            "do not translate or include them):\n"
+            f"{channel_context}\n\n{prompt}"
+        )
+    return prompt
+
+
+def rephrase_text(text: str, on_delta=None, cancel: CancelToken | None = None,
+                  channel_context: LazyContext | None = None, llm: LLMRouter | None = None) -> str:
+    """
+    Rephrase the user's text. Long texts are chunked and rephrased in parallel.
+    """
+    svc = services()
+    if len(text) > svc.long_text_chars:
+        return rephrase_chunked(
+            text,
+            partial(rephrase_segmented, cancel=cancel, channel_context=channel_context, llm=llm),
+            max_chars=svc.chunk_chars, max_parallel=svc.chunk_parallel,
+            overlap_chars=svc.chunk_overlap,
+            on_delta=on_delta,
+        )
+    return rephrase_segmented(
+        text, on_delta=on_delta, cancel=cancel, channel_context=channel_context, llm=llm
+    )
+
+
+def rephrase_segmented(text: str, context: str = "", on_delta=None,
+                       cancel: CancelToken | None = None,
+                       channel_context: LazyContext | None = None,
+                       llm: LLMRouter | None = None) -> str:
+    """
+    Rephrase text, reusing translation-memory segments when enabled.
+    """
+    def translate(run_text: str, on_delta=None) -> str:
+        # Bound the answer by the size of the text being rephrased, not the prompt
+        return rephrase_cached(
+            run_text, context, on_delta=on_delta, cancel=cancel, llm=llm,
+            max_tokens=output_budget(run_text), channel_context=channel_context,
+        )
+
+    translation_memory = services().translation_memory
+    if translation_memory is None:
+        return translate(text, on_delta=on_delta)
+    return translation_memory.rephrase(
+        text, translate, on_delta=on_delta,
+        learn=lambda: channel_context is None or not channel_context.used,
+    )
+
+
+def rephrase_cached(text: str, context: str = "", on_delta=None, cancel: CancelToken | None = None,
+                    llm: LLMRouter | None = None, max_tokens: int | None = None,
+                    channel_context: LazyContext | None = None) -> str:
+    """
+    Return a cached suggestion for `text` (with `context`, the text right
+    before it), calling the LLM only on a miss.
+    If `on_delta` is given, a miss streams partial text into it.
+    `llm` is the router for the input's tier (default: the main router).
+    The cache is shared by every channel and team, so it only holds results
+    written without channel context: `channel_context` is fetched on a miss,
+    and a result written with it is not cached.
+    """
+    svc = services()
+    llm = llm or svc.router
+    cache_text = build_prompt(text, context)
+    candidates = llm.candidates()
+    for provider in candidates:
+        key = RephraseCache.make_key(cache_text, provider.model, provider.system_prompt, provider.name)
+        cached = svc.cache.get(key)
+        if cached is not None:
+            return cached
 
+    recent = channel_context.get() if channel_context is not None else ""
+    result = llm.rephrase(
+        build_prompt(text, context, recent), on_delta=on_delta, candidates=candidates,
+        cancel=cancel, max_tokens=max_tokens,
+    )
+    if not recent:
+        provider = result.provider
+        key = RephraseCache.make_key(cache_text, provider.model, provider.system_prompt, provider.name)
+        svc.cache.put(key, result.output)
+    return result.output
+
+
+def rephrase_variants_cached(text: str, cancel: CancelToken | None = None,
+                             channel_context: LazyContext | None = None,
+                             llm: LLMRouter | None = None) -> dict[str, str]:
+    """
+    Return one version per tone in REPHRASELY_VARIANTS, from cache or a single LLM call.
+    Like `rephrase_cached`, results written with channel context are not cached.
+    """
+    svc = services()
+    tones = svc.variant_tones
+    llm = llm or svc.router
+    cache_text = build_prompt(text)
+    variant_tag = "|variants:" + ",".join(tones)
+    candidates = llm.candidates()
+    for provider in candidates:
+        key = RephraseCache.make_key(
+            cache_text, provider.model, provider.system_prompt + variant_tag, provider.name
+        )
+        cached = svc.cache.get(key)
+        if cached is not None:
+            return json.loads(cached)
+
+    # One version per tone plus the JSON around them
+    max_tokens = output_budget(text) * len(tones) + 32
+    recent = channel_context.get() if channel_context is not None else ""
+    result = llm.rephrase_variants(
+        build_prompt(text, channel_context=recent), tones, candidates=candidates, cancel=cancel,
+        max_tokens=max_tokens,
+    )
+    if not recent:
+        provider = result.provider
+        key = RephraseCache.make_key(
+            cache_text, provider.model, provider.system_prompt + variant_tag, provider.name
+        )
+        svc.cache.put(key, json.dumps(result.output))
+    return result.output
 
-def open_working_modal(trigger_id: str, channel_id: str) -> str:
+
+def _status_view(channel_id: str, status_text: str) -> dict:
+    """
+    Build a minimal status modal (no 'submit' -> it's just a waiting modal).
+    """
+    return {
+        "type": "modal",
+        "callback_id": "edit_and_send_message",  # keep same callback for later
+        "close": {"type": "plain_text", "text": "Cancel"},
+        "notify_on_close": True,  # closing it cancels the in-flight job
+        "private_metadata": channel_id,
+        "title": {"type": "plain_text", "text": "Rephrasely"},
+        "blocks": [
+            {
+                "type": "section",
+                "text": {"type": "mrkdwn", "text": status_text},
+            },
+        ],
+    }
+
+
+def open_working_modal(trigger_id: str, channel_id: str, status_text: str = WORKING_TEXT,
+                       *, token: str) -> str:
     """
     Open a minimal modal that shows a spinner/message quickly.
     Return the view_id so we can later call views.update.
     """
     payload = {
         "trigger_id": trigger_id,
-        "view": {
-            "type": "modal",
-            "callback_id": "edit_and_send_message",  # keep same callback for later
-            # no 'submit' here -> it's just a waiting modal
-            "close": {"type": "plain_text", "text": "Cancel"},
-            "private_metadata": channel_id,
-            "title": {"type": "plain_text", "text": "Rephrasely"},
-            "blocks": [
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": ":hourglass_flowing_sand: Working on your suggestion…",
-                    },
-                },
-            ],
-        },
+        "view": _status_view(channel_id, status_text),
     }
 
-
-    r = requests.post(SLACK_VIEWS_OPEN, headers=_auth_headers(), json=payload, timeout=10)
-    data = r.json()
+    data = slack.api_call(
+        "views.open", token=token, json=payload, timeout=10,
+        deadline=VIEWS_OPEN_DEADLINE,
+    )
     if not data.get("ok"):
-        app.logger.error("views.open failed: %s", data)
+        logger.error("views.open failed: %s", data)
         # Return empty; update will no-op if view_id is missing
         return ""
     # Slack returns the newly opened view under `view`
     return data["view"]["id"]
 
 
-def update_modal_with_result(view_id: str, channel_id: str, suggested_text: str):
+def update_modal_with_result(view_id: str, channel_id: str, suggested_text: "str | dict[str, str]",
+                            *, token: str):
     """
     Replace the 'Working…' modal with the real editable modal using views.update.
+    `suggested_text` may be a dict of tone -> text to offer several variants.
     """
     if not view_id:
-        app.logger.error("No view_id available to update modal.")
+        logger.error("No view_id available to update modal.")
         return
 
+    if isinstance(suggested_text, dict):
+        if len(suggested_text) > 1:
+            blocks = _variant_blocks(suggested_text)
+        else:
+            blocks = _message_input_blocks(next(iter(suggested_text.values()), ""))
+    else:
+        blocks = _message_input_blocks(suggested_text or "")
+
     new_view = {
         "type": "modal",
         "callback_id": "edit_and_send_message",
         "title": {"type": "plain_text", "text": "Edit Message"},
         "submit": {"type": "plain_text", "text": "Send"},
         "close": {"type": "plain_text", "text": "Cancel"},
+        "notify_on_close": True,
         "private_metadata": channel_id,
-        "blocks": [
-            {
-                "type": "input",
-                "block_id": "message_input",
-                "element": {
-                    "type": "plain_text_input",
-                    "action_id": "message_text",
-                    "multiline": True,
-                    "initial_value": suggested_text or "",
-                },
-                "label": {"type": "plain_text", "text": "Edit your message"},
-            }
-        ],
+        "blocks": blocks,
     }
 
     payload = {
@@ -195,69 +858,268 @@ def update_modal_with_result(view_id: str, channel_id: str, suggested_text: str)
         "view": new_view,
     }
 
-    r = requests.post(
-        SLACK_VIEWS_UPDATE, headers=_auth_headers(), json=payload, timeout=20
-    )
-    if not r.ok:
-        app.logger.error("views.update failed: %s", r.text)
+    data = slack.api_call("views.update", token=token, json=payload, timeout=20)
+    if not data.get("ok"):
+        logger.error("views.update failed: %s", data)
+
+
+def _message_input_blocks(text: str) -> list[dict]:
+    """
+    One editable input per 3000 characters. Extra blocks are named
+    message_input_<n>_<sep>, where <sep> says how to join them back.
+    """
+    pieces = split_for_blocks(text, MAX_INPUT_CHARS)
+    blocks = []
+    for i, (sep_before, piece) in enumerate(pieces):
+        block_id = "message_input"
+        label = "Edit your message"
+        if i:
+            sep_code = "p" if "\n\n" in sep_before else "n" if "\n" in sep_before else "s"
+            block_id = f"message_input_{i}_{sep_code}"
+            label = f"(continued {i + 1}/{len(pieces)})"
+        blocks.append({
+            "type": "input",
+            "block_id": block_id,
+            "optional": bool(i),
+            "element": {
+                "type": "plain_text_input",
+                "action_id": "message_text",
+                "multiline": True,
+                "initial_value": piece,
+            },
+            "label": {"type": "plain_text", "text": label},
+        })
+    return blocks
+
+
+def _variant_blocks(variants: dict[str, str]) -> list[dict]:
+    """
+    A radio choice of tone plus one editable input per variant.
+    """
+    def option(tone: str) -> dict:
+        return {"text": {"type": "plain_text", "text": tone.capitalize()}, "value": tone}
+
+    tones = list(variants)
+    initial = "neutral" if "neutral" in variants else tones[0]
+    blocks = [{
+        "type": "input",
+        "block_id": "variant_choice",
+        "element": {
+            "type": "radio_buttons",
+            "action_id": "choice",
+            "options": [option(tone) for tone in tones],
+            "initial_option": option(initial),
+        },
+        "label": {"type": "plain_text", "text": "Send this version"},
+    }]
+    for tone in tones:
+        blocks.append({
+            "type": "input",
+            "block_id": f"variant_{tone}",
+            "optional": True,
+            "element": {
+                "type": "plain_text_input",
+                "action_id": "message_text",
+                "multiline": True,
+                "initial_value": variants[tone][:MAX_INPUT_CHARS],
+            },
+            "label": {"type": "plain_text", "text": tone.capitalize()},
+        })
+    return blocks
 
 
-@app.route("/slack/interactions", methods=["POST"])
+def _edited_text(values: dict) -> str:
+    """
+    Join the values of all message_input blocks back into one message.
+    """
+    text = values["message_input"]["message_text"]["value"] or ""
+    extra = []
+    for block_id, block in values.items():
+        parts = block_id.split("_")
+        if block_id.startswith("message_input_") and len(parts) == 4:
+            extra.append((int(parts[2]), BLOCK_SEPARATORS.get(parts[3], "\n"), block))
+    for _, sep, block in sorted(extra, key=lambda item: item[0]):
+        value = block["message_text"].get("value")
+        if value:
+            text = f"{text}{sep}{value}" if text else value
+    return text
+
+
+def update_modal_status(view_id: str, channel_id: str, status_text: str, *, token: str,
+                        best_effort: bool = False):
+    """
+    Replace the modal content with a plain status message (e.g. overload notice).
+    With `best_effort` the update is dropped rather than delayed when Slack's
+    rate limit has no room for it.
+    """
+    if not view_id:
+        return
+    payload = {"view_id": view_id, "view": _status_view(channel_id, status_text)}
+    data = slack.api_call("views.update", token=token, json=payload,
+                          timeout=PARTIAL_UPDATE_TIMEOUT if best_effort else 20,
+                          best_effort=best_effort)
+    if not data.get("ok"):
+        if best_effort and data.get("error") == "ratelimited":
+            logger.debug("Dropped a modal update: rate limited.")
+            return
+        logger.error("views.update failed: %s", data)
+
+
+def update_modal_partial(view_id: str, channel_id: str, partial_text: str, *, token: str):
+    """
+    Show the text generated so far while the LLM is still streaming.
+    Partials are best effort: one that would have to wait for a rate-limit
+    token is dropped (the next one or the result replaces it anyway), so
+    they never delay the final update.
+    """
+    if len(partial_text) > PARTIAL_TEXT_LIMIT:
+        partial_text = "…" + partial_text[-PARTIAL_TEXT_LIMIT:]
+    update_modal_status(view_id, channel_id, f"{WORKING_TEXT}\n\n{partial_text}", token=token,
+                        best_effort=True)
+
+
+@bp.route("/slack/interactions", methods=["POST"])
 def handle_view_submission():
     """
-    Handle submission of the modal form (after the update).
+    Interactions over HTTP: the response body is the ack payload.
     """
-    payload = request.form.to_dict()
-    payload_data = json.loads(payload.get("payload", "{}"))
+    payload_data = json.loads(request.form.get("payload", "{}"))
+    response = run_interaction(payload_data)
+    if response:
+        return jsonify(response)
+    return "", 200
 
+
+def run_interaction(payload_data: dict) -> dict | None:
+    """
+    Handle an interaction payload (modal submitted or closed), shared by the
+    HTTP route and Socket Mode. Returns the ack payload (e.g. validation
+    errors), or None for an empty ack. Never waits on Slack.
+    """
     # Expect a 'view_submission'
     if payload_data.get("type") == "view_submission":
         values = payload_data["view"]["state"]["values"]
-        edited_text = values["message_input"]["message_text"]["value"]
         channel_id = payload_data["view"]["private_metadata"]
 
-        send_message_as_user(channel_id, edited_text)
-        return "", 200
+        if "variant_choice" in values:
+            tone = values["variant_choice"]["choice"]["selected_option"]["value"]
+            edited_text = values.get(f"variant_{tone}", {}).get("message_text", {}).get("value")
+            if not edited_text:
+                return {
+                    "response_action": "errors",
+                    "errors": {f"variant_{tone}": "The selected version is empty."},
+                }
+        else:
+            edited_text = _edited_text(values)
+
+        # Ack right away; the outbox posts the message in the background
+        view = payload_data["view"]
+        user = payload_data.get("user", {})
+        team_id = user.get("team_id") or payload_data.get("team", {}).get("id")
+        try:
+            with tracer.trace("view_submission", view_id=view["id"]):
+                services().outbox.put(
+                    f"{view['id']}:{view.get('hash', '')}", channel_id, edited_text,
+                    user_id=user.get("id"), token=_user_token(team_id, user.get("id")),
+                )
+        except OutboxFullError:
+            block_id = next(iter(values), "message_input")
+            return {"response_action": "errors", "errors": {block_id: OUTBOX_FULL_TEXT}}
+        return None
+
+    # The user closed the modal: stop any work still running for it
+    if payload_data.get("type") == "view_closed":
+        view_id = payload_data.get("view", {}).get("id", "")
+        svc = services()
+        if svc.job_queue is not None and svc.job_queue.cancel(view_id):
+            logger.info("Cancelled queued job for closed view %s", view_id)
+        elif svc.inflight.cancel(view_id):
+            logger.info("Cancelled in-flight rephrase for closed view %s", view_id)
+        return None
 
     # Ignore other interaction types for now
-    return "", 200
+    return None
 
 
-def send_message_as_user(channel_id: str, text: str):
+def run_event(payload: dict):
     """
-    Posts the final edited message as the *user* (using your user token).
+    Handle an Events API callback (received over Socket Mode): forget the
+    tokens of users who revoked them and of workspaces that uninstalled the app.
     """
-    slack_user_token = get_user_environment_variable("SLACK_USER_TOKEN")
+    event = payload.get("event", {})
+    team_id = payload.get("team_id")
+    tokens = services().tokens
+    if event.get("type") == "tokens_revoked":
+        for user_id in event.get("tokens", {}).get("oauth", []):
+            tokens.delete(team_id, user_id)
+            logger.info("Forgot the revoked token of %s/%s", team_id, user_id)
+    elif event.get("type") == "app_uninstalled":
+        tokens.delete_team(team_id)
+        logger.info("Forgot every token of %s: the app was uninstalled.", team_id)
 
-    headers = {
-        "Authorization": f"Bearer {slack_user_token}",
-        "Content-Type": "application/json",
-    }
+
+def send_message_as_user(channel_id: str, text: str, *, token: str):
+    """
+    Posts the final edited message as the *user* (using your user token).
+    """
     data = {
         "channel": channel_id,
         "text": text,
         # Using a user token -> message is sent as that user; `as_user` is unnecessary.
     }
-    response = requests.post(SLACK_CHAT_POST, headers=headers, json=data, timeout=10)
-    if not response.ok:
-        app.logger.error("chat.postMessage failed: %s", response.text)
-    return response.json() if response.content else {}
+    result = slack.api_call(
+        "chat.postMessage", token=token, json=data, timeout=10,
+        idempotent=False,  # the outbox retries what is safe to retry
+    )
+    if not result.get("ok"):
+        logger.error("chat.postMessage failed: %s", result)
+    return result
+
 
+def _send_outbox_message(message: OutboxMessage) -> dict:
+    # Keys are "<view_id>:<hash>": the post lands on the modal's trace
+    with tracer.trace("outbox_send", view_id=message.key.split(":", 1)[0], attempt=message.attempts):
+        return send_message_as_user(message.channel, message.text, token=message.token)
 
-def get_latest_messages(channel_id, limit=5):
+
+def _notify_dead_letter(message: OutboxMessage, error: str):
     """
-    Fetches the latest messages from a Slack channel using conversations.history.
+    Tells the user (ephemerally) that their message could not be posted,
+    and gives the text back so it is not lost.
     """
-    slack_user_token = get_user_environment_variable("SLACK_USER_TOKEN")
+    if not message.user_id:
+        return
+    if outcome_unknown(error):
+        # Not retried to avoid a duplicate, so it may be in the channel already
+        status = f"may not have been posted ({error}); check the channel first. "
+    else:
+        status = f"could not be posted ({error}). "
+    data = {
+        "channel": message.channel,
+        "user": message.user_id,
+        "text": (
+            f":warning: Your Rephrasely message {status}"
+            f"Here it is so you can send it yourself:\n\n{message.text}"
+        ),
+    }
+    result = slack.api_call("chat.postEphemeral", token=message.token, json=data, timeout=10)
+    if not result.get("ok"):
+        logger.error("chat.postEphemeral failed: %s", result)
 
-    url = f"{SLACK_API_BASE}/conversations.history"
-    headers = {"Authorization": f"Bearer {slack_user_token}"}
-    params = {"channel": channel_id, "limit": limit}
 
-    response = requests.get(url, headers=headers, params=params, timeout=10)
-    data = response.json()
-    return data
+def get_latest_messages(channel_id, limit=5, *, token, oldest=None, deadline=None, timeout=10):
+    """
+    Fetches the latest messages from a Slack channel using conversations.history.
+    With `oldest`, only messages newer than that ts are returned.
+    """
+    params = {"channel": channel_id, "limit": limit}
+    if oldest:
+        params["oldest"] = oldest
+    return slack.api_call(
+        "conversations.history", token=token, params=params,
+        http_method="GET", timeout=timeout, deadline=deadline,
+    )
 
 
 if __name__ == "__main__":
-    app.run(port=5000)
+    create_app().run(port=5000)
@@ -0,0 +1,107 @@
+""" Cancelling in-flight rephrase work when the user closes the modal.
+- `CancelToken` is checked between steps and on every streamed delta.
+- `CancelRegistry` maps a Slack view_id to its queued/running job so a
+  `view_closed` event can drop it from the queue or abort its LLM stream.
+"""
+import threading
+import time
+from typing import Any
+
+
+class JobCancelled(Exception):
+    """Raised inside a job once its CancelToken has been cancelled."""
+
+
+class CancelToken:
+    """Thread-safe cancellation flag shared by a job and its LLM calls."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.created = time.monotonic()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.event.is_set()
+
+    def cancel(self):
+        self.event.set()
+
+    def raise_if_cancelled(self):
+        if self.event.is_set():
+            raise JobCancelled("Job was cancelled.")
+
+
+class CancelRegistry:
+    """
+    view_id -> (job, token) for everything not finished yet.
+
+    Args:
+        executor: JobExecutor used to drop jobs that are still queued.
+        max_closed: How many early closes (before registration) to remember.
+    """
+
+    def __init__(self, executor, max_closed: int = 1024):
+        self.executor = executor
+        self.max_closed = max_closed
+
+        self._lock = threading.Lock()
+        self._jobs: dict[str, tuple[Any, CancelToken]] = {}
+        self._closed_early: dict[str, float] = {}
+
+        self.cancelled_queued = 0
+        self.cancelled_running = 0
+        self.aborted_llm_calls = 0
+        self.wasted_seconds = 0.0
+
+    def register(self, view_id: str, job, token: CancelToken):
+        """Track a job; cancels it right away if its view was already closed."""
+        if not view_id:
+            return
+        with self._lock:
+            closed = self._closed_early.pop(view_id, None) is not None
+            if not closed:
+                self._jobs[view_id] = (job, token)
+        if closed:
+            self._cancel(job, token)
+
+    def unregister(self, view_id: str):
+        with self._lock:
+            self._jobs.pop(view_id, None)
+
+    def cancel(self, view_id: str) -> bool:
+        """Cancel the job behind `view_id`. Returns False if nothing was in flight."""
+        with self._lock:
+            entry = self._jobs.pop(view_id, None)
+            if entry is None:
+                self._closed_early[view_id] = time.monotonic()
+                while len(self._closed_early) > self.max_closed:
+                    self._closed_early.pop(next(iter(self._closed_early)))
+                return False
+        self._cancel(*entry)
+        return True
+
+    def record_abort(self, token: CancelToken, llm_call_aborted: bool):
+        """Called by a job that stopped because it was cancelled."""
+        with self._lock:
+            self.wasted_seconds += time.monotonic() - token.created
+            if llm_call_aborted:
+                self.aborted_llm_calls += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": len(self._jobs),
+                "cancelled_queued": self.cancelled_queued,
+                "cancelled_running": self.cancelled_running,
+                "aborted_llm_calls": self.aborted_llm_calls,
+                "wasted_seconds": self.wasted_seconds,
+            }
+
+    def _cancel(self, job, token: CancelToken):
+        token.cancel()
+        dropped = job is not None and self.executor.cancel(job)
+        with self._lock:
+            if dropped:
+                self.cancelled_queued += 1
+            else:
+                self.cancelled_running += 1
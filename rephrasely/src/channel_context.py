@@ -0,0 +1,167 @@
+""" Recent channel messages as rephrase context.
+- Keeps a bounded ring of the latest messages per channel.
+- Refreshes incrementally: only messages newer than the last one seen are
+  requested (`oldest` cursor), so a refresh is one small
+  conversations.history call; within `min_refresh` seconds it is skipped.
+- Channels unused for `ttl` seconds are refetched from scratch (catches
+  edits/deletes); the least recently used channels are evicted.
+- `context` renders the newest messages that fit a token budget.
+- `LazyContext` defers one job's fetch until an LLM call actually needs it,
+  so jobs answered from the caches never call conversations.history.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+# Message subtypes that are real conversation (joins, topic changes... are skipped)
+CONTEXT_SUBTYPES = {None, "thread_broadcast", "me_message", "file_share"}
+
+# Rough chars-per-token ratio used for the budget
+CHARS_PER_TOKEN = 4
+
+
+class _Channel:
+    def __init__(self, ring_size: int):
+        self.messages: deque[tuple[str, str]] = deque(maxlen=ring_size)  # (ts, text), oldest first
+        self.latest_ts: str | None = None
+        self.fetched_at = 0.0
+        self.lock = threading.Lock()
+
+
+class ChannelContextCache:
+    """
+    Per-channel ring of recent messages, refreshed incrementally.
+
+    Args:
+        fetch: `fetch(channel_id, oldest=None, limit=N, token=None)` returning a
+            conversations.history response (messages newest first).
+        ring_size: Messages kept per channel.
+        ttl: Seconds after which a channel is refetched from scratch.
+        min_refresh: Seconds during which cached messages are used without a call.
+        max_channels: Channels kept (least recently used are evicted).
+    """
+
+    def __init__(self, fetch: Callable[..., dict], ring_size: int = 20, ttl: float = 600.0,
+                 min_refresh: float = 5.0, max_channels: int = 1000):
+        self.fetch = fetch
+        self.ring_size = ring_size
+        self.ttl = ttl
+        self.min_refresh = min_refresh
+        self.max_channels = max_channels
+
+        self._lock = threading.Lock()
+        self._channels: OrderedDict[str, _Channel] = OrderedDict()
+
+        self.fetches = 0
+        self.full_fetches = 0
+        self.skipped = 0
+        self.errors = 0
+
+    def messages(self, channel_id: str, token: str | None = None) -> list[str]:
+        """Recent message texts, oldest first, refreshing the ring if needed."""
+        channel = self._channel(channel_id)
+        # One refresh per channel at a time; concurrent callers reuse its result
+        with channel.lock:
+            self._refresh(channel_id, channel, token)
+            return [text for _, text in channel.messages]
+
+    def context(self, channel_id: str, max_tokens: int = 300, token: str | None = None) -> str:
+        """The newest messages that fit in `max_tokens`, oldest first, one per line."""
+        budget = max_tokens * CHARS_PER_TOKEN
+        lines: list[str] = []
+        for text in reversed(self.messages(channel_id, token=token)):
+            line = " ".join(text.split())
+            if len(line) > budget:
+                if not lines:
+                    lines.append("…" + line[-(budget - 1):])
+                break
+            lines.append(line)
+            budget -= len(line) + 1
+        return "\n".join(reversed(lines))
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "channels": len(self._channels),
+                "fetches": self.fetches,
+                "full_fetches": self.full_fetches,
+                "skipped": self.skipped,
+                "errors": self.errors,
+            }
+
+    def _channel(self, channel_id: str) -> _Channel:
+        with self._lock:
+            channel = self._channels.get(channel_id)
+            if channel is None:
+                channel = self._channels[channel_id] = _Channel(self.ring_size)
+            self._channels.move_to_end(channel_id)
+            while len(self._channels) > self.max_channels:
+                self._channels.popitem(last=False)
+            return channel
+
+    def _refresh(self, channel_id: str, channel: _Channel, token: str | None):
+        """Fetch what's new since the last call. Caller holds `channel.lock`."""
+        now = time.monotonic()
+        age = now - channel.fetched_at
+        if channel.fetched_at and age < self.min_refresh:
+            with self._lock:
+                self.skipped += 1
+            return
+
+        full = not channel.fetched_at or age > self.ttl
+        oldest = None if full else channel.latest_ts
+        response = self.fetch(channel_id, oldest=oldest, limit=self.ring_size, token=token)
+        with self._lock:
+            self.fetches += 1
+            if full:
+                self.full_fetches += 1
+            if not response.get("ok"):
+                self.errors += 1
+        if not response.get("ok"):
+            # Keep whatever we had (context is best-effort) and back off until min_refresh
+            channel.fetched_at = now
+            logger.warning("conversations.history failed for %s: %s", channel_id, response.get("error"))
+            return
+
+        if full:
+            channel.messages.clear()
+            channel.latest_ts = None
+        # Slack returns newest first; append oldest first
+        for message in reversed(response.get("messages", [])):
+            ts = message.get("ts", "")
+            if channel.latest_ts is not None and float(ts or 0) <= float(channel.latest_ts):
+                continue
+            channel.latest_ts = ts
+            text = (message.get("text") or "").strip()
+            if text and message.get("subtype") in CONTEXT_SUBTYPES:
+                channel.messages.append((ts, text))
+        channel.fetched_at = now
+
+
+class LazyContext:
+    """
+    One job's channel context, fetched on first use (at most once).
+
+    Args:
+        fetch: Returns the context text ("" when there is none).
+    """
+
+    def __init__(self, fetch: Callable[[], str]):
+        self._fetch = fetch
+        self._lock = threading.Lock()
+        self._value: str | None = None
+
+    def get(self) -> str:
+        with self._lock:
+            if self._value is None:
+                self._value = self._fetch() or ""
+            return self._value
+
+    @property
+    def used(self) -> bool:
+        """True once non-empty context was handed out (never fetches)."""
+        return bool(self._value)
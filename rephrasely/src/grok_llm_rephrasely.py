@@ -1,18 +1,133 @@
-import os
+import logging
 import sys
-import json
 import requests
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, Iterator, List, Sequence
+
+from rephrasely.src.metrics import LLM_STREAM_PARSE_ERRORS, record_tokens
+from rephrasely.src.settings import settings
+from rephrasely.src.sse import ContentDelta, FinishDelta, ParseError, UsageDelta, chat_events, iter_events
+from rephrasely.src.tracing import tracer
+from rephrasely.src.variants import parse_variants, variants_prompt, variants_schema
+
+logger = logging.getLogger(__name__)
 
-XAI_API_KEY =  os.getenv("XAI_API_KEY")  # set this in your env
 XAI_CHAT_URL = "https://api.x.ai/v1/chat/completions"
 
+SYSTEM_PROMPT = (
+    "You are a precise translator and editor. "
+    "Task: translate the user's text to clear, natural English and improve grammar, "
+    "tone, and flow while preserving meaning. If the input is already in English, "
+    "just improve clarity and correctness. Return only the improved text."
+)
+
+def _post_chat(payload: Dict[str, Any], timeout: int) -> requests.Response:
+    """
+    POST a chat completions payload and return the (possibly streaming) response.
+    """
+    api_key = settings().xai_api_key  # XAI_API_KEY, from the env or the YAML config
+    if not api_key:
+        raise RuntimeError("Missing XAI_API_KEY environment variable.")
+
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
+
+    # Sampled traces keep a redacted copy (no message text, no key)
+    tracer.capture("xai.request", payload)
+
+    try:
+        resp = requests.post(
+            XAI_CHAT_URL, headers=headers, json=payload, stream=payload["stream"], timeout=timeout
+        )
+        if resp.status_code != 200:
+            tracer.capture("xai.error", {"status": resp.status_code, "body": resp.text})
+        resp.raise_for_status()
+    except requests.HTTPError as e:
+        # The body can echo the prompt: keep only the status and error code
+        raise requests.HTTPError(
+            f"xAI request failed: HTTP {resp.status_code} ({_error_code(resp)})", response=resp
+        ) from e
+    return resp
+
+
+def _error_code(resp: requests.Response) -> str:
+    """The API's error code from an error response, without its message."""
+    try:
+        body = resp.json()
+    except ValueError:
+        return "no error code"
+    if not isinstance(body, dict):
+        return "no error code"
+    error = body.get("error")
+    code = (error.get("code") or error.get("type")) if isinstance(error, dict) else body.get("code")
+    return str(code)[:64] if code else "no error code"
+
+
+def _record_usage(model: str, usage: Dict[str, Any]):
+    record_tokens("grok", model, usage.get("prompt_tokens"), usage.get("completion_tokens"))
+
+
+def grok_chat_stream(
+    messages: List[Dict[str, str]],
+    model: str = "grok",
+    temperature: float = 0.0,
+    timeout: int = 60,
+    max_tokens: int | None = None,
+) -> Iterator[str]:
+    """
+    Stream a Grok chat completion, yielding text deltas as they arrive.
+
+    Args:
+        messages: list of {"role": "system"|"user"|"assistant", "content": "..."}
+        model: Model name (e.g., "grok").
+        temperature: Controls randomness (0.0 = deterministic).
+        timeout: Request timeout in seconds.
+        max_tokens: Optional cap on generated tokens.
+
+    Yields:
+        Content deltas (Server-Sent Events) in order.
+    """
+    payload: Dict[str, Any] = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "stream": True,
+        # The last chunk then carries the token usage
+        "stream_options": {"include_usage": True},
+    }
+    if max_tokens:
+        payload["max_tokens"] = max_tokens
+    resp = _post_chat(payload, timeout)
+
+    with resp:
+        # Decode the raw chunks as they arrive; only typed deltas come out
+        for event in chat_events(iter_events(resp.iter_content(chunk_size=None))):
+            if isinstance(event, ContentDelta):
+                yield event.text
+            elif isinstance(event, UsageDelta):
+                record_tokens("grok", model, event.prompt_tokens, event.completion_tokens)
+            elif isinstance(event, FinishDelta):
+                if event.reason == "length":
+                    logger.warning("Grok output cut at max_tokens=%s", max_tokens)
+            elif isinstance(event, ParseError):
+                # Reported, never mixed into the user's text
+                LLM_STREAM_PARSE_ERRORS.labels("grok").inc()
+                logger.warning("Skipping malformed xAI stream event: %s", event.error)
+                tracer.capture("xai.parse_error", {
+                    "error": event.error, "raw": event.raw.decode("utf-8", "replace"),
+                })
+
+
 def grok_chat(
     messages: List[Dict[str, str]],
     model: str = "grok",  # Changed to a safer default, adjust based on xAI API docs
     temperature: float = 0.0,
     stream: bool = False,
     timeout: int = 60,
+    on_delta: Callable[[str], None] | None = None,
+    response_format: Dict[str, Any] | None = None,
+    max_tokens: int | None = None,
 ) -> str:
     """
     Call x.ai (Grok) chat completions API.
@@ -23,93 +138,88 @@ def grok_chat(
         temperature: Controls randomness (0.0 = deterministic).
         stream: If True, streams response chunks.
         timeout: Request timeout in seconds.
+        on_delta: With stream=True, called with each text delta as it arrives.
+            Defaults to printing chunks to stdout.
+        response_format: Optional structured-output spec (non-streaming only).
+        max_tokens: Optional cap on generated tokens.
 
     Returns:
-        The full response text. If stream=True, prints chunks to stdout.
+        The full response text.
 
     Raises:
         RuntimeError: If XAI_API_KEY is not set.
         requests.HTTPError: If the API request fails.
     """
-    if not XAI_API_KEY:
-        raise RuntimeError("Missing XAI_API_KEY environment variable.")
-
-    headers = {
-        "Authorization": f"Bearer {XAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
-    payload: Dict[str, Any] = {
-        "model": model,
-        "messages": messages,
-        "temperature": temperature,
-        "stream": stream,
-    }
-
-    # Debug: Print the request payload
-    print("Request Payload:", json.dumps(payload, indent=2))
-
-    try:
-        resp = requests.post(XAI_CHAT_URL, headers=headers, json=payload, stream=stream, timeout=timeout)
-        # Debug: Print status and response text if not 200
-        if resp.status_code != 200:
-            print(f"Response Status: {resp.status_code}")
-            print(f"Response Text: {resp.text}")
-        resp.raise_for_status()
-    except requests.HTTPError as e:
-        raise requests.HTTPError(f"HTTP Error: {e}. Response: {e.response.text}")
-
     if not stream:
-        data = resp.json()
+        payload: Dict[str, Any] = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "stream": False,
+        }
+        if response_format is not None:
+            payload["response_format"] = response_format
+        if max_tokens:
+            payload["max_tokens"] = max_tokens
+        data = _post_chat(payload, timeout).json()
+        if data.get("usage"):
+            _record_usage(model, data["usage"])
         return data["choices"][0]["message"]["content"]
 
-    # Streaming (Server-Sent Events)
     output = []
-    for raw_line in resp.iter_lines(decode_unicode=True):
-        if not raw_line:
-            continue
-
-        line = raw_line.strip()
-        if line.startswith("data:"):
-            line = line[len("data:"):].strip()
-
-        if line == "[DONE]":
-            break
-
-        try:
-            obj = json.loads(line)
-            delta = obj.get("choices", [{}])[0].get("delta", {}).get("content", "")
-            if not delta:
-                delta = obj.get("choices", [{}])[0].get("text", "")
-            if not delta:
-                delta = obj.get("choices", [{}])[0].get("message", {}).get("content", "")
-        except Exception:
-            delta = line
-
-        if delta:
+    for delta in grok_chat_stream(
+        messages, model=model, temperature=temperature, timeout=timeout, max_tokens=max_tokens
+    ):
+        if on_delta is not None:
+            on_delta(delta)
+        else:
             sys.stdout.write(delta)
             sys.stdout.flush()
-            output.append(delta)
+        output.append(delta)
 
     return "".join(output)
 
 
-def rephrasely_method(prompt: str, model: str = "grok", stream: bool = False) -> str:
+def rephrasely_method(
+    prompt: str,
+    model: str = "grok",
+    stream: bool = False,
+    on_delta: Callable[[str], None] | None = None,
+    variants: Sequence[str] | None = None,
+    max_tokens: int | None = None,
+) -> str | Dict[str, str]:
     """
     Translate and improve the given prompt using Grok.
     Adjust the system prompt to your taste.
+    With stream=True, `on_delta` receives the text as it is generated.
+    With `variants` (tones such as "formal", "casual"), a single structured-output
+    call returns a dict mapping each tone to its version.
+    `max_tokens` bounds the length of the generated answer.
     """
-    system_prompt = (
-        "You are a precise translator and editor. "
-        "Task: translate the user's text to clear, natural English and improve grammar, "
-        "tone, and flow while preserving meaning. If the input is already in English, "
-        "just improve clarity and correctness. Return only the improved text."
-    )
+    if variants:
+        tones = tuple(variants)
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": variants_prompt(prompt, tones)},
+        ]
+        response_format = {
+            "type": "json_schema",
+            "json_schema": {"name": "variants", "schema": variants_schema(tones), "strict": True},
+        }
+        text = grok_chat(
+            messages=messages, model=model, temperature=0, response_format=response_format,
+            max_tokens=max_tokens,
+        )
+        return parse_variants(text, tones)
 
     messages = [
-        {"role": "system", "content": system_prompt},
+        {"role": "system", "content": SYSTEM_PROMPT},
         {"role": "user", "content": prompt},
     ]
 
-    return grok_chat(messages=messages, model=model, temperature=0, stream=stream)
+    return grok_chat(
+        messages=messages, model=model, temperature=0, stream=stream, on_delta=on_delta,
+        max_tokens=max_tokens,
+    )
 
 
@@ -0,0 +1,161 @@
+""" Local, dependency-free classification of the text to rephrase.
+- Detects the dominant script and, for Latin text, whether it reads as
+  English (stopword ratio, no foreign diacritics). Short text only counts
+  as English with an English function word in it; anything else goes to
+  the small tier rather than being skipped.
+- Skips the LLM only for text whose rephrase is known to be the text itself:
+  an exact allow-list of very short replies ("Thanks!", "Sounds good.").
+  Looking clean (capitalized, punctuated, no chat shorthand) says nothing
+  about grammar, spelling or language, so skipping such text is opt-in
+  (`skip_max_words`).
+- Picks a tier: "skip", "small" (fast model) or "strong", and a
+  `max_tokens` budget derived from the input length.
+"""
+import re
+import unicodedata
+from dataclasses import dataclass
+
+TIER_SKIP = "skip"
+TIER_SMALL = "small"
+TIER_STRONG = "strong"
+
+_WORD = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?", re.UNICODE)
+
+_ENGLISH_WORDS = frozenset("""
+a about after all also am an and any are as at be because been but by can could
+did do does for from get got had has have he her here him his how i if in into is
+it its just know let like me more my no not now of on one or our out please so
+some that the their them then there these they this to up us was we well were
+what when where which who will with would you your thanks thank hi hello
+""".split())
+
+# Frequent words of other languages seen in our traffic (es, pt, fr, it, de)
+_FOREIGN_WORDS = frozenset("""
+el la los las que de del en un una por para con es no lo le se su al como pero
+muy esta este estoy hola gracias buenos dias o e um uma com não você obrigado
+le les des est et je tu il nous vous pas avec pour bonjour merci il di che per
+non sono ciao grazie der die das und ist nicht ich du mit sie wir danke hallo
+buenas buenos tardes noches bien listo bom boa dia tudo bem guten morgen
+""".split())
+
+# Chat shorthand and contractions written without an apostrophe
+_SLOPPY_WORDS = frozenset("""
+u ur r thx thnx pls plz ppl cuz bc idk imo btw wanna gonna gotta lemme ya yea
+dont cant wont isnt doesnt didnt wasnt arent havent hasnt shouldnt wouldnt
+couldnt im ive youre theyre thats whats lets teh recieve seperate definately
+""".split())
+
+# Replies the LLM would return unchanged; matched exactly (case and punctuation included)
+SKIP_PHRASES = frozenset({
+    "Thanks!", "Thanks.", "Thank you!", "Thank you.", "Thanks a lot!",
+    "OK.", "Ok.", "Okay.", "Yes.", "No.", "Sure.", "Sure!", "Done.", "Done!",
+    "Got it.", "Got it!", "Sounds good.", "Sounds good!", "Will do.", "Great!", "Perfect!",
+    "Good morning!", "Good morning.", "Good night!", "See you tomorrow.", "Welcome!",
+})
+
+# Letters that are not used in English words
+_FOREIGN_LETTERS = set("áéíóúñ¿¡ãõçàèìòùâêîôûäöüßœæ")
+
+
+@dataclass(frozen=True)
+class InputProfile:
+    """What the classifier found out about one input."""
+    chars: int
+    words: int
+    script: str
+    english: bool
+    clean: bool
+    tier: str
+    max_tokens: int
+
+
+def dominant_script(text: str) -> str:
+    """'latin', 'cyrillic', 'greek', 'arabic', 'hebrew', 'cjk', ... or 'none'."""
+    counts: dict[str, int] = {}
+    for ch in text:
+        if not ch.isalpha():
+            continue
+        name = unicodedata.name(ch, "")
+        if name.startswith(("CJK", "HIRAGANA", "KATAKANA", "HANGUL")):
+            script = "cjk"
+        else:
+            script = name.split(" ", 1)[0].lower() or "other"
+        counts[script] = counts.get(script, 0) + 1
+    return max(counts, key=counts.get) if counts else "none"
+
+
+def estimate_tokens(text: str, script: str | None = None) -> int:
+    """Rough token count: ~4 chars per token for Latin text, ~1 per char for CJK."""
+    script = script or dominant_script(text)
+    if script == "cjk":
+        return len(text)
+    if script == "latin" or script == "none":
+        return len(text) // 4 + 1
+    return len(text) // 2 + 1
+
+
+def output_budget(text: str, ratio: float = 1.5, min_tokens: int = 64, max_tokens: int = 4096,
+                  script: str | None = None) -> int:
+    """max_tokens for rephrasing `text`: its estimated size * ratio, plus headroom."""
+    return min(max_tokens, int(estimate_tokens(text, script) * ratio) + min_tokens)
+
+
+def looks_english(words: list[str], text: str) -> bool:
+    """
+    Mostly English function words and no letters foreign to English.
+    Needs positive evidence: text without any English function word (e.g.
+    "Buenas tardes.") is never treated as English, however short.
+    """
+    if any(ch in _FOREIGN_LETTERS for ch in text.lower()):
+        return False
+    english = sum(1 for w in words if w in _ENGLISH_WORDS)
+    foreign = sum(1 for w in words if w in _FOREIGN_WORDS and w not in _ENGLISH_WORDS)
+    if not english:
+        return False
+    if len(words) <= 3:
+        # Too short for a ratio: any foreign function word rules it out
+        return not foreign and text.isascii()
+    return english > foreign and english / len(words) >= 0.2
+
+
+def looks_clean(words: list[str], text: str) -> bool:
+    """No chat shorthand, capitalized sentences, sane punctuation and spacing."""
+    stripped = text.strip()
+    if not stripped or any(w in _SLOPPY_WORDS for w in words):
+        return False
+    if re.search(r"\bi\b", stripped) or re.search(r"[!?.,]{2,}|\s{2,}| [,.!?]", stripped.replace("...", "…")):
+        return False
+    if re.search(r"[a-z]", stripped[0]) or re.search(r"[.!?]\s+[a-z]", stripped):
+        return False
+    return stripped[-1] in ".!?…)\"'" or len(words) <= 3
+
+
+def classify(text: str, skip_max_words: int = 0, small_max_words: int = 30,
+             output_ratio: float = 1.5, min_tokens: int = 64, max_tokens: int = 4096) -> InputProfile:
+    """
+    Classify `text` and choose a tier.
+
+    Args:
+        skip_max_words: Clean-looking English up to this many words is returned
+            as is, unchecked (0 = only SKIP_PHRASES are).
+        small_max_words: Other inputs up to this many words use the small tier.
+        output_ratio: max_tokens = estimated input tokens * ratio (+ min_tokens).
+        min_tokens / max_tokens: Bounds for the generation budget.
+    """
+    text = text or ""
+    words = [w.lower() for w in _WORD.findall(text)]
+    script = dominant_script(text)
+    english = script in ("latin", "none") and looks_english(words, text)
+    clean = english and looks_clean(words, text)
+
+    if not words or text.strip() in SKIP_PHRASES or (clean and len(words) <= skip_max_words):
+        tier = TIER_SKIP
+    elif len(words) <= small_max_words and script != "cjk":
+        tier = TIER_SMALL
+    else:
+        tier = TIER_STRONG
+
+    return InputProfile(
+        chars=len(text), words=len(words), script=script, english=english, clean=clean,
+        tier=tier, max_tokens=output_budget(text, output_ratio, min_tokens, max_tokens, script),
+    )
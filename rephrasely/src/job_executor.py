@@ -0,0 +1,223 @@
+""" Bounded worker pool for background rephrase jobs.
+- A fixed number of worker threads pull jobs from a bounded queue.
+- Jobs are grouped by a fair-share key (user or channel) and served
+  round-robin across keys, so one busy user cannot starve everyone else.
+- When the queue is full, `submit` raises `QueueFullError` so the caller
+  can show an overload message instead of piling up more work.
+"""
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from rephrasely.src.metrics import QUEUE_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the executor queue has no room for another job."""
+
+
+@dataclass(eq=False)
+class Job:
+    """A unit of background work plus its timing information."""
+    key: str
+    fn: Callable[..., Any]
+    args: tuple = ()
+    kwargs: dict = field(default_factory=dict)
+    ahead: int = 0
+    cancelled: bool = False
+    enqueued_at: float = field(default_factory=time.monotonic)
+    started_at: float | None = None
+    finished_at: float | None = None
+    error: Exception | None = None
+    # The submitter's context (e.g. its trace), restored in the worker thread
+    context: contextvars.Context = field(default_factory=contextvars.copy_context, repr=False)
+
+    @property
+    def wait_time(self) -> float | None:
+        """Seconds the job spent queued before a worker picked it up."""
+        if self.started_at is None:
+            return None
+        return self.started_at - self.enqueued_at
+
+
+class JobExecutor:
+    """
+    Fixed-size thread pool with a bounded, fair-share queue.
+
+    Args:
+        workers: Number of worker threads (max concurrent jobs).
+        max_queue: Max number of jobs waiting for a worker.
+        name: Prefix for worker thread names.
+    """
+
+    def __init__(self, workers: int = 4, max_queue: int = 64, name: str = "rephrasely"):
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        if max_queue < 0:
+            raise ValueError("max_queue must be >= 0")
+
+        self.workers = workers
+        self.max_queue = max_queue
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._queues: dict[str, deque[Job]] = {}
+        self._ring: deque[str] = deque()  # keys with pending jobs, in service order
+        self._pending = 0
+        self._busy = 0
+        self._shutdown = False
+
+        # Stats
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._cancelled = 0
+        self._max_depth = 0
+        self._waits: deque[float] = deque(maxlen=256)
+
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"{name}-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, key: str, fn: Callable[..., Any], *args, **kwargs) -> Job:
+        """
+        Queue `fn(*args, **kwargs)` under the given fair-share key.
+        Raises QueueFullError if the queue is at capacity.
+        """
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("Executor is shut down.")
+            idle = self.workers - self._busy - self._pending
+            if idle <= 0 and self._pending >= self.max_queue:
+                self._rejected += 1
+                raise QueueFullError(
+                    f"Job queue is full ({self._pending}/{self.max_queue} waiting)."
+                )
+
+            job = Job(key=key or "", fn=fn, args=args, kwargs=kwargs)
+            job.ahead = max(0, -idle)
+
+            queue = self._queues.get(job.key)
+            if queue is None:
+                queue = self._queues[job.key] = deque()
+                self._ring.append(job.key)
+            queue.append(job)
+
+            self._pending += 1
+            self._submitted += 1
+            self._max_depth = max(self._max_depth, self._pending)
+            self._not_empty.notify()
+            return job
+
+    def is_full(self) -> bool:
+        """True if a new job would be rejected right now."""
+        with self._lock:
+            idle = self.workers - self._busy - self._pending
+            return idle <= 0 and self._pending >= self.max_queue
+
+    def cancel(self, job: Job) -> bool:
+        """
+        Drop a job that is still queued. Returns False if it already started.
+        """
+        with self._lock:
+            if job.started_at is not None or job.cancelled:
+                return False
+            queue = self._queues.get(job.key)
+            if queue is None or job not in queue:
+                return False
+            queue.remove(job)
+            if not queue:
+                del self._queues[job.key]
+                self._ring.remove(job.key)
+            job.cancelled = True
+            self._pending -= 1
+            self._cancelled += 1
+            return True
+
+    def ahead(self) -> int:
+        """How many queued jobs a new submission would wait behind."""
+        with self._lock:
+            return max(0, self._busy + self._pending - self.workers)
+
+    def stats(self) -> dict[str, Any]:
+        """Snapshot of queue depth, worker usage and wait times (seconds)."""
+        with self._lock:
+            waits = sorted(self._waits)
+            return {
+                "workers": self.workers,
+                "busy": self._busy,
+                "queue_depth": self._pending,
+                "max_queue_depth": self._max_depth,
+                "queue_capacity": self.max_queue,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "cancelled": self._cancelled,
+                "wait_avg": sum(waits) / len(waits) if waits else 0.0,
+                "wait_p95": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+                "wait_max": waits[-1] if waits else 0.0,
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting jobs; workers exit once the queue is drained."""
+        with self._lock:
+            self._shutdown = True
+            self._not_empty.notify_all()
+        if wait:
+            for t in self._threads:
+                t.join()
+
+    def _next_job(self) -> Job | None:
+        """Pop the next job in round-robin key order. Caller holds the lock."""
+        while not self._ring:
+            if self._shutdown:
+                return None
+            self._not_empty.wait()
+
+        key = self._ring.popleft()
+        queue = self._queues[key]
+        job = queue.popleft()
+        if queue:
+            self._ring.append(key)
+        else:
+            del self._queues[key]
+        self._pending -= 1
+        return job
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                job = self._next_job()
+                if job is None:
+                    return
+                self._busy += 1
+                job.started_at = time.monotonic()
+                self._waits.append(job.wait_time)
+            QUEUE_WAIT_SECONDS.labels("executor").observe(job.wait_time)
+
+            try:
+                job.context.run(job.fn, *job.args, **job.kwargs)
+            # pylint: disable=broad-except
+            except Exception as e:
+                job.error = e
+                logger.exception("Background job failed (key=%s)", job.key)
+            finally:
+                job.finished_at = time.monotonic()
+                with self._lock:
+                    self._busy -= 1
+                    if job.error is None:
+                        self._completed += 1
+                    else:
+                        self._failed += 1
@@ -0,0 +1,219 @@
+""" Durable job queue shared by web and LLM worker processes.
+- Jobs live in a SQLite database in WAL mode, so any number of processes
+  on one box can enqueue and lease concurrently.
+- A worker leases one job at a time for `visibility_timeout` seconds and
+  keeps it alive with `heartbeat`; if the worker dies, the lease expires
+  and another worker picks the job up.
+- Failed jobs are retried after `retry_delay` until `max_attempts`, then
+  marked dead. Closing the modal marks the job cancelled.
+"""
+import os
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+DEAD = "dead"
+CANCELLED = "cancelled"
+
+
+@dataclass
+class QueuedJob:
+    """A leased job, as seen by a worker."""
+    id: int
+    view_id: str
+    channel: str
+    text: str
+    model: str
+    team_id: str
+    user_id: str
+    attempts: int
+    created: float
+
+    @property
+    def wait_time(self) -> float:
+        """Seconds since the job was enqueued."""
+        return time.time() - self.created
+
+
+def worker_id() -> str:
+    """Lease owner name for the calling thread: host:pid:thread."""
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+class DurableJobQueue:
+    """
+    SQLite-backed queue with leases, visibility timeouts and retry counts.
+
+    Args:
+        db_path: SQLite file shared by every process.
+        visibility_timeout: Seconds a lease lasts without a heartbeat.
+        max_attempts: Leases per job before it is marked dead.
+        retry_delay: Seconds before a failed job becomes available again.
+        max_queued: Max jobs waiting (0 = unbounded), see `is_full`.
+    """
+
+    def __init__(self, db_path: str, visibility_timeout: float = 120.0, max_attempts: int = 3,
+                 retry_delay: float = 5.0, max_queued: int = 0):
+        self.path = Path(db_path).expanduser()
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self.max_queued = max_queued
+
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = self._db()
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " view_id TEXT NOT NULL, channel TEXT NOT NULL, text TEXT NOT NULL,"
+            " model TEXT NOT NULL DEFAULT '',"
+            " team_id TEXT NOT NULL DEFAULT '', user_id TEXT NOT NULL DEFAULT '',"
+            " status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0,"
+            " lease_owner TEXT, lease_until REAL, available_at REAL NOT NULL,"
+            " created REAL NOT NULL, updated REAL NOT NULL, error TEXT)"
+        )
+        columns = {row[1] for row in db.execute("PRAGMA table_info(jobs)")}
+        for column in ("team_id", "user_id"):
+            if column not in columns:
+                db.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT NOT NULL DEFAULT ''")
+        db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, available_at)")
+        db.execute("CREATE INDEX IF NOT EXISTS jobs_view ON jobs (view_id)")
+
+    def enqueue(self, view_id: str, channel: str, text: str, model: str = "",
+                team_id: str = "", user_id: str = "") -> int:
+        """Add a job and return its id. (team_id, user_id) select the Slack token."""
+        now = time.time()
+        cur = self._db().execute(
+            "INSERT INTO jobs (view_id, channel, text, model, team_id, user_id, status,"
+            " available_at, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (view_id, channel, text, model, team_id, user_id, QUEUED, now, now, now),
+        )
+        return cur.lastrowid
+
+    def depth(self) -> int:
+        """Jobs waiting for a worker."""
+        row = self._db().execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()
+        return row[0]
+
+    def is_full(self) -> bool:
+        return bool(self.max_queued) and self.depth() >= self.max_queued
+
+    def lease(self, owner: str, model: str | None = None) -> QueuedJob | None:
+        """
+        Lease the oldest available job (optionally only for `model`).
+        Jobs whose lease expired are leased again, or marked dead when out
+        of attempts.
+        """
+        now = time.time()
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute(
+                "UPDATE jobs SET status = ?, error = 'lease expired', updated = ?"
+                " WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                (DEAD, now, LEASED, now, self.max_attempts),
+            )
+            query = (
+                "SELECT id, view_id, channel, text, model, team_id, user_id, attempts, created FROM jobs"
+                " WHERE ((status = ? AND available_at <= ?) OR (status = ? AND lease_until < ?))"
+            )
+            args: list[Any] = [QUEUED, now, LEASED, now]
+            if model is not None:
+                query += " AND model = ?"
+                args.append(model)
+            row = db.execute(query + " ORDER BY id LIMIT 1", args).fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return None
+            db.execute(
+                "UPDATE jobs SET status = ?, lease_owner = ?, lease_until = ?,"
+                " attempts = attempts + 1, updated = ? WHERE id = ?",
+                (LEASED, owner, now + self.visibility_timeout, now, row[0]),
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        job = QueuedJob(*row)
+        job.attempts += 1
+        return job
+
+    def heartbeat(self, job_id: int, owner: str) -> bool:
+        """
+        Extend the lease. Returns False if the job was cancelled or the lease
+        was lost to another worker; the caller should stop working on it.
+        """
+        now = time.time()
+        cur = self._db().execute(
+            "UPDATE jobs SET lease_until = ?, updated = ?"
+            " WHERE id = ? AND status = ? AND lease_owner = ?",
+            (now + self.visibility_timeout, now, job_id, LEASED, owner),
+        )
+        return cur.rowcount == 1
+
+    def complete(self, job_id: int, owner: str) -> bool:
+        return self._finish(job_id, owner, DONE, None)
+
+    def fail(self, job_id: int, owner: str, error: str) -> bool:
+        """Make the job available again after `retry_delay`, or dead when out of attempts."""
+        now = time.time()
+        cur = self._db().execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END,"
+            " available_at = ?, lease_owner = NULL, lease_until = NULL, error = ?, updated = ?"
+            " WHERE id = ? AND status = ? AND lease_owner = ?",
+            (self.max_attempts, DEAD, QUEUED, now + self.retry_delay, error, now,
+             job_id, LEASED, owner),
+        )
+        return cur.rowcount == 1
+
+    def cancel(self, view_id: str) -> bool:
+        """Cancel the queued or leased job for `view_id`; its worker notices on heartbeat."""
+        cur = self._db().execute(
+            "UPDATE jobs SET status = ?, updated = ? WHERE view_id = ? AND status IN (?, ?)",
+            (CANCELLED, time.time(), view_id, QUEUED, LEASED),
+        )
+        return cur.rowcount > 0
+
+    def purge(self, older_than: float = 24 * 3600) -> int:
+        """Delete finished jobs older than `older_than` seconds."""
+        cur = self._db().execute(
+            "DELETE FROM jobs WHERE status IN (?, ?, ?) AND updated < ?",
+            (DONE, DEAD, CANCELLED, time.time() - older_than),
+        )
+        return cur.rowcount
+
+    def stats(self) -> dict[str, Any]:
+        """Job counts per status and the age of the oldest queued job."""
+        db = self._db()
+        counts = dict(db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        oldest = db.execute("SELECT MIN(created) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+        return {
+            **{status: counts.get(status, 0) for status in (QUEUED, LEASED, DONE, DEAD, CANCELLED)},
+            "oldest_queued_age": time.time() - oldest if oldest else 0.0,
+        }
+
+    def _finish(self, job_id: int, owner: str, status: str, error: str | None) -> bool:
+        cur = self._db().execute(
+            "UPDATE jobs SET status = ?, lease_owner = NULL, lease_until = NULL, error = ?,"
+            " updated = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+            (status, error, time.time(), job_id, LEASED, owner),
+        )
+        return cur.rowcount == 1
+
+    def _db(self) -> sqlite3.Connection:
+        """One autocommit connection per thread."""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
@@ -0,0 +1,466 @@
+""" LLM provider abstraction and a latency-aware router.
+- Each backend (Grok, Ollama) is wrapped in an `LLMProvider`.
+- `LLMRouter` keeps rolling latency (p50/p95) and error-rate stats per
+  provider, tries the fastest healthy one first, optionally sends a hedged
+  request to the next one after a latency threshold, and fails over when a
+  provider errors or times out.
+- Every attempt's latency, time to first token and in-flight count are
+  recorded per provider/model in `metrics`, and as an "llm" span on the
+  caller's trace.
+"""
+import contextvars
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from rephrasely.src.cancellation import CancelToken, JobCancelled
+from rephrasely.src.metrics import LLM_IN_FLIGHT, LLM_SECONDS, LLM_TTFT_SECONDS
+from rephrasely.src.tracing import tracer
+from rephrasely.src.variants import parse_variants, variants_prompt
+
+logger = logging.getLogger(__name__)
+
+
+class LLMProvider:
+    """
+    Base class for an LLM backend. Subclasses implement `rephrase`.
+    """
+    name = "base"
+
+    def __init__(self, model: str, system_prompt: str = ""):
+        self.model = model
+        self.system_prompt = system_prompt
+
+    @property
+    def key(self) -> str:
+        """Stable id used for stats and cache keys."""
+        return f"{self.name}:{self.model}"
+
+    def is_ready(self) -> bool:
+        """False while the backend cannot take traffic (e.g. model still loading)."""
+        return True
+
+    def rephrase(self, prompt: str, on_delta: Callable[[str], None] | None = None,
+                 max_tokens: int | None = None) -> str:
+        raise NotImplementedError
+
+    def rephrase_variants(self, prompt: str, tones: tuple[str, ...],
+                          max_tokens: int | None = None) -> dict[str, str]:
+        """One call returning a version per tone (parsed from the model's JSON answer)."""
+        return parse_variants(
+            self.rephrase(variants_prompt(prompt, tones), max_tokens=max_tokens), tones
+        )
+
+
+class GrokProvider(LLMProvider):
+    """xAI chat completions (see grok_llm_rephrasely)."""
+    name = "grok"
+
+    def __init__(self, model: str = "grok"):
+        # pylint: disable=import-outside-toplevel
+        from rephrasely.src import grok_llm_rephrasely
+        super().__init__(model, grok_llm_rephrasely.SYSTEM_PROMPT)
+        self._module = grok_llm_rephrasely
+
+    def rephrase(self, prompt: str, on_delta: Callable[[str], None] | None = None,
+                 max_tokens: int | None = None) -> str:
+        return self._module.rephrasely_method(
+            prompt, model=self.model, stream=on_delta is not None, on_delta=on_delta,
+            max_tokens=max_tokens,
+        )
+
+    def rephrase_variants(self, prompt: str, tones: tuple[str, ...],
+                          max_tokens: int | None = None) -> dict[str, str]:
+        # Uses xAI structured output instead of prompt-only JSON
+        return self._module.rephrasely_method(
+            prompt, model=self.model, variants=tones, max_tokens=max_tokens
+        )
+
+
+class OllamaProvider(LLMProvider):
+    """Local Ollama server (see ollama_llm_rephrasely). The prompt lives in the model."""
+    name = "ollama"
+
+    def __init__(self, model: str = "grammar-translator-llama3.2"):
+        # pylint: disable=import-outside-toplevel
+        from rephrasely.src import ollama_llm_rephrasely
+        super().__init__(model)
+        self._module = ollama_llm_rephrasely
+        self.lifecycle = None  # optional OllamaModelManager
+        self.scheduler = None  # optional OllamaScheduler
+        self.generation_stats: deque = deque(maxlen=100)
+
+    def is_ready(self) -> bool:
+        return self.lifecycle is None or self.lifecycle.is_ready(self.model)
+
+    def tokens_per_second(self) -> float:
+        """Average generation speed over recent requests."""
+        rates = [s.tokens_per_second for s in list(self.generation_stats) if s.eval_duration]
+        return sum(rates) / len(rates) if rates else 0.0
+
+    def rephrase(self, prompt: str, on_delta: Callable[[str], None] | None = None,
+                 max_tokens: int | None = None) -> str:
+        if self.scheduler is not None:
+            return self.scheduler.run(self._generate, prompt, on_delta, max_tokens)
+        return self._generate(prompt, on_delta, max_tokens)
+
+    def _generate(self, prompt: str, on_delta: Callable[[str], None] | None,
+                  max_tokens: int | None = None) -> str:
+        keep_alive = self.lifecycle.keep_alive if self.lifecycle is not None else None
+        return self._module.rephrasely_method(
+            prompt, model=self.model, stream=on_delta is not None, keep_alive=keep_alive,
+            on_delta=on_delta, on_stats=self._on_stats, max_tokens=max_tokens,
+        )
+
+    def _on_stats(self, stats):
+        self.generation_stats.append(stats)
+        if self.scheduler is not None:
+            self.scheduler.record_tokens(stats.eval_count)
+
+
+PROVIDER_TYPES = {cls.name: cls for cls in (GrokProvider, OllamaProvider)}
+
+
+def providers_from_spec(spec: str) -> list[LLMProvider]:
+    """
+    Build providers from a comma-separated "name[:model]" list,
+    e.g. "grok:grok-3-latest,ollama".
+    """
+    providers = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, model = item.partition(":")
+        cls = PROVIDER_TYPES.get(name)
+        if cls is None:
+            raise ValueError(f"Unknown LLM provider: {name!r} (known: {sorted(PROVIDER_TYPES)})")
+        providers.append(cls(model) if model else cls())
+    return providers
+
+
+class ProviderStats:
+    """Rolling latency and error window for one provider."""
+
+    def __init__(self, window: int = 100):
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.outcomes: deque[bool] = deque(maxlen=window)  # True = error
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.hedges = 0
+        self.wins = 0
+
+    def percentile(self, q: float) -> float | None:
+        if not self.latencies:
+            return None
+        lat = sorted(self.latencies)
+        return lat[int(q * (len(lat) - 1))]
+
+    @property
+    def error_rate(self) -> float:
+        return sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "wins": self.wins,
+            "hedges": self.hedges,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "error_rate": self.error_rate,
+            "consecutive_failures": self.consecutive_failures,
+            "cooling_down": self.cooldown_until > time.monotonic(),
+        }
+
+
+# How often a cancellable request re-checks its CancelToken while waiting
+CANCEL_POLL_INTERVAL = 0.25
+
+
+@dataclass
+class RouteResult:
+    output: Any  # text, or tone -> text for variants
+    provider: LLMProvider
+    latency: float
+
+
+class AllProvidersFailed(RuntimeError):
+    """Raised when every provider errored or timed out."""
+
+
+class LLMRouter:
+    """
+    Picks a provider per request and handles hedging and failover.
+
+    Args:
+        providers: Backends in preference order (used until stats exist).
+        hedge_after: Seconds before a hedged request goes to the next
+            provider (None/0 disables hedging).
+        attempt_timeout: Seconds before an attempt counts as failed.
+        failure_threshold: Consecutive failures that put a provider in cooldown.
+        cooldown: Seconds an unhealthy provider is skipped.
+        min_samples: Latency samples needed before stats affect ordering.
+    """
+
+    def __init__(
+        self,
+        providers: list[LLMProvider],
+        hedge_after: float | None = None,
+        attempt_timeout: float = 60.0,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        min_samples: int = 5,
+    ):
+        if not providers:
+            raise ValueError("LLMRouter needs at least one provider")
+        self.providers = list(providers)
+        self.hedge_after = hedge_after
+        self.attempt_timeout = attempt_timeout
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.min_samples = min_samples
+
+        self._lock = threading.Lock()
+        self._stats = {p.key: ProviderStats() for p in self.providers}
+
+    def candidates(self) -> list[LLMProvider]:
+        """Healthy providers first, fastest (p50 weighted by error rate) first."""
+        now = time.monotonic()
+        with self._lock:
+            def score(p: LLMProvider) -> float:
+                s = self._stats[p.key]
+                if len(s.latencies) < self.min_samples:
+                    return 0.0
+                return s.percentile(0.5) * (1 + 4 * s.error_rate)
+
+            healthy, unhealthy = [], []
+            for p in self.providers:
+                ok = self._stats[p.key].cooldown_until <= now and p.is_ready()
+                (healthy if ok else unhealthy).append(p)
+            healthy.sort(key=score)
+        # Unhealthy providers are still a last resort
+        return healthy + unhealthy
+
+    def rephrase(self, prompt: str, on_delta: Callable[[str], None] | None = None,
+                 candidates: list[LLMProvider] | None = None,
+                 cancel: CancelToken | None = None,
+                 max_tokens: int | None = None) -> RouteResult:
+        """
+        Run the prompt on the best provider, hedging/failing over as configured.
+        Only one provider at a time forwards deltas to `on_delta`; see `route`.
+        """
+        return self.route(
+            lambda provider, deltas: provider.rephrase(prompt, on_delta=deltas, max_tokens=max_tokens),
+            on_delta=on_delta, candidates=candidates, cancel=cancel,
+        )
+
+    def rephrase_variants(self, prompt: str, tones: tuple[str, ...],
+                          candidates: list[LLMProvider] | None = None,
+                          cancel: CancelToken | None = None,
+                          max_tokens: int | None = None) -> RouteResult:
+        """Like `rephrase`, but returns a tone -> text dict from one call."""
+        return self.route(
+            lambda provider, _: provider.rephrase_variants(prompt, tones, max_tokens=max_tokens),
+            candidates=candidates, cancel=cancel,
+        )
+
+    def route(self, call: Callable[[LLMProvider, Any], Any],
+              on_delta: Callable[[str], None] | None = None,
+              candidates: list[LLMProvider] | None = None,
+              cancel: CancelToken | None = None) -> RouteResult:
+        """
+        Run `call(provider, on_delta)` on the best provider, with hedging and failover.
+        If `cancel` fires, streaming attempts are aborted at their next delta,
+        other attempts are abandoned, and JobCancelled is raised.
+        No delta reaches `on_delta` once this returns or raises: attempts
+        still streaming (hedge losers, timed-out attempts) are stopped at
+        their next delta.
+        The first attempt to stream owns `on_delta`. If it errors or times
+        out, the next attempt to stream takes over: `on_delta.reset()` is
+        called when defined, then that attempt's text so far is replayed.
+        """
+        pending = list(candidates or self.candidates())
+        results: queue.Queue = queue.Queue()
+        stream_owner: list[dict] = []
+        # Held while a delta is forwarded, so finishing the route waits for it
+        owner_lock = threading.Lock()
+        done = threading.Event()
+        errors: list[str] = []
+
+        def gated(attempt: dict):
+            if on_delta is None:
+                return None
+
+            def forward(delta: str):
+                if cancel is not None:
+                    cancel.raise_if_cancelled()
+                with owner_lock:
+                    if done.is_set() or attempt["timed_out"]:
+                        # Abandoned: stop the stream (not counted against the provider)
+                        raise JobCancelled("LLM attempt abandoned.")
+                    attempt["deltas"].append(delta)
+                    if stream_owner and stream_owner[0] is attempt:
+                        on_delta(delta)
+                        return
+                    if not stream_owner:
+                        stream_owner.append(attempt)
+                        on_delta(delta)
+                    elif stream_owner[0]["failed"] or stream_owner[0]["timed_out"]:
+                        # The owner died mid-stream: drop its partial text and
+                        # replay this attempt's text so far
+                        stream_owner[0] = attempt
+                        reset = getattr(on_delta, "reset", None)
+                        if reset is not None:
+                            reset()
+                        on_delta("".join(attempt["deltas"]))
+            return forward
+
+        attempts: list[dict] = []  # in-flight attempts, oldest first
+
+        def launch(hedge: bool = False):
+            provider = pending.pop(0)
+            with self._lock:
+                stats = self._stats[provider.key]
+                stats.requests += 1
+                if hedge:
+                    stats.hedges += 1
+            attempt = {
+                "provider": provider, "started": time.monotonic(),
+                "timed_out": False, "failed": False, "deltas": [],
+            }
+            attempts.append(attempt)
+            # Run in a copy of the caller's context so the attempt joins its trace
+            threading.Thread(
+                target=contextvars.copy_context().run,
+                args=(self._attempt, attempt, call, gated(attempt), results, hedge),
+                name=f"llm-{provider.name}", daemon=True,
+            ).start()
+
+        if cancel is not None:
+            cancel.raise_if_cancelled()
+        try:
+            return self._wait(attempts, pending, launch, results, errors, cancel)
+        finally:
+            with owner_lock:
+                done.set()
+
+    def _wait(self, attempts: list[dict], pending: list[LLMProvider], launch: Callable,
+              results: queue.Queue, errors: list[str], cancel: CancelToken | None) -> RouteResult:
+        """The `route` loop: wait for results, hedge, time out and fail over."""
+        launch()
+        while attempts:
+            newest = attempts[-1]["started"]
+            wait = attempts[0]["started"] + self.attempt_timeout - time.monotonic()
+            hedging = self.hedge_after and pending and len(attempts) == 1
+            if hedging:
+                wait = min(wait, newest + self.hedge_after - time.monotonic())
+            if cancel is not None:
+                wait = min(wait, CANCEL_POLL_INTERVAL)
+            try:
+                attempt, output, error, latency = results.get(timeout=max(0.0, wait))
+            except queue.Empty:
+                if cancel is not None and cancel.cancelled:
+                    raise JobCancelled("LLM request cancelled.")
+                oldest = attempts[0]
+                if time.monotonic() - oldest["started"] >= self.attempt_timeout:
+                    # Timed out: count it as a failure and move on (its stream is cut)
+                    attempts.pop(0)
+                    oldest["timed_out"] = True
+                    self._record(oldest["provider"], None)
+                    errors.append(f"{oldest['provider'].key}: timeout")
+                    if pending and not attempts:
+                        launch()
+                elif hedging and time.monotonic() - newest >= self.hedge_after:
+                    # Hedge: the primary is slow, race the next provider
+                    launch(hedge=True)
+                continue
+
+            if attempt not in attempts:
+                continue  # late answer from a timed-out attempt
+            attempts.remove(attempt)
+            provider = attempt["provider"]
+            if error is None:
+                with self._lock:
+                    self._stats[provider.key].wins += 1
+                return RouteResult(output=output, provider=provider, latency=latency)
+
+            if cancel is not None and cancel.cancelled:
+                raise JobCancelled("LLM request cancelled.")
+            errors.append(f"{provider.key}: {error}")
+            if pending and not attempts:
+                launch()
+
+        raise AllProvidersFailed("; ".join(errors) or "no provider answered")
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            return {key: s.as_dict() for key, s in self._stats.items()}
+
+    def _attempt(self, attempt: dict, call, on_delta, results: queue.Queue, hedge: bool = False):
+        provider = attempt["provider"]
+        with tracer.span("llm", provider=provider.key, hedge=hedge) as span:
+            self._run_attempt(attempt, call, on_delta, results, span)
+
+    def _run_attempt(self, attempt: dict, call, on_delta, results: queue.Queue, span):
+        provider = attempt["provider"]
+        if on_delta is not None:
+            on_delta = self._timed_deltas(provider, attempt["started"], on_delta, span)
+        try:
+            with LLM_IN_FLIGHT.labels(provider.name, provider.model).track_inprogress():
+                output = call(provider, on_delta)
+        except JobCancelled as e:
+            # Not the provider's fault: don't count it against its health
+            self._observe(provider, attempt, "cancelled", span)
+            results.put((attempt, None, str(e), None))
+            return
+        # pylint: disable=broad-except
+        except Exception as e:
+            attempt["failed"] = True
+            self._observe(provider, attempt, "error", span)
+            if not attempt["timed_out"]:
+                self._record(provider, None)
+                logger.warning("LLM provider %s failed: %s", provider.key, e)
+            results.put((attempt, None, str(e) or type(e).__name__, None))
+            return
+        self._observe(provider, attempt, "ok", span)
+        latency = time.monotonic() - attempt["started"]
+        # Hedge losers still report their latency; timed-out attempts were already
+        # recorded as failures
+        if not attempt["timed_out"]:
+            self._record(provider, latency)
+        results.put((attempt, output, None, latency))
+
+    @staticmethod
+    def _timed_deltas(provider: LLMProvider, started: float, on_delta: Callable[[str], None], span):
+        """Wrap `on_delta` to record the time to the first delta."""
+        first = []
+
+        def timed(delta: str):
+            if not first:
+                first.append(True)
+                ttft = time.monotonic() - started
+                LLM_TTFT_SECONDS.labels(provider.name, provider.model).observe(ttft)
+                span.set(ttft_ms=round(ttft * 1000, 1))
+            on_delta(delta)
+        return timed
+
+    @staticmethod
+    def _observe(provider: LLMProvider, attempt: dict, outcome: str, span):
+        LLM_SECONDS.labels(provider.name, provider.model, outcome).observe(
+            time.monotonic() - attempt["started"]
+        )
+        span.set(outcome=outcome, timed_out=attempt["timed_out"])
+
+    def _record(self, provider: LLMProvider, latency: float | None):
+        with self._lock:
+            stats = self._stats[provider.key]
+            stats.outcomes.append(latency is None)
+            if latency is None:
+                stats.consecutive_failures += 1
+                if stats.consecutive_failures >= self.failure_threshold:
+                    stats.cooldown_until = time.monotonic() + self.cooldown
+            else:
+                stats.latencies.append(latency)
+                stats.consecutive_failures = 0
@@ -0,0 +1,134 @@
+""" Long-message helpers.
+- `split_chunks` cuts long input at paragraph, then sentence boundaries.
+- `rephrase_chunked` rephrases chunks concurrently (with a cap) and
+  reassembles them in order, passing the tail of the previous chunk as
+  read-only context so tone stays consistent.
+- `split_for_blocks` cuts a result into pieces that fit one Slack
+  plain_text_input (3000 chars) each.
+"""
+import contextvars
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+_PARAGRAPH_SPLIT = re.compile(r"(\n\s*\n)")
+_SENTENCE_SPLIT = re.compile(r"((?<=[.!?…])\s+|\n)")
+
+
+def _pieces(text: str, pattern: re.Pattern) -> list[tuple[str, str]]:
+    """Split into (piece, separator_after) pairs."""
+    parts = pattern.split(text)
+    return [
+        (parts[i], parts[i + 1] if i + 1 < len(parts) else "")
+        for i in range(0, len(parts), 2)
+        if parts[i] or (i + 1 < len(parts) and parts[i + 1])
+    ]
+
+
+def _hard_split(text: str, max_chars: int) -> list[tuple[str, str]]:
+    """Last resort: cut at whitespace (or mid-word) every `max_chars`."""
+    out = []
+    while len(text) > max_chars:
+        cut = text.rfind(" ", 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        out.append((text[:cut], " " if text[cut:cut + 1] == " " else ""))
+        text = text[cut:].lstrip(" ")
+    out.append((text, ""))
+    return out
+
+
+def split_chunks(text: str, max_chars: int = 1500) -> list[tuple[str, str]]:
+    """
+    Split text into (chunk, separator_after) pairs of at most `max_chars`,
+    preferring paragraph boundaries, then sentence boundaries.
+    `"".join(c + s for c, s in chunks)` gives the text back.
+    """
+    units: list[tuple[str, str]] = []
+    for paragraph, sep in _pieces(text, _PARAGRAPH_SPLIT):
+        if len(paragraph) <= max_chars:
+            units.append((paragraph, sep))
+            continue
+        sentences = []
+        for sentence, s_sep in _pieces(paragraph, _SENTENCE_SPLIT):
+            if len(sentence) <= max_chars:
+                sentences.append((sentence, s_sep))
+            else:
+                hard = _hard_split(sentence, max_chars)
+                hard[-1] = (hard[-1][0], s_sep)
+                sentences.extend(hard)
+        sentences[-1] = (sentences[-1][0], sentences[-1][1] + sep)
+        units.extend(sentences)
+
+    # Greedily pack units into chunks
+    chunks: list[tuple[str, str]] = []
+    current, current_sep = "", ""
+    for unit, sep in units:
+        if current and len(current) + len(current_sep) + len(unit) > max_chars:
+            chunks.append((current, current_sep))
+            current, current_sep = unit, sep
+        else:
+            current = current + current_sep + unit if current else unit
+            current_sep = sep
+    if current or current_sep:
+        chunks.append((current, current_sep))
+    return chunks
+
+
+def _context_tail(text: str, overlap_chars: int) -> str:
+    """Last ~`overlap_chars` of text, starting at a sentence boundary if possible."""
+    if overlap_chars <= 0:
+        return ""
+    tail = text[-overlap_chars:]
+    if len(tail) < len(text):
+        match = re.search(r"(?<=[.!?…])\s+", tail)
+        if match and match.end() < len(tail):
+            tail = tail[match.end():]
+    return tail.strip()
+
+
+def rephrase_chunked(
+    text: str,
+    translate: Callable[..., str],
+    max_chars: int = 1500,
+    max_parallel: int = 4,
+    overlap_chars: int = 200,
+    on_delta: Callable[[str], None] | None = None,
+) -> str:
+    """
+    Rephrase long text chunk by chunk, concurrently, and reassemble in order.
+
+    `translate(chunk, context, on_delta=None)` gets each chunk plus the tail of
+    the previous source chunk as context. Only the first chunk streams into
+    `on_delta`, so the user sees text early.
+    """
+    chunks = split_chunks(text, max_chars)
+
+    def work(i: int) -> str:
+        chunk, _ = chunks[i]
+        if not chunk.strip():
+            return chunk
+        context = _context_tail(chunks[i - 1][0], overlap_chars) if i else ""
+        return translate(chunk, context, on_delta=on_delta if i == 0 else None)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(chunks)))) as pool:
+        # One context copy per chunk, so each chunk's LLM call joins the caller's trace
+        futures = [pool.submit(contextvars.copy_context().run, work, i) for i in range(len(chunks))]
+        outputs = [future.result() for future in futures]
+
+    return "".join(
+        output.strip() + sep for output, (_, sep) in zip(outputs, chunks)
+    ).strip()
+
+
+def split_for_blocks(text: str, limit: int = 3000) -> list[tuple[str, str]]:
+    """
+    Split text into (separator_before, piece) pairs with pieces of at most
+    `limit` characters, for several modal input blocks.
+    """
+    pieces = []
+    previous_sep = ""
+    for chunk, sep in split_chunks(text, limit):
+        pieces.append((previous_sep, chunk))
+        previous_sep = sep
+    return pieces or [("", "")]
@@ -0,0 +1,384 @@
+""" In-process metrics in the Prometheus text format.
+- Counters, gauges and fixed-bucket histograms, optionally labelled
+  (e.g. by provider/model). Recording is a dict lookup, a bisect and a few
+  additions under a per-metric lock: cheap enough for the hot path.
+- Gauges and counters can also be read at scrape time from a callback
+  (queue depths, or totals a component already keeps in its `stats()`).
+- `REGISTRY.render()` produces the body of the `/metrics` endpoint.
+- The pipeline metrics are defined at the bottom so every module records
+  into the same series.
+"""
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers a 5 ms Slack call up to a 60 s LLM generation
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: dict[tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        """The child series for these label values (created on first use)."""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _CounterChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+        self.function: Callable[[], float] | None = None
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the running total from `function` at scrape time instead."""
+        self.function = function
+
+    def get(self) -> float:
+        if self.function is not None:
+            try:
+                return float(self.function())
+            # pylint: disable=broad-except
+            except Exception:
+                return math.nan
+        return self.value
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, e.g. calls or tokens."""
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def set_function(self, function: Callable[[], float]):
+        self.labels().set_function(function)
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            value = child.get()
+            if not math.isnan(value):
+                yield f"{self.name}_total{_label_text(self.labelnames, key)} {_format_value(value)}"
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+        self.function: Callable[[], float] | None = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set_function(self, function: Callable[[], float]):
+        """Compute the value at scrape time instead."""
+        self.function = function
+
+    @contextmanager
+    def track_inprogress(self):
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+    def get(self) -> float:
+        if self.function is not None:
+            try:
+                return float(self.function())
+            # pylint: disable=broad-except
+            except Exception:
+                return math.nan
+        return self.value
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, e.g. requests in flight."""
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set_function(self, function: Callable[[], float]):
+        self.labels().set_function(function)
+
+    def track_inprogress(self):
+        return self.labels().track_inprogress()
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            value = child.get()
+            if not math.isnan(value):
+                yield f"{self.name}{_label_text(self.labelnames, key)} {_format_value(value)}"
+
+
+class _HistogramChild:
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(buckets) + 1)  # last slot: above the largest bucket
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self) -> tuple[list[int], float, int]:
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class Histogram(_Metric):
+    """
+    Distribution over fixed buckets (upper bounds, sorted). Quantiles are
+    computed by Prometheus (histogram_quantile) from the cumulative counts.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            counts, total, count = child.snapshot()
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_label_text(self.labelnames, key, le)} {cumulative}"
+            labels = _label_text(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class Registry:
+    """A named set of metrics rendered together."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(m.render() for m in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+# --- Slash-command pipeline ------------------------------------------------
+
+COMMAND_ACK_SECONDS = REGISTRY.histogram(
+    "rephrasely_command_ack_seconds", "Time to answer the slash command request."
+)
+QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "rephrasely_queue_wait_seconds", "Time a rephrase job waited for a worker.", ("queue",)
+)
+REPHRASE_SECONDS = REGISTRY.histogram(
+    "rephrasely_rephrase_seconds",
+    "Time from a worker picking up a job to the final modal update.", ("tier", "outcome"),
+)
+JOBS_IN_FLIGHT = REGISTRY.gauge(
+    "rephrasely_jobs_in_flight", "Rephrase jobs currently running in this process."
+)
+QUEUE_DEPTH = REGISTRY.gauge("rephrasely_queue_depth", "Jobs waiting for a worker.", ("queue",))
+
+SLACK_API_SECONDS = REGISTRY.histogram(
+    "rephrasely_slack_api_seconds",
+    "Slack Web API call time, including rate-limit waits and retries.", ("method",),
+)
+SLACK_API_CALLS = REGISTRY.counter(
+    "rephrasely_slack_api_calls", "Slack Web API calls by result.", ("method", "outcome")
+)
+
+SOCKET_MODE_CONNECTIONS = REGISTRY.gauge(
+    "rephrasely_socket_mode_connections", "Open Slack Socket Mode connections."
+)
+SOCKET_MODE_ENVELOPES = REGISTRY.counter(
+    "rephrasely_socket_mode_envelopes", "Envelopes received over Socket Mode.", ("type",)
+)
+
+# --- Caches, stores and background queues (read from their stats() at scrape time)
+
+CACHE_LOOKUPS = REGISTRY.counter(
+    "rephrasely_cache_lookups", "Cache lookups by result (hit or miss).", ("cache", "result")
+)
+CACHE_EVICTIONS = REGISTRY.counter(
+    "rephrasely_cache_evictions", "Entries evicted to stay within a cache's budget.", ("cache",)
+)
+CACHE_ENTRIES = REGISTRY.gauge("rephrasely_cache_entries", "Entries held in memory.", ("cache",))
+CACHE_BYTES = REGISTRY.gauge("rephrasely_cache_bytes", "Memory used by a cache's entries.", ("cache",))
+UNAUTHORIZED_LOOKUPS = REGISTRY.counter(
+    "rephrasely_unauthorized_lookups", "Token lookups for users who haven't authorized the app."
+)
+
+CANCELLED_JOBS = REGISTRY.counter(
+    "rephrasely_cancelled_jobs", "Jobs cancelled by closing their modal, by stage.", ("stage",)
+)
+ABORTED_LLM_CALLS = REGISTRY.counter(
+    "rephrasely_aborted_llm_calls", "LLM calls abandoned because their modal was closed."
+)
+CANCELLED_SECONDS = REGISTRY.counter(
+    "rephrasely_cancelled_seconds", "Time spent on jobs before they were cancelled."
+)
+
+OUTBOX_MESSAGES = REGISTRY.counter(
+    "rephrasely_outbox_messages", "Outbox messages by event.", ("event",)
+)
+
+OLLAMA_MODEL_READY = REGISTRY.gauge(
+    "rephrasely_ollama_model_ready", "1 while a local Ollama model is loaded.", ("model",)
+)
+OLLAMA_MODEL_LOADS = REGISTRY.counter(
+    "rephrasely_ollama_model_loads", "Ollama model (re)loads.", ("model",)
+)
+OLLAMA_MODEL_LOAD_SECONDS = REGISTRY.gauge(
+    "rephrasely_ollama_model_load_seconds", "Duration of a model's last load.", ("model",)
+)
+OLLAMA_REQUESTS = REGISTRY.counter(
+    "rephrasely_ollama_requests", "Requests completed through the Ollama scheduler."
+)
+
+LLM_TTFT_SECONDS = REGISTRY.histogram(
+    "rephrasely_llm_time_to_first_token_seconds",
+    "Time from sending a streaming LLM request to its first text delta.", ("provider", "model"),
+)
+LLM_SECONDS = REGISTRY.histogram(
+    "rephrasely_llm_seconds", "LLM request time.", ("provider", "model", "outcome"),
+)
+LLM_IN_FLIGHT = REGISTRY.gauge(
+    "rephrasely_llm_requests_in_flight", "LLM requests currently running.", ("provider", "model"),
+)
+LLM_STREAM_PARSE_ERRORS = REGISTRY.counter(
+    "rephrasely_llm_stream_parse_errors", "Malformed events skipped in LLM streams.", ("provider",),
+)
+LLM_TOKENS = REGISTRY.counter(
+    "rephrasely_llm_tokens", "Tokens reported by the LLM backends.", ("provider", "model", "kind"),
+)
+LLM_COMPLETION_TOKENS = REGISTRY.histogram(
+    "rephrasely_llm_completion_tokens", "Generated tokens per LLM request.", ("provider", "model"),
+    buckets=TOKEN_BUCKETS,
+)
+
+
+def record_tokens(provider: str, model: str, prompt_tokens: int | None, completion_tokens: int | None):
+    """Token counts of one LLM request (None when the backend didn't report them)."""
+    if prompt_tokens:
+        LLM_TOKENS.labels(provider, model, "prompt").inc(prompt_tokens)
+    if completion_tokens:
+        LLM_TOKENS.labels(provider, model, "completion").inc(completion_tokens)
+        LLM_COMPLETION_TOKENS.labels(provider, model).observe(completion_tokens)
@@ -0,0 +1,101 @@
+""" Coalesces streamed LLM deltas into occasional modal updates.
+Slack's views.update is rate limited, so partial text is pushed at most
+once per `min_interval` seconds and only after `min_chars` new characters.
+Pushes run on a helper thread, so a slow views.update never holds up the
+LLM stream; if one is still in flight, only the newest text is pushed next.
+"""
+import contextvars
+import logging
+import threading
+import time
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class CoalescingUpdater:
+    """
+    Buffers streamed text and calls `push(text_so_far)` at a bounded rate.
+    Callable, so it can be passed as an `on_delta` callback directly.
+    Call `close()` before the final update so no partial lands after it.
+
+    Args:
+        push: Called with the full text generated so far (on a helper thread).
+        min_interval: Minimum seconds between two pushes.
+        min_chars: Minimum new characters since the last push.
+    """
+
+    def __init__(self, push: Callable[[str], None], min_interval: float = 1.0, min_chars: int = 24):
+        self.push = push
+        self.min_interval = min_interval
+        self.min_chars = min_chars
+        self.pushes = 0
+
+        self._parts: list[str] = []
+        self._length = 0
+        self._pushed_length = 0
+        self._last_push = 0.0  # first push goes out as soon as min_chars arrive
+        self._lock = threading.Lock()
+        self._pending: str | None = None  # newest text waiting for the pusher
+        self._pusher: threading.Thread | None = None
+        self._closed = False
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def feed(self, delta: str):
+        """Add a streamed delta; queues a push if enough time and text has accumulated."""
+        with self._lock:
+            self._parts.append(delta)
+            self._length += len(delta)
+            if self._closed:
+                return
+            now = time.monotonic()
+            if now - self._last_push < self.min_interval:
+                return
+            if self._length - self._pushed_length < self.min_chars:
+                return
+            self._last_push = now
+            self._pushed_length = self._length
+            self._pending = "".join(self._parts)
+            self.pushes += 1
+            if self._pusher is None:
+                # Runs in a copy of the caller's context so pushes join its trace
+                self._pusher = threading.Thread(
+                    target=contextvars.copy_context().run, args=(self._push_pending,),
+                    name="modal-partials", daemon=True,
+                )
+                self._pusher.start()
+
+    __call__ = feed
+
+    def reset(self):
+        """Drop the text so far (the stream restarted); the next push replaces it."""
+        with self._lock:
+            self._parts.clear()
+            self._length = 0
+            self._pushed_length = 0
+            self._pending = None
+
+    def close(self, timeout: float | None = None):
+        """Stop pushing and wait (up to `timeout`) for a push still in flight."""
+        with self._lock:
+            self._closed = True
+            self._pending = None
+            pusher = self._pusher
+        if pusher is not None:
+            pusher.join(timeout)
+
+    def _push_pending(self):
+        while True:
+            with self._lock:
+                text, self._pending = self._pending, None
+                if text is None:
+                    self._pusher = None
+                    return
+            try:
+                self.push(text)
+            # pylint: disable=broad-except
+            except Exception:
+                logger.exception("Partial modal update failed")
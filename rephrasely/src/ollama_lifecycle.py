@@ -0,0 +1,169 @@
+""" Keeps local Ollama models warm.
+- Preloads the configured models at startup (an empty /api/generate call
+  loads a model without generating anything).
+- Sends `keep_alive` so Ollama keeps them resident between requests.
+- Periodically probes /api/ps and reloads any model Ollama has evicted.
+- Reports per-model load state and load time so callers can avoid routing
+  traffic to a model that is still loading.
+"""
+import logging
+import threading
+import time
+from typing import Any
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+UNLOADED = "unloaded"
+LOADING = "loading"
+READY = "ready"
+ERROR = "error"
+
+
+class _ModelStatus:
+    def __init__(self):
+        self.state = UNLOADED
+        self.load_time: float | None = None
+        self.loads = 0
+        self.last_probe: float | None = None
+        self.expires_at: str | None = None
+        self.error: str | None = None
+
+
+def _same_model(a: str, b: str) -> bool:
+    """Ollama reports "name:latest" for models configured as plain "name"."""
+    def norm(name: str) -> str:
+        return name[: -len(":latest")] if name.endswith(":latest") else name
+    return norm(a) == norm(b)
+
+
+class OllamaModelManager:
+    """
+    Preloads and health-checks a set of Ollama models.
+
+    Args:
+        models: Model names to keep warm.
+        base_url: Ollama server URL.
+        keep_alive: How long Ollama keeps a model loaded after each request
+            (Ollama duration string, e.g. "30m", or "-1" for forever).
+        probe_interval: Seconds between /api/ps readiness probes.
+        load_timeout: Seconds allowed for a model load.
+    """
+
+    def __init__(
+        self,
+        models: list[str],
+        base_url: str = "http://localhost:11434",
+        keep_alive: str = "30m",
+        probe_interval: float = 60.0,
+        load_timeout: float = 300.0,
+    ):
+        self.models = list(dict.fromkeys(models))
+        self.base_url = base_url.rstrip("/")
+        self.keep_alive = keep_alive
+        self.probe_interval = probe_interval
+        self.load_timeout = load_timeout
+
+        self.session = requests.Session()
+        self._lock = threading.Lock()
+        self._status = {m: _ModelStatus() for m in self.models}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        """Preload models and start probing in a background thread."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="ollama-lifecycle", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def is_ready(self, model: str) -> bool:
+        """True once `model` is loaded (unknown models are assumed ready)."""
+        with self._lock:
+            status = self._status.get(model)
+            return status is None or status.state == READY
+
+    def status(self) -> dict[str, dict[str, Any]]:
+        """Per-model state, last load time (seconds) and probe info."""
+        with self._lock:
+            return {
+                model: {
+                    "state": s.state,
+                    "load_time": s.load_time,
+                    "loads": s.loads,
+                    "last_probe": s.last_probe,
+                    "expires_at": s.expires_at,
+                    "error": s.error,
+                }
+                for model, s in self._status.items()
+            }
+
+    def preload(self, model: str):
+        """Load `model` into memory and record how long it took."""
+        self._set(model, state=LOADING, error=None)
+        start = time.monotonic()
+        try:
+            resp = self.session.post(
+                f"{self.base_url}/api/generate",
+                json={"model": model, "keep_alive": self.keep_alive},
+                timeout=self.load_timeout,
+            )
+            resp.raise_for_status()
+        except requests.RequestException as e:
+            logger.warning("Preloading Ollama model %s failed: %s", model, e)
+            self._set(model, state=ERROR, error=str(e))
+            return
+        load_time = time.monotonic() - start
+        with self._lock:
+            status = self._status[model]
+            status.state = READY
+            status.load_time = load_time
+            status.loads += 1
+        logger.info("Ollama model %s loaded in %.2fs", model, load_time)
+
+    def probe(self):
+        """Check which models are resident; reload any that were evicted."""
+        try:
+            resp = self.session.get(f"{self.base_url}/api/ps", timeout=10)
+            resp.raise_for_status()
+            running = resp.json().get("models", [])
+        except (requests.RequestException, ValueError) as e:
+            logger.warning("Ollama probe failed: %s", e)
+            for model in self.models:
+                self._set(model, state=ERROR, error=str(e))
+            return
+
+        now = time.time()
+        evicted = []
+        for model in self.models:
+            entry = next((m for m in running if _same_model(m.get("name", ""), model)), None)
+            with self._lock:
+                status = self._status[model]
+                status.last_probe = now
+                if entry is not None:
+                    status.state = READY
+                    status.expires_at = entry.get("expires_at")
+                    status.error = None
+                elif status.state != LOADING:
+                    status.state = UNLOADED
+                    evicted.append(model)
+
+        for model in evicted:
+            self.preload(model)
+
+    def _set(self, model: str, **fields):
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self._status[model], name, value)
+
+    def _run(self):
+        for model in self.models:
+            if self._stop.is_set():
+                return
+            self.preload(model)
+        while not self._stop.wait(self.probe_interval):
+            self.probe()
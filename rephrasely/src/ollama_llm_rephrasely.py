@@ -1,32 +1,198 @@
+import json
+import threading
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
 import requests
+from requests.adapters import HTTPAdapter
 
-OLLAMA_URL = "http://localhost:11434/api/chat"
+from rephrasely.src.metrics import record_tokens
+from rephrasely.src.settings import settings
+
+DEFAULT_BASE_URL = "http://localhost:11434"
+
+# (connect, read) timeouts; the read timeout applies between streamed chunks
+DEFAULT_TIMEOUT = (5, 120)
+
+# One keep-alive connection pool shared by every Ollama call
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+
+def _generate_url() -> str:
+    """/api/generate on OLLAMA_BASE_URL, read per call so config reloads apply."""
+    return settings().get("OLLAMA_BASE_URL", DEFAULT_BASE_URL).rstrip("/") + "/api/generate"
+
+
+class OllamaError(RuntimeError):
+    """Raised when Ollama reports an error in its response."""
 
-import requests
 
-def rephrasely_method(prompt: str, model: str = 'grammar-translator-llama3.2', stream: bool = False) -> str:
+class GenerationCancelled(RuntimeError):
+    """Raised when a streaming generation is cancelled mid-stream."""
+
+
+@dataclass
+class GenerationStats:
+    """Timing fields from Ollama's final chunk (durations in nanoseconds)."""
+    eval_count: int = 0
+    eval_duration: int = 0
+    prompt_eval_count: int = 0
+    prompt_eval_duration: int = 0
+    load_duration: int = 0
+    total_duration: int = 0
+
+    @classmethod
+    def from_chunk(cls, chunk: dict) -> "GenerationStats":
+        return cls(**{name: int(chunk.get(name) or 0) for name in cls.__dataclass_fields__})
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.eval_count / (self.eval_duration / 1e9) if self.eval_duration else 0.0
+
+
+class OllamaStream:
+    """
+    Iterates the token deltas of a streaming /api/generate call.
+
+    Ollama streams NDJSON: one JSON object per line. Lines are parsed as they
+    arrive, `response` deltas are yielded, and the final `done` chunk fills
+    `stats`. Call `cancel()` (from any thread), or set the shared
+    `cancel_event`, to abort mid-stream.
+    """
+
+    def __init__(self, payload: dict, url: str | None = None, timeout=DEFAULT_TIMEOUT,
+                 cancel_event: threading.Event | None = None):
+        self.payload = payload
+        self.url = url or _generate_url()
+        self.timeout = timeout
+        self.stats: GenerationStats | None = None
+        self.done_reason: str | None = None
+        self._cancelled = cancel_event or threading.Event()
+        self._response: requests.Response | None = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Stop the stream; closing the response also unblocks a pending read."""
+        self._cancelled.set()
+        if self._response is not None:
+            self._response.close()
+
+    def __iter__(self) -> Iterator[str]:
+        if self.cancelled:
+            raise GenerationCancelled("Generation cancelled before it started.")
+
+        self._response = _session.post(self.url, json=self.payload, stream=True, timeout=self.timeout)
+        with self._response as resp:
+            resp.raise_for_status()
+            try:
+                for line in resp.iter_lines():
+                    if self.cancelled:
+                        break
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise OllamaError(chunk["error"])
+                    delta = chunk.get("response", "")
+                    if delta:
+                        yield delta
+                    if chunk.get("done"):
+                        self.stats = GenerationStats.from_chunk(chunk)
+                        self.done_reason = chunk.get("done_reason")
+                        return
+            except (requests.RequestException, AttributeError, ValueError) as e:
+                # A response closed by cancel() surfaces as a read error
+                if not self.cancelled:
+                    raise
+                raise GenerationCancelled("Generation cancelled.") from e
+
+        if self.cancelled:
+            raise GenerationCancelled("Generation cancelled.")
+
+
+def _record_usage(model: str, stats: GenerationStats):
+    record_tokens('ollama', model, stats.prompt_eval_count, stats.eval_count)
+
+
+def ollama_generate_stream(
+    prompt: str,
+    model: str = 'grammar-translator-llama3.2',
+    keep_alive: str | None = None,
+    timeout=DEFAULT_TIMEOUT,
+    cancel_event: threading.Event | None = None,
+    max_tokens: int | None = None,
+) -> OllamaStream:
+    """
+    Start a streaming generation; iterate the result for token deltas.
+    """
+    payload = {'model': model, 'prompt': prompt, 'stream': True}
+    if keep_alive is not None:
+        payload['keep_alive'] = keep_alive
+    if max_tokens:
+        payload['options'] = {'num_predict': max_tokens}
+    return OllamaStream(payload, timeout=timeout, cancel_event=cancel_event)
+
+
+def rephrasely_method(
+    prompt: str,
+    model: str = 'grammar-translator-llama3.2',
+    stream: bool = False,
+    keep_alive: str | None = None,
+    timeout=DEFAULT_TIMEOUT,
+    on_delta: Callable[[str], None] | None = None,
+    on_stats: Callable[[GenerationStats], None] | None = None,
+    cancel_event: threading.Event | None = None,
+    max_tokens: int | None = None,
+) -> str:
     """
     Translate and improve the given prompt using the specified model.
-    
+    `keep_alive` (e.g. "30m") tells Ollama how long to keep the model loaded.
+    With stream=True, `on_delta` receives each generated text delta,
+    `on_stats` the timing stats from the final chunk, and setting
+    `cancel_event` stops the generation (GenerationCancelled is raised).
+    `max_tokens` caps the generation (Ollama's num_predict).
     """
-    url = 'http://localhost:11434/api/generate'
+    if stream:
+        output = []
+        generation = ollama_generate_stream(
+            prompt, model=model, keep_alive=keep_alive, timeout=timeout, cancel_event=cancel_event,
+            max_tokens=max_tokens,
+        )
+        for delta in generation:
+            if on_delta is not None:
+                on_delta(delta)
+            output.append(delta)
+        if generation.stats is not None:
+            _record_usage(model, generation.stats)
+            if on_stats is not None:
+                on_stats(generation.stats)
+        return ''.join(output)
+
     payload = {
         'model': model,
         'prompt': prompt,
-        'stream': stream
+        'stream': False
     }
+    if keep_alive is not None:
+        payload['keep_alive'] = keep_alive
+    if max_tokens:
+        payload['options'] = {'num_predict': max_tokens}
 
-    if stream:
-        response = requests.post(url, json=payload, stream=True)
-        output = ''
-        for line in response.iter_lines():
-            if line:
-                data = line.decode('utf-8')
-                output += data
-        return output
-    else:
-        response = requests.post(url, json=payload)
-        return response.json().get('response', '')
+    response = _session.post(_generate_url(), json=payload, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+    if data.get('error'):
+        raise OllamaError(data['error'])
+    stats = GenerationStats.from_chunk(data)
+    _record_usage(model, stats)
+    if on_stats is not None:
+        on_stats(stats)
+    return data.get('response', '')
 
 if __name__ == '__main__':
     prompt = "Translate: Hola Santiago, ¿cómo estás? Espero que estés bien. Te escribo para pedirte ayuda con el módulo de ic-houdini. Estoy trabajando en la migración a Poetry y, aunque quiero comenzar con los tests, necesito hacerlo funcionar primero. Vi que en algún momento trabajaste en este proyecto, por lo que pensé que tal vez podrías orientarme para hacerlo arrancar.Instale Houdini, pero cuando intenta iniciar ic-houdini, me pide un archivo template y de configuración, y no estoy seguro de cómo crearlos. Si te parece, ¿podríamos conversar mañana cuando tengas un momento? Agradecería mucho tu ayuda. :slightly_smiling_face:"
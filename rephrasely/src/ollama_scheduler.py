@@ -0,0 +1,90 @@
+""" Admission control for the local Ollama backend.
+At most `parallelism` requests run at once, which should match the server's
+OLLAMA_NUM_PARALLEL; the rest wait their turn in arrival order. On CPU-only
+boxes this keeps Ollama at its best concurrency instead of a free-for-all.
+- /api/generate takes one prompt per call, so there is nothing to merge:
+  a waiting request starts as soon as a slot frees up, with no batching
+  window, and runs in the caller's thread.
+- Reports queue wait, requests in flight and generation throughput.
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Callable
+
+
+class OllamaScheduler:
+    """
+    Runs callables under bounded parallelism, first come first served.
+
+    Args:
+        parallelism: Max requests in flight (match OLLAMA_NUM_PARALLEL).
+    """
+
+    def __init__(self, parallelism: int = 1):
+        if parallelism < 1:
+            raise ValueError("parallelism must be >= 1")
+        self.parallelism = parallelism
+
+        self._lock = threading.Lock()
+        self._turn = threading.Condition(self._lock)
+        self._queue: deque[object] = deque()
+        self._in_flight = 0
+
+        # Stats
+        self._waits: deque[float] = deque(maxlen=256)
+        self._completed = 0
+        self._tokens = 0
+        # Wall-clock time with at least one request in flight
+        self._busy_seconds = 0.0
+        self._busy_since = 0.0
+
+    def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Wait for a slot, run `fn(*args, **kwargs)` and return its result."""
+        ticket = object()
+        enqueued = time.monotonic()
+        with self._lock:
+            self._queue.append(ticket)
+            while self._queue[0] is not ticket or self._in_flight >= self.parallelism:
+                self._turn.wait()
+            self._queue.popleft()
+            if not self._in_flight:
+                self._busy_since = time.monotonic()
+            self._in_flight += 1
+            self._waits.append(time.monotonic() - enqueued)
+            # The next in line may fit in another free slot
+            self._turn.notify_all()
+
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._completed += 1
+                if not self._in_flight:
+                    self._busy_seconds += time.monotonic() - self._busy_since
+                self._turn.notify_all()
+
+    def record_tokens(self, count: int):
+        """Count tokens generated by a request run through the scheduler."""
+        with self._lock:
+            self._tokens += count
+
+    def stats(self) -> dict[str, Any]:
+        """Queue wait, requests in flight and generation throughput."""
+        with self._lock:
+            waits = sorted(self._waits)
+            busy = self._busy_seconds
+            if self._in_flight:
+                busy += time.monotonic() - self._busy_since
+            return {
+                "parallelism": self.parallelism,
+                "queued": len(self._queue),
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "wait_avg": sum(waits) / len(waits) if waits else 0.0,
+                "wait_p95": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+                "tokens": self._tokens,
+                # Aggregate throughput while Ollama was working, not per request
+                "tokens_per_busy_second": self._tokens / busy if busy else 0.0,
+            }
@@ -22,3 +22,28 @@ def get_user_environment_variable(name: str) -> str | None:
     else:
         # Unix (Linux, macOS, etc.)
         return os.environ.get(name)
+
+
+def get_user_environment() -> dict[str, str]:
+    """
+    All user environment variables at once (one registry read on Windows).
+    On Windows, HKCU\\Environment values override the process environment.
+    """
+    env = dict(os.environ)
+    if sys.platform.startswith("win"):
+        # pylint: disable=import-outside-toplevel
+        # pylint: disable=E0401
+        import winreg
+        try:
+            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Environment") as key:
+                i = 0
+                while True:
+                    try:
+                        name, value, _ = winreg.EnumValue(key, i)
+                    except OSError:
+                        break
+                    env[name] = str(value)
+                    i += 1
+        except OSError:
+            pass
+    return env
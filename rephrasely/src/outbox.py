@@ -0,0 +1,248 @@
+""" Outbox for messages posted back to Slack.
+- Submissions are queued and acknowledged right away; background senders
+  drain the queue, so the interaction ack never waits on chat.postMessage.
+- Each message has an idempotency key: the same key is only queued once,
+  and a message is never re-sent after Slack accepted it.
+- Messages for one channel go out in order: a channel's head message is
+  retried before anything behind it is sent.
+- Posting is not idempotent, so only failures that certainly posted nothing
+  (rate limits, connections never established) are retried; this is the
+  only retry layer. A read timeout or 5xx may have posted the message, so
+  it is dead-lettered rather than risk a duplicate.
+- Dead-lettered messages go to the `notify` callback to let the user know.
+"""
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+# Errors after which Slack certainly did not post the message
+RETRYABLE_ERRORS = {"ratelimited", "rate_limited"}
+RETRYABLE_PREFIXES = ("http_429", "connect_failed")
+# Errors after which the message may or may not have been posted
+UNKNOWN_OUTCOME_ERRORS = {"internal_error", "fatal_error", "request_timeout"}
+UNKNOWN_OUTCOME_PREFIXES = ("request_failed", "http_5", "invalid_response")
+
+
+class OutboxFullError(RuntimeError):
+    """Raised when too many messages are waiting to be sent."""
+
+
+@dataclass(eq=False)
+class OutboxMessage:
+    """One message waiting to be posted."""
+    key: str
+    channel: str
+    text: str
+    user_id: str | None = None
+    token: str | None = None
+    attempts: int = 0
+    created: float = field(default_factory=time.monotonic)
+    last_error: str | None = None
+
+
+def is_retryable(error: str | None) -> bool:
+    """True for rate limits and failed connects (nothing was posted)."""
+    error = error or ""
+    return error in RETRYABLE_ERRORS or error.startswith(RETRYABLE_PREFIXES)
+
+
+def outcome_unknown(error: str | None) -> bool:
+    """True when Slack may have posted the message despite the error."""
+    error = error or ""
+    return error in UNKNOWN_OUTCOME_ERRORS or error.startswith(UNKNOWN_OUTCOME_PREFIXES)
+
+
+class Outbox:
+    """
+    Per-channel ordered, retrying message queue drained by background threads.
+
+    Args:
+        send: `send(message) -> dict` posting one message; returns Slack's response.
+        notify: `notify(message, error)` called when a message is dead-lettered.
+        workers: Number of sender threads (different channels send in parallel).
+        max_pending: Max messages queued across all channels.
+        max_attempts: Attempts per message before it is dead-lettered.
+        backoff: Base retry delay in seconds (full jitter, doubled per attempt).
+        max_backoff: Cap for a single retry delay.
+        remember: How many idempotency keys to remember.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[OutboxMessage], dict],
+        notify: Callable[[OutboxMessage, str], None] | None = None,
+        workers: int = 2,
+        max_pending: int = 1000,
+        max_attempts: int = 5,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        remember: int = 10000,
+    ):
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        self.send = send
+        self.notify = notify
+        self.max_pending = max_pending
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.remember = remember
+
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._channels: dict[str, deque[OutboxMessage]] = {}
+        # (due, seq, channel) for channels with pending messages that no sender owns
+        self._schedule: list[tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        self._keys: OrderedDict[str, None] = OrderedDict()
+        self._pending = 0
+        self._shutdown = False
+
+        self.dead_letters: deque[OutboxMessage] = deque(maxlen=256)
+
+        # Stats
+        self._queued = 0
+        self._sent = 0
+        self._retries = 0
+        self._duplicates = 0
+        self._dead = 0
+        self._delays: deque[float] = deque(maxlen=256)
+
+        self._threads = [
+            threading.Thread(target=self._send_loop, name=f"outbox-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def put(self, key: str, channel: str, text: str, user_id: str | None = None,
+            token: str | None = None) -> bool:
+        """
+        Queue a message. Returns False if `key` was already queued or sent.
+        Raises OutboxFullError when `max_pending` messages are waiting.
+        """
+        with self._lock:
+            if key in self._keys:
+                self._duplicates += 1
+                return False
+            if self._pending >= self.max_pending:
+                raise OutboxFullError(f"Outbox is full ({self._pending} messages pending).")
+            self._keys[key] = None
+            while len(self._keys) > self.remember:
+                self._keys.popitem(last=False)
+
+            message = OutboxMessage(key, channel, text, user_id=user_id, token=token)
+            queue = self._channels.get(channel)
+            if queue is None:
+                self._channels[channel] = deque([message])
+                self._schedule_channel(channel, time.monotonic())
+            else:
+                queue.append(message)  # the channel is already scheduled or being sent
+            self._pending += 1
+            self._queued += 1
+            return True
+
+    def stats(self) -> dict[str, Any]:
+        """Queue depth, send/retry/dead-letter counters and queue-to-post delay."""
+        with self._lock:
+            delays = sorted(self._delays)
+            return {
+                "pending": self._pending,
+                "channels": len(self._channels),
+                "queued": self._queued,
+                "sent": self._sent,
+                "retries": self._retries,
+                "duplicates": self._duplicates,
+                "dead_lettered": self._dead,
+                "delay_avg": sum(delays) / len(delays) if delays else 0.0,
+                "delay_p95": delays[int(0.95 * (len(delays) - 1))] if delays else 0.0,
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop the senders (messages still queued are dropped)."""
+        with self._lock:
+            self._shutdown = True
+            self._ready.notify_all()
+        if wait:
+            for t in self._threads:
+                t.join()
+
+    def _schedule_channel(self, channel: str, due: float):
+        """Caller holds the lock."""
+        heapq.heappush(self._schedule, (due, next(self._seq), channel))
+        self._ready.notify()
+
+    def _next_channel(self) -> str | None:
+        """Block until some channel's head message is due; None on shutdown."""
+        with self._lock:
+            while not self._shutdown:
+                now = time.monotonic()
+                if self._schedule and self._schedule[0][0] <= now:
+                    return heapq.heappop(self._schedule)[2]
+                self._ready.wait(self._schedule[0][0] - now if self._schedule else None)
+            return None
+
+    def _send_loop(self):
+        while True:
+            channel = self._next_channel()
+            if channel is None:
+                return
+            message = self._channels[channel][0]
+            message.attempts += 1
+            try:
+                result = self.send(message)
+            # pylint: disable=broad-except
+            except Exception as e:
+                logger.exception("Outbox send raised")
+                result = {"ok": False, "error": f"request_failed: {e}"}
+            self._handle_result(channel, message, result)
+
+    def _handle_result(self, channel: str, message: OutboxMessage, result: dict):
+        error = None if result.get("ok") else str(result.get("error") or "unknown_error")
+        dead = False
+        with self._lock:
+            queue = self._channels[channel]
+            if error and is_retryable(error) and message.attempts < self.max_attempts:
+                # Keep the message at the head so the channel stays in order
+                message.last_error = error
+                self._retries += 1
+                self._schedule_channel(channel, time.monotonic() + self._retry_delay(message))
+                return
+
+            queue.popleft()
+            self._pending -= 1
+            if error:
+                message.last_error = error
+                self.dead_letters.append(message)
+                self._dead += 1
+                dead = True
+            else:
+                self._sent += 1
+                self._delays.append(time.monotonic() - message.created)
+
+            if queue:
+                self._schedule_channel(channel, time.monotonic())
+            else:
+                del self._channels[channel]
+
+        if dead:
+            logger.error("Dead-lettered message %s for %s after %d attempt(s): %s",
+                         message.key, channel, message.attempts, error)
+            if self.notify is not None:
+                try:
+                    self.notify(message, error)
+                # pylint: disable=broad-except
+                except Exception:
+                    logger.exception("Dead-letter notification failed")
+
+    def _retry_delay(self, message: OutboxMessage) -> float:
+        """Jittered exponential backoff (SlackClient already waits out Retry-After)."""
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** (message.attempts - 1))))
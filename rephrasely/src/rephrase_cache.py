@@ -0,0 +1,154 @@
+""" Content-addressed cache for rephrase results.
+- Keys hash (normalized text, model, system prompt, provider).
+- In-memory LRU bounded by a byte budget, with per-entry TTL.
+- Optional SQLite tier so entries survive restarts.
+- Keeps hit/miss/eviction counters.
+"""
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+# Rough per-entry bookkeeping overhead (key, tuple, OrderedDict node)
+_ENTRY_OVERHEAD = 128
+
+
+def normalize_text(text: str) -> str:
+    """NFC-normalize, trim and collapse runs of whitespace."""
+    text = unicodedata.normalize("NFC", text or "")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class RephraseCache:
+    """
+    LRU + TTL cache of LLM outputs.
+
+    Args:
+        max_bytes: Memory budget for cached values (approximate).
+        ttl: Seconds an entry stays valid (0 = never expires).
+        db_path: Optional SQLite file for the persistent tier.
+    """
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024, ttl: float = 7 * 24 * 3600,
+                 db_path: str | None = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+
+        self._db = None
+        if db_path:
+            self._db = self._open_db(db_path)
+
+    @staticmethod
+    def make_key(text: str, model: str, system_prompt: str, provider: str) -> str:
+        """Stable content hash for a rephrase request."""
+        h = hashlib.sha256()
+        for part in (provider, model, system_prompt, normalize_text(text)):
+            h.update(part.encode("utf-8"))
+            h.update(b"\x00")
+        return h.hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """Return the cached value or None (expired entries count as misses)."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, created = entry
+                if not self._expired(created, now):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._drop(key)
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created FROM cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and not self._expired(row[1], now):
+                    self._insert(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: str):
+        """Store a value, evicting least-recently-used entries over budget."""
+        created = time.time()
+        with self._lock:
+            self._insert(key, value, created)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, created) VALUES (?, ?, ?)",
+                    (key, value, created),
+                )
+                self._db.commit()
+
+    def stats(self) -> dict[str, Any]:
+        """Hit/miss/eviction counters and current memory usage."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _expired(self, created: float, now: float) -> bool:
+        return bool(self.ttl) and now - created > self.ttl
+
+    def _insert(self, key: str, value: str, created: float):
+        """Add to the memory tier. Caller holds the lock."""
+        if key in self._entries:
+            self._drop(key)
+        size = self._size(key, value)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, created)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            old_key = next(iter(self._entries))
+            self._drop(old_key)
+            self.evictions += 1
+
+    def _drop(self, key: str):
+        value, _ = self._entries.pop(key)
+        self._bytes -= self._size(key, value)
+
+    @staticmethod
+    def _size(key: str, value: str) -> int:
+        return len(key) + len(value.encode("utf-8")) + _ENTRY_OVERHEAD
+
+    def _open_db(self, db_path: str) -> sqlite3.Connection:
+        path = Path(db_path).expanduser()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(path), check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        if self.ttl:
+            db.execute("DELETE FROM cache WHERE created < ?", (time.time() - self.ttl,))
+        db.commit()
+        return db
@@ -11,19 +11,20 @@ import subprocess
 import platform
 from pathlib import Path
 
-try:
-    import yaml  
-except ImportError as e:
-    raise SystemExit("Missing dependency: install with `pip install pyyaml`") from e
-
 
 def load_env_from_yaml(yaml_path: str | os.PathLike) -> dict[str, str]:
     """
     Reads a YAML file containing a flat mapping of env vars:
       XAI_API_KEY: "..."
-      SLACK_USER_TOKEN: "..."
+      SLACK_CLIENT_ID: "..."
     Returns a dict[str, str].
     """
+    # Imported here: only needed when a YAML config is used
+    try:
+        import yaml  # pylint: disable=import-outside-toplevel
+    except ImportError as e:
+        raise RuntimeError("Missing dependency: install with `pip install pyyaml`") from e
+
     p = Path(yaml_path).expanduser().resolve()
     if not p.exists():
         raise FileNotFoundError(f"YAML file not found: {p}")
@@ -61,46 +62,53 @@ def _detect_shell_rc() -> Path:
     return home / ".profile"
 
 
-def _ensure_export_line(rc_path: Path, key: str, value: str):
+def _ensure_export_lines(rc_path: Path, env_vars: dict[str, str]):
     """
-    Idempotently ensure `export KEY=value` exists in rc_path.
-    - Replaces an existing line for KEY.
-    - Appends if not present.
+    Idempotently ensure `export KEY=value` exists in rc_path for every KEY.
+    - Replaces existing lines, appends missing ones.
+    - Reads and writes the file once, atomically (temp file + os.replace).
     """
     rc_path.touch(exist_ok=True)
     content = rc_path.read_text(encoding="utf-8")
 
-    # Pattern for lines like: export KEY=... (allow quotes/spaces)
-    pat = re.compile(rf"^export\s+{re.escape(key)}=.*$", re.MULTILINE)
+    for key, value in env_vars.items():
+        # Pattern for lines like: export KEY=... (allow quotes/spaces)
+        pat = re.compile(rf"^export\s+{re.escape(key)}=.*$", re.MULTILINE)
+        new_line = f'export {key}="{value}"'
 
-    new_line = f'export {key}="{value}"'
-
-    if pat.search(content):
-        content = pat.sub(new_line, content)
-    else:
-        if content and not content.endswith("\n"):
-            content += "\n"
-        content += new_line + "\n"
+        if pat.search(content):
+            content = pat.sub(lambda _m, line=new_line: line, content)
+        else:
+            if content and not content.endswith("\n"):
+                content += "\n"
+            content += new_line + "\n"
 
-    rc_path.write_text(content, encoding="utf-8")
+    # Resolve symlinks (dotfile managers) so we replace the real file
+    target = rc_path.resolve()
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    tmp.write_text(content, encoding="utf-8")
+    os.chmod(tmp, target.stat().st_mode & 0o777)
+    os.replace(tmp, target)
 
 
 def set_env_variables(env_vars: dict[str, str], persist: bool = True):
     """
     Sets env vars in current process and (optionally) persists them.
     - Windows: uses `setx` per variable (future sessions only).
-    - Linux/macOS: writes `export KEY="value"` to the shell rc file.
+    - Linux/macOS: writes `export KEY="value"` lines to the shell rc file,
+      all variables in a single write.
     """
     for key_env, value in env_vars.items():
         # In-process for current Python & its children
         os.environ[key_env] = value
         print(f"Set {key_env} (in-process)")
 
-        if not persist:
-            continue
+    if not persist or not env_vars:
+        return
 
-        system = platform.system()
-        if system == "Windows":
+    system = platform.system()
+    if system == "Windows":
+        for key_env, value in env_vars.items():
             # setx does not affect the *current* process; future shells will have it
             completed = subprocess.run(
                 ["setx", key_env, value],
@@ -114,10 +122,10 @@ def set_env_variables(env_vars: dict[str, str], persist: bool = True):
                     f"Failed to persist {key_env} with setx: {completed.stderr.strip()}"
                 )
             print(f"Persisted {key_env} via setx")
-        else:
-            rc = _detect_shell_rc()
-            _ensure_export_line(rc, key_env, value)
-            print(f'Persisted {key_env} in "{rc}"')
+    else:
+        rc = _detect_shell_rc()
+        _ensure_export_lines(rc, env_vars)
+        print(f'Persisted {", ".join(env_vars)} in "{rc}"')
 
 
 if __name__ == "__main__":
@@ -126,7 +134,6 @@ if __name__ == "__main__":
 
     # Example YAML structure:
     # XAI_API_KEY: "..."
-    # SLACK_USER_TOKEN: "..."
     # SLACK_BOT_TOKEN: "..."
     # SLACK_SIGNING_SECRET: "..."
     # SLACK_CLIENT_ID: "..."
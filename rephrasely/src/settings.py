@@ -0,0 +1,195 @@
+""" Application settings as one immutable snapshot.
+- Loaded lazily on first use from the user environment plus an optional
+  YAML file (REPHRASELY_CONFIG); YAML values win over the environment.
+- Reads are served from memory: `settings()` just returns the current
+  snapshot, so hot paths never touch files or the registry.
+- A background thread watches the YAML file's mtime and swaps in a new
+  snapshot when it changes. A snapshot is never modified, so a caller
+  holding one always sees consistent values.
+- Threads don't survive fork(): a child of a process that already started
+  the watcher (e.g. a preloading WSGI master) starts its own.
+"""
+import logging
+import os
+import threading
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping
+
+from rephrasely.src.os_env import get_user_environment
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REDIRECT_URI = "https://rephrasely.com.ar/slack/oauth/callback"
+
+_FALSE = {"0", "false", "no", "off"}
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Immutable configuration snapshot. Typed fields are filled from the
+    variable of the same name in upper case (e.g. `xai_api_key` <- XAI_API_KEY);
+    everything else is reachable through `get*`.
+    """
+    slack_client_id: str = ""
+    slack_client_secret: str = ""
+    slack_redirect_uri: str = DEFAULT_REDIRECT_URI
+    slack_app_token: str = ""
+    xai_api_key: str = ""
+    values: Mapping[str, str] = field(default_factory=dict, repr=False)
+    source: str = ""
+    version: int = 0
+
+    @classmethod
+    def from_values(cls, values: dict[str, str], source: str = "", version: int = 0) -> "Settings":
+        typed = {
+            f.name: values[f.name.upper()]
+            for f in fields(cls)
+            if f.name not in ("values", "source", "version") and values.get(f.name.upper())
+        }
+        return cls(**typed, values=MappingProxyType(dict(values)), source=source, version=version)
+
+    def get(self, name: str, default: str | None = None) -> str | None:
+        """Raw value; empty strings count as unset."""
+        return self.values.get(name) or default
+
+    def get_int(self, name: str, default: int) -> int:
+        value = self.values.get(name)
+        return int(value) if value else default
+
+    def get_float(self, name: str, default: float) -> float:
+        value = self.values.get(name)
+        return float(value) if value else default
+
+    def get_bool(self, name: str, default: bool) -> bool:
+        value = self.values.get(name)
+        return value.strip().lower() not in _FALSE if value else default
+
+    def get_list(self, name: str, default: str = "") -> tuple[str, ...]:
+        """Comma-separated value as a tuple of non-empty, stripped items."""
+        return tuple(item.strip() for item in (self.get(name) or default).split(",") if item.strip())
+
+
+class SettingsManager:
+    """
+    Holds the current snapshot and reloads it when the YAML file changes.
+
+    Args:
+        yaml_path: Optional YAML file of KEY: value pairs (None = environment only).
+        watch_interval: Seconds between mtime checks (0 disables watching).
+    """
+
+    def __init__(self, yaml_path: str | os.PathLike | None = None, watch_interval: float = 2.0):
+        self.yaml_path = Path(yaml_path).expanduser() if yaml_path else None
+        self.watch_interval = watch_interval
+
+        self._lock = threading.Lock()
+        self._snapshot: Settings | None = None
+        self._mtime: float | None = None
+        self._watcher: threading.Thread | None = None
+        self._stop = threading.Event()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def get(self) -> Settings:
+        """Current snapshot; loads it on first use."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._load(version=1)
+                    self._start_watcher()
+                snapshot = self._snapshot
+        return snapshot
+
+    def reload(self) -> Settings:
+        """Re-read the environment and YAML file and swap in a new snapshot."""
+        with self._lock:
+            version = self._snapshot.version + 1 if self._snapshot else 1
+            self._snapshot = self._load(version)
+            return self._snapshot
+
+    def stop(self):
+        self._stop.set()
+
+    def _load(self, version: int) -> Settings:
+        """Build a snapshot. Caller holds the lock."""
+        values = get_user_environment()
+        source = ""
+        if self.yaml_path is not None:
+            self._mtime = self._current_mtime()
+            if self._mtime is not None:
+                # pylint: disable=import-outside-toplevel
+                from rephrasely.src.set_env_os import load_env_from_yaml
+                values.update(load_env_from_yaml(self.yaml_path))
+                source = str(self.yaml_path)
+        return Settings.from_values(values, source=source, version=version)
+
+    def _current_mtime(self) -> float | None:
+        try:
+            return self.yaml_path.stat().st_mtime
+        except OSError:
+            return None
+
+    def _start_watcher(self):
+        if self.yaml_path is None or self.watch_interval <= 0 or self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch, name="settings-watcher", daemon=True)
+        self._watcher.start()
+
+    def _after_fork(self):
+        """In a forked child: fresh locks, and a watcher of its own if the parent had one."""
+        stopped = self._stop.is_set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        if stopped:
+            self._stop.set()
+        self._watcher = None
+        if self._snapshot is not None and not stopped:
+            self._start_watcher()
+
+    def _watch(self):
+        while not self._stop.wait(self.watch_interval):
+            if self._current_mtime() == self._mtime:
+                continue
+            try:
+                snapshot = self.reload()
+            # pylint: disable=broad-except
+            except Exception:
+                # Keep serving the last good snapshot (e.g. YAML saved half-written)
+                logger.exception("Reloading settings from %s failed", self.yaml_path)
+                self._mtime = self._current_mtime()
+                continue
+            logger.info("Settings reloaded from %s (version %d)", self.yaml_path, snapshot.version)
+
+
+_manager: SettingsManager | None = None
+_manager_lock = threading.Lock()
+
+
+def settings_manager() -> SettingsManager:
+    """Process-wide manager; the YAML path comes from REPHRASELY_CONFIG."""
+    global _manager  # pylint: disable=global-statement
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = SettingsManager(os.environ.get("REPHRASELY_CONFIG") or None)
+    return _manager
+
+
+def settings() -> Settings:
+    """The current settings snapshot."""
+    return settings_manager().get()
+
+
+def persist_settings(values: dict[str, str]) -> Settings:
+    """
+    Set and persist several variables in one batched write, then swap in a
+    snapshot that includes them.
+    """
+    # pylint: disable=import-outside-toplevel
+    from rephrasely.src.set_env_os import set_env_variables
+    set_env_variables(values, persist=True)
+    return settings_manager().reload()
@@ -0,0 +1,323 @@
+""" Shared Slack Web API client.
+- One pooled keep-alive `requests.Session` for every call (no handshake per request).
+- Token buckets per (method, token) sized from Slack's rate-limit tiers, since
+  Slack counts limits per workspace/token; best-effort calls (streaming
+  partials) never wait and leave headroom for the calls that matter.
+- Honors `429 Retry-After` and retries 5xx/network errors with jittered backoff.
+  Non-idempotent calls (chat.postMessage) are never retried here: the
+  caller decides, and only a 429 or a failed connect is known not to have
+  posted anything.
+- Counts calls, retries and latency per method (also exported to /metrics).
+"""
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from rephrasely.src.metrics import SLACK_API_CALLS, SLACK_API_SECONDS
+from rephrasely.src.tracing import tracer
+
+SLACK_API_BASE = "https://slack.com/api"
+
+# Requests per minute for each Slack rate-limit tier
+TIER_LIMITS = {1: 1, 2: 20, 3: 50, 4: 100}
+
+# Known methods -> tier (chat.postMessage is "special": ~1/s per channel)
+METHOD_TIERS = {
+    "views.open": 4,
+    "views.update": 4,
+    "chat.postMessage": 4,
+    "chat.postEphemeral": 4,
+    "conversations.history": 3,
+    "oauth.v2.access": 4,
+}
+DEFAULT_TIER = 3
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Share of a bucket that best-effort calls must leave for regular ones
+BEST_EFFORT_HEADROOM = 0.2
+
+# Least recently used (method, token) buckets are dropped beyond this
+MAX_BUCKETS = 1024
+
+
+class _Bucket:
+    """Token bucket for one API method; also tracks Retry-After blocks."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = max(1, per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self, max_wait: float | None = None, headroom: float = 0.0) -> float | None:
+        """
+        Take one token; return how long the caller must wait before using it.
+
+        With `max_wait`, returns None (and takes nothing) when the wait would
+        be longer. `headroom` is the share of the bucket that must stay
+        available for other callers.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            left = self.tokens - 1 - headroom * self.capacity
+            wait = max(0.0 if left >= 0 else -left / self.rate, self.blocked_until - now)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self.tokens -= 1
+            return wait
+
+    def block(self, seconds: float):
+        """Pause the bucket after a 429."""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+def _not_sent(error: requests.RequestException) -> bool:
+    """True when the connection was never established, so Slack got nothing."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class _MethodStats:
+    def __init__(self):
+        self.calls = 0
+        self.retries = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.latencies: deque[float] = deque(maxlen=256)
+
+    def as_dict(self) -> dict[str, Any]:
+        lat = sorted(self.latencies)
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "errors": self.errors,
+            "rate_limited": self.rate_limited,
+            "latency_avg": sum(lat) / len(lat) if lat else 0.0,
+            "latency_p95": lat[int(0.95 * (len(lat) - 1))] if lat else 0.0,
+            "latency_max": lat[-1] if lat else 0.0,
+        }
+
+
+class SlackClient:
+    """
+    Thin, thread-safe Slack Web API client.
+
+    Args:
+        base_url: Slack API base URL.
+        pool_size: Max keep-alive connections kept in the pool.
+        max_retries: Retries per call on 429/5xx/network errors.
+        backoff: Base backoff in seconds (full jitter, doubled per attempt).
+        max_backoff: Cap for a single backoff sleep.
+    """
+
+    def __init__(
+        self,
+        base_url: str = SLACK_API_BASE,
+        pool_size: int = 16,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 8.0,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._buckets: OrderedDict[tuple[str, str], _Bucket] = OrderedDict()
+        self._stats: dict[str, _MethodStats] = {}
+
+    def api_call(
+        self,
+        method: str,
+        *,
+        token: str | None = None,
+        json: dict | None = None,
+        data: dict | None = None,
+        params: dict | None = None,
+        http_method: str = "POST",
+        timeout: float = 10,
+        deadline: float | None = None,
+        best_effort: bool = False,
+        idempotent: bool = True,
+    ) -> dict[str, Any]:
+        """
+        Call a Slack Web API method and return its JSON body.
+
+        Args:
+            method: Slack method name, e.g. "views.open".
+            token: Bearer token (omit for oauth.v2.access).
+            json / data / params: Request body (JSON or form) or query params.
+            http_method: "POST" or "GET".
+            timeout: Per-attempt timeout in seconds.
+            deadline: Give up (no more waits/retries) after this many seconds,
+                e.g. 3s for views.open because trigger_ids expire; 0 means
+                fail at once rather than wait for a rate-limit token.
+            best_effort: Never wait or retry, and leave part of the bucket for
+                regular calls; the call fails with "ratelimited" instead.
+            idempotent: False for calls that must not run twice: no retries
+                at all. Failures where the request never reached Slack are
+                reported as "connect_failed"; read timeouts and 5xx stay
+                "request_failed"/"http_5xx" (the outcome is unknown).
+
+        Returns:
+            Slack's response dict. Transport failures are reported as
+            {"ok": False, "error": "..."} so callers only check `ok`.
+        """
+        start = time.monotonic()
+        with tracer.span(f"slack.{method}") as span:
+            result = self._api_call(
+                method, token=token, json=json, data=data, params=params,
+                http_method=http_method, timeout=timeout, deadline=deadline,
+                best_effort=best_effort, idempotent=idempotent,
+            )
+            span.set(ok=bool(result.get("ok")), slack_error=result.get("error"))
+        SLACK_API_SECONDS.labels(method).observe(time.monotonic() - start)
+        SLACK_API_CALLS.labels(method, "ok" if result.get("ok") else "error").inc()
+        return result
+
+    def _api_call(
+        self,
+        method: str,
+        *,
+        token: str | None = None,
+        json: dict | None = None,
+        data: dict | None = None,
+        params: dict | None = None,
+        http_method: str = "POST",
+        timeout: float = 10,
+        deadline: float | None = None,
+        best_effort: bool = False,
+        idempotent: bool = True,
+    ) -> dict[str, Any]:
+        bucket, stats = self._bucket_and_stats(method, token)
+        if best_effort:
+            deadline = 0.0
+        give_up_at = time.monotonic() + deadline if deadline is not None else None
+        url = f"{self.base_url}/{method}"
+        headers = self._auth_headers(token)
+
+        attempt = 0
+        while True:
+            max_wait = max(0.0, give_up_at - time.monotonic()) if give_up_at is not None else None
+            wait = bucket.reserve(max_wait, BEST_EFFORT_HEADROOM if best_effort else 0.0)
+            if wait is None:
+                return self._fail(stats, "ratelimited")
+            if wait > 0:
+                time.sleep(wait)
+
+            start = time.monotonic()
+            error = None
+            try:
+                resp = self.session.request(
+                    http_method, url, headers=headers, json=json, data=data,
+                    params=params, timeout=timeout,
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                resp = None
+                error = f"connect_failed: {e}" if _not_sent(e) else f"request_failed: {e}"
+            self._record_latency(stats, time.monotonic() - start)
+
+            if resp is not None and resp.status_code not in RETRY_STATUSES:
+                try:
+                    return resp.json()
+                except ValueError:
+                    return self._fail(stats, f"invalid_response: HTTP {resp.status_code}")
+
+            if resp is not None:
+                error = f"http_{resp.status_code}"
+            if not idempotent:
+                if resp is not None and resp.status_code == 429:
+                    # Not retried, but later calls still wait out Retry-After
+                    self._retry_delay(attempt, resp, bucket, stats)
+                return self._fail(stats, error)
+            if attempt >= self.max_retries:
+                return self._fail(stats, error)
+
+            delay = self._retry_delay(attempt, resp, bucket, stats)
+            if give_up_at is not None and time.monotonic() + delay > give_up_at:
+                return self._fail(stats, error)
+            with self._lock:
+                stats.retries += 1
+            attempt += 1
+            time.sleep(delay)
+
+    def respond(self, response_url: str, payload: dict[str, Any], timeout: float = 10) -> bool:
+        """
+        Post `payload` to a slash command's or interaction's response_url
+        (no token needed); returns whether Slack accepted it.
+        """
+        with tracer.span("slack.response_url") as span:
+            try:
+                resp = self.session.post(response_url, json=payload, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                span.set(ok=False)
+                return False
+            span.set(ok=resp.ok)
+            return resp.ok
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Per-method call/retry/latency counters."""
+        with self._lock:
+            return {m: s.as_dict() for m, s in self._stats.items()}
+
+    def _retry_delay(self, attempt: int, resp, bucket: _Bucket, stats: _MethodStats) -> float:
+        """Retry-After for 429s, otherwise exponential backoff with full jitter."""
+        if resp is not None and resp.status_code == 429:
+            with self._lock:
+                stats.rate_limited += 1
+            try:
+                retry_after = float(resp.headers.get("Retry-After", 1))
+            except ValueError:
+                retry_after = 1.0
+            bucket.block(retry_after)
+            return retry_after + random.uniform(0, self.backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def _bucket_and_stats(self, method: str, token: str | None) -> tuple[_Bucket, _MethodStats]:
+        key = (method, token or "")
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tier = METHOD_TIERS.get(method, DEFAULT_TIER)
+                bucket = self._buckets[key] = _Bucket(TIER_LIMITS[tier])
+                if len(self._buckets) > MAX_BUCKETS:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            stats = self._stats.setdefault(method, _MethodStats())
+            stats.calls += 1
+            return bucket, stats
+
+    @staticmethod
+    def _auth_headers(token: str | None) -> dict[str, str]:
+        # Built per call: caching per token would keep every user's token in memory
+        return {"Authorization": f"Bearer {token}"} if token else {}
+
+    def _record_latency(self, stats: _MethodStats, seconds: float):
+        with self._lock:
+            stats.latencies.append(seconds)
+
+    def _fail(self, stats: _MethodStats, error: str) -> dict[str, Any]:
+        with self._lock:
+            stats.errors += 1
+        return {"ok": False, "error": error}
@@ -0,0 +1,159 @@
+""" Slack Socket Mode transport.
+Receives slash commands and interactions over Slack's WebSocket API
+instead of the public /slack/rephrasely and /slack/interactions routes, so
+a process needs no inbound networking and requests skip the ingress hop.
+
+- Every envelope is acked right away and dispatched into the same pipeline
+  as the HTTP routes (`run_slash_command` / `run_interaction` in app.py).
+  Interactions are acked with their response (e.g. validation errors),
+  which the pipeline computes without waiting on Slack.
+- Events API callbacks go to `run_event` (tokens_revoked / app_uninstalled
+  drop the stored user tokens); subscribe to those events in the manifest.
+- Several connections are kept open (Slack spreads envelopes over up to 10
+  per app), and each one reconnects on its own: on a close, on a
+  `disconnect` message and when pongs stop coming.
+- Needs an app-level token with connections:write (SLACK_APP_TOKEN) and
+  `socket_mode_enabled: true` in the app manifest:
+
+    SLACK_APP_TOKEN=xapp-... python -m rephrasely.src.socket_mode --connections 2
+"""
+import argparse
+import logging
+import signal
+import threading
+from typing import Callable
+
+from slack_sdk import WebClient
+from slack_sdk.socket_mode import SocketModeClient
+from slack_sdk.socket_mode.request import SocketModeRequest
+from slack_sdk.socket_mode.response import SocketModeResponse
+
+from rephrasely.src.metrics import SOCKET_MODE_CONNECTIONS, SOCKET_MODE_ENVELOPES
+from rephrasely.src.settings import settings
+from rephrasely.src.slack_client import SLACK_API_BASE
+
+logger = logging.getLogger(__name__)
+
+# Slack allows at most 10 open connections per app
+MAX_CONNECTIONS = 10
+
+
+class SocketModeRunner:
+    """
+    Socket Mode connections feeding the app's request pipeline.
+
+    Args:
+        app_token: App-level token (xapp-…).
+        on_command: `on_command(payload)` for slash commands, called after the ack.
+        on_interaction: `on_interaction(payload)` returning the ack payload or None.
+        on_event: `on_event(payload)` for Events API callbacks, called after the ack.
+        connections: WebSocket connections to keep open.
+        concurrency: Envelopes handled at once per connection.
+        api_url: Slack Web API base URL (apps.connections.open hands out the socket URLs).
+        ping_interval: Seconds between pings; a connection without a pong for
+            four intervals is replaced.
+    """
+
+    def __init__(self, app_token: str, on_command: Callable[[dict], None],
+                 on_interaction: Callable[[dict], dict | None],
+                 on_event: Callable[[dict], None] | None = None, connections: int = 2,
+                 concurrency: int = 10, api_url: str = SLACK_API_BASE, ping_interval: float = 5):
+        self.app_token = app_token
+        self.on_command = on_command
+        self.on_interaction = on_interaction
+        self.on_event = on_event
+        self.connections = min(max(1, connections), MAX_CONNECTIONS)
+        self.concurrency = max(1, concurrency)
+        self.api_url = api_url
+        self.ping_interval = ping_interval
+
+        self.clients: list[SocketModeClient] = []
+
+    def start(self):
+        """Open the connections; raises if Slack refuses the app token."""
+        for i in range(self.connections):
+            client = SocketModeClient(
+                app_token=self.app_token,
+                web_client=WebClient(base_url=self.api_url.rstrip("/") + "/"),
+                auto_reconnect_enabled=True,
+                ping_interval=self.ping_interval,
+                concurrency=self.concurrency,
+                logger=logging.getLogger(f"{__name__}.{i}"),
+            )
+            client.socket_mode_request_listeners.append(self._handle)
+            client.connect()
+            self.clients.append(client)
+        SOCKET_MODE_CONNECTIONS.set_function(self.connected)
+
+    def stop(self):
+        """Close every connection (envelopes being handled are not waited for)."""
+        for client in self.clients:
+            client.close()
+        self.clients.clear()
+
+    def connected(self) -> int:
+        return sum(1 for client in self.clients if client.is_connected())
+
+    def _handle(self, client: SocketModeClient, req: SocketModeRequest):
+        SOCKET_MODE_ENVELOPES.labels(req.type).inc()
+        if req.type == "interactive":
+            try:
+                response = self.on_interaction(req.payload)
+            # pylint: disable=broad-except
+            except Exception:
+                logger.exception("Handling a %s interaction failed", req.payload.get("type"))
+                response = None
+            client.send_socket_mode_response(
+                SocketModeResponse(envelope_id=req.envelope_id, payload=response)
+            )
+            return
+
+        # Ack first: Slack redelivers envelopes that aren't acked within 3s
+        client.send_socket_mode_response(SocketModeResponse(envelope_id=req.envelope_id))
+        if req.type == "slash_commands":
+            self.on_command(req.payload)
+        elif req.type == "events_api" and self.on_event is not None:
+            self.on_event(req.payload)
+
+
+def main():
+    config = settings()
+    parser = argparse.ArgumentParser(description="Receive Slack requests over Socket Mode.")
+    parser.add_argument(
+        "--connections", type=int, default=config.get_int("REPHRASELY_SOCKET_CONNECTIONS", 2),
+        help=f"WebSocket connections to keep open (max {MAX_CONNECTIONS}).",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=config.get_int("REPHRASELY_SOCKET_CONCURRENCY", 10),
+        help="Envelopes handled at once per connection.",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    if not config.slack_app_token:
+        raise SystemExit("SLACK_APP_TOKEN (an xapp- app-level token) must be set for Socket Mode.")
+
+    # pylint: disable=import-outside-toplevel
+    from rephrasely.src.app import run_event, run_interaction, run_slash_command, services, slack
+
+    # Build the routers, caches and pools now rather than on the first envelope
+    services()
+
+    runner = SocketModeRunner(
+        config.slack_app_token, run_slash_command, run_interaction, on_event=run_event,
+        connections=args.connections, concurrency=args.concurrency, api_url=slack.base_url,
+    )
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+
+    runner.start()
+    logger.info("Socket Mode started with %d connection(s)", runner.connections)
+    stop.wait()
+    runner.stop()
+    logger.info("Socket Mode stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+""" Incremental Server-Sent Events decoding for chat-completion streams.
+- `SSEDecoder` is fed raw byte chunks exactly as they come off the socket
+  (lines may be split anywhere) and returns complete events. It follows
+  the SSE spec: LF/CRLF/CR line endings, multi-line `data:`, `event:`,
+  `id:` and `retry:` fields, and `:` comment lines (keepalives).
+- `chat_events` turns the events of an OpenAI-style chat/completions stream
+  (xAI) into typed deltas: content, finish reason and usage. A malformed
+  event becomes a `ParseError` delta; it is never mixed into the text.
+"""
+import json
+import re
+from typing import Any, Iterable, Iterator, NamedTuple
+
+DONE = b"[DONE]"
+
+_decode = json.JSONDecoder().decode
+_scanstring = json.decoder.scanstring
+
+# A compact content chunk has exactly this key, and none of the other fields
+# (unescaped quotes cannot occur inside a JSON string, so these only match keys)
+_CONTENT_KEY = '"delta":{"content":"'
+_OTHER_FIELDS = re.compile(r'"(?:finish_reason|usage|error)":\s*[^n\s]')
+
+
+class SSEEvent(NamedTuple):
+    data: bytes
+    event: str = "message"
+    id: str | None = None
+
+
+class SSEDecoder:
+    """
+    Incremental SSE parser. Call `feed(chunk)` for each received chunk, then
+    `close()` once the stream ends.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._data: list[bytes] = []
+        self._event = ""
+        self._pending_cr = False
+        self.last_event_id: str | None = None
+        self.retry: int | None = None
+        self.comments = 0
+
+    def feed(self, chunk: bytes) -> list[SSEEvent]:
+        """Parse `chunk` and return the events it completed."""
+        if self._pending_cr and chunk[:1] == b"\n":
+            # CRLF split across chunks: the CR already ended the line
+            chunk = chunk[1:]
+        self._pending_cr = False
+        if b"\n" not in chunk and b"\r" not in chunk:
+            # Middle of a line: nothing to parse yet
+            self._buffer += chunk
+            return []
+        if self._buffer:
+            # Only a partial line is ever buffered; usually chunks are parsed in place
+            self._buffer += chunk
+            chunk = bytes(self._buffer)
+            self._buffer.clear()
+
+        # bytes.splitlines splits on exactly the SSE line endings (LF, CRLF, CR)
+        lines = chunk.splitlines(True)
+        if lines and lines[-1][-1:] not in (b"\n", b"\r"):
+            self._buffer += lines.pop()
+        if lines and lines[-1][-1:] == b"\r":
+            self._pending_cr = True
+
+        events: list[SSEEvent] = []
+        for line in lines:
+            line = line.rstrip(b"\r\n") if len(line) > 1 else b""
+            if line[:5] == b"data:":
+                # Fast path: nearly every line of a completion stream
+                self._data.append(line[6:] if line[5:6] == b" " else line[5:])
+                continue
+            event = self._line(line)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def close(self) -> list[SSEEvent]:
+        """
+        End of stream: a final line without a newline is processed, and an
+        event not terminated by a blank line is still delivered (servers
+        commonly omit the last one).
+        """
+        events = []
+        if self._buffer:
+            event = self._line(bytes(self._buffer))
+            self._buffer.clear()
+            if event is not None:
+                events.append(event)
+        event = self._dispatch()
+        if event is not None:
+            events.append(event)
+        return events
+
+    def _line(self, line: bytes) -> SSEEvent | None:
+        if not line:
+            return self._dispatch()
+        if line[0] == 0x3A:  # ":" comment / keepalive
+            self.comments += 1
+            return None
+        name, sep, value = line.partition(b":")
+        if sep and value[:1] == b" ":
+            value = value[1:]
+        if name == b"data":
+            self._data.append(value)
+        elif name == b"event":
+            self._event = value.decode("utf-8", "replace")
+        elif name == b"id":
+            if b"\0" not in value:
+                self.last_event_id = value.decode("utf-8", "replace")
+        elif name == b"retry":
+            if value.isdigit():
+                self.retry = int(value)
+        # Unknown fields are ignored, as the spec requires
+        return None
+
+    def _dispatch(self) -> SSEEvent | None:
+        data, event = self._data, self._event
+        self._data, self._event = [], ""
+        if not data:
+            return None
+        return SSEEvent(
+            data=data[0] if len(data) == 1 else b"\n".join(data),
+            event=event or "message",
+            id=self.last_event_id,
+        )
+
+
+def iter_events(chunks: Iterable[bytes]) -> Iterator[SSEEvent]:
+    """Decode an iterable of byte chunks into SSE events."""
+    decoder = SSEDecoder()
+    for chunk in chunks:
+        if chunk:
+            yield from decoder.feed(chunk)
+    yield from decoder.close()
+
+
+class ContentDelta(NamedTuple):
+    text: str
+
+
+class FinishDelta(NamedTuple):
+    reason: str
+
+
+class UsageDelta(NamedTuple):
+    prompt_tokens: int | None
+    completion_tokens: int | None
+
+
+class ParseError(NamedTuple):
+    """An event that could not be understood; `raw` is its (truncated) data."""
+    error: str
+    raw: bytes
+
+
+ChatDelta = ContentDelta | FinishDelta | UsageDelta | ParseError
+
+
+class StreamError(RuntimeError):
+    """The server reported an error inside the stream."""
+
+
+def chat_events(events: Iterable[SSEEvent]) -> Iterator[ChatDelta]:
+    """
+    Typed deltas of a chat/completions stream, up to `data: [DONE]`.
+    Raises StreamError if the stream carries an error object.
+    """
+    for event in events:
+        data = event.data
+        if data == DONE:
+            return
+        try:
+            text = data.decode("utf-8")
+            i = text.find(_CONTENT_KEY)
+            if i != -1 and not _OTHER_FIELDS.search(text):
+                # Fast path for plain content chunks: decode only the content string
+                content, _ = _scanstring(text, i + len(_CONTENT_KEY))
+                if content:
+                    yield ContentDelta(content)
+                continue
+            # str input skips json.loads' encoding detection
+            obj: Any = _decode(text)
+        except ValueError as e:  # includes UnicodeDecodeError
+            yield ParseError(f"invalid JSON: {e}", data[:200])
+            continue
+        try:
+            if event.event == "error" or obj.get("error"):
+                error = obj.get("error") or obj
+                raise StreamError(str(error.get("message", error) if isinstance(error, dict) else error))
+            text = reason = None
+            choices = obj.get("choices")
+            if choices:
+                choice = choices[0]
+                delta = choice.get("delta")
+                text = delta.get("content") if delta else None
+                if text is None:
+                    # Legacy completion / non-delta shapes
+                    message = choice.get("message")
+                    text = choice.get("text") or (message.get("content") if message else None)
+                reason = choice.get("finish_reason")
+            usage = obj.get("usage")
+        except (AttributeError, TypeError, IndexError) as e:
+            yield ParseError(f"unexpected event shape: {e}", data[:200])
+            continue
+        if text:
+            yield ContentDelta(text)
+        if reason:
+            yield FinishDelta(reason)
+        if usage:
+            yield UsageDelta(usage.get("prompt_tokens"), usage.get("completion_tokens"))
@@ -0,0 +1,143 @@
+""" Per-user Slack token store.
+- Tokens are keyed by (team_id, user_id), so several workspaces and users
+  can install the app side by side.
+- Lookups hit an in-memory LRU first and read through to SQLite on a miss;
+  no file or registry access on the hot path.
+- Misses are cached briefly, so a token saved by another process (e.g. the
+  web tier during OAuth) shows up in workers within `negative_ttl`.
+- There is no shared fallback token: users without one get None and have
+  to authorize the app themselves.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+_MISSING = ""
+
+
+class TokenStore:
+    """
+    (team_id, user_id) -> user token, with a read-through memory cache.
+
+    Args:
+        db_path: SQLite file for the persistent store (None = memory only).
+        max_entries: Tokens kept in memory.
+        negative_ttl: Seconds a "no token stored" answer is cached.
+    """
+
+    def __init__(self, db_path: str | None = None, max_entries: int = 10000,
+                 negative_ttl: float = 30.0):
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+
+        self._lock = threading.Lock()
+        # key -> (token or _MISSING, cached at)
+        self._cache: OrderedDict[tuple[str, str], tuple[str, float]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.unauthorized = 0
+
+        self._db = None
+        if db_path:
+            self._db = self._open_db(db_path)
+
+    def get(self, team_id: str | None, user_id: str | None) -> str | None:
+        """The user's token, or None if they haven't authorized the app."""
+        token = self._lookup(team_id or "", user_id or "")
+        if token:
+            return token
+        with self._lock:
+            self.unauthorized += 1
+        return None
+
+    def put(self, team_id: str, user_id: str, token: str, scope: str = ""):
+        """Store (or replace) a user's token; written through to disk."""
+        key = (team_id or "", user_id or "")
+        with self._lock:
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO tokens (team_id, user_id, token, scope, updated)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key[0], key[1], token, scope, time.time()),
+                )
+                self._db.commit()
+            self._remember(key, token)
+
+    def delete(self, team_id: str, user_id: str):
+        """Forget a user's token (e.g. after tokens_revoked / app_uninstalled)."""
+        key = (team_id or "", user_id or "")
+        with self._lock:
+            if self._db is not None:
+                self._db.execute(
+                    "DELETE FROM tokens WHERE team_id = ? AND user_id = ?", key
+                )
+                self._db.commit()
+            self._cache.pop(key, None)
+
+    def delete_team(self, team_id: str):
+        """Forget every token of a workspace (e.g. after app_uninstalled)."""
+        team_id = team_id or ""
+        with self._lock:
+            if self._db is not None:
+                self._db.execute("DELETE FROM tokens WHERE team_id = ?", (team_id,))
+                self._db.commit()
+            for key in [key for key in self._cache if key[0] == team_id]:
+                del self._cache[key]
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "cached": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "unauthorized": self.unauthorized,
+            }
+
+    def _lookup(self, team_id: str, user_id: str) -> str | None:
+        key = (team_id, user_id)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                token, cached_at = entry
+                if token or time.monotonic() - cached_at < self.negative_ttl:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return token or None
+            self.misses += 1
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT token FROM tokens WHERE team_id = ? AND user_id = ?", key
+            ).fetchone()
+            token = row[0] if row else _MISSING
+            self._remember(key, token)
+            return token or None
+
+    def _remember(self, key: tuple[str, str], token: str):
+        """Caller holds the lock."""
+        self._cache[key] = (token, time.monotonic())
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def _open_db(db_path: str) -> sqlite3.Connection:
+        path = Path(db_path).expanduser()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        # Tokens are secrets: keep the file private to this user
+        os.chmod(path, 0o600)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS tokens ("
+            " team_id TEXT NOT NULL, user_id TEXT NOT NULL, token TEXT NOT NULL,"
+            " scope TEXT NOT NULL DEFAULT '', updated REAL NOT NULL,"
+            " PRIMARY KEY (team_id, user_id))"
+        )
+        db.commit()
+        return db
@@ -0,0 +1,255 @@
+""" Per-request trace timelines.
+- Each /re invocation gets a trace id; timed spans (LLM call, Slack API
+  calls, ...) are attached to it through a context variable, so code deep
+  in the pipeline records spans without passing the trace around.
+- Background threads inherit the trace when started through
+  `contextvars.copy_context()` (the job executor and the LLM router do).
+- The modal's view_id is bound to its trace, so the later view_submission
+  and chat.postMessage land on the same timeline.
+- Finished and running traces live in a bounded ring buffer, served as
+  JSON by a debug endpoint.
+- Payloads (LLM requests, error bodies) are only captured for a sampled
+  fraction of traces and are redacted first: secrets and message text are
+  replaced by their length. With tracing off, `span` is a no-op.
+"""
+import contextvars
+import itertools
+import random
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+# Keys whose values are replaced in captured payloads
+SECRET_KEYS = frozenset({
+    "token", "authorization", "access_token", "client_secret", "api_key", "code",
+})
+# Error bodies and raw stream events can echo the user's text back, so they count as text
+TEXT_KEYS = frozenset({"content", "text", "prompt", "initial_value", "value", "response", "body", "raw"})
+
+_current_trace: contextvars.ContextVar["Trace | None"] = contextvars.ContextVar("trace", default=None)
+_current_span: contextvars.ContextVar[int | None] = contextvars.ContextVar("span", default=None)
+
+
+def redact(payload: Any, max_string: int = 200) -> Any:
+    """Copy of `payload` with secrets and message text replaced by their length."""
+    if isinstance(payload, dict):
+        result = {}
+        for key, value in payload.items():
+            lowered = str(key).lower()
+            if lowered in SECRET_KEYS:
+                result[key] = "[secret]"
+            elif lowered in TEXT_KEYS and isinstance(value, str):
+                result[key] = f"[{len(value)} chars]"
+            else:
+                result[key] = redact(value, max_string)
+        return result
+    if isinstance(payload, (list, tuple)):
+        return [redact(item, max_string) for item in payload]
+    if isinstance(payload, str) and len(payload) > max_string:
+        return payload[:max_string] + f"… [{len(payload)} chars]"
+    return payload
+
+
+@dataclass
+class Span:
+    id: int
+    parent: int | None
+    name: str
+    start: float  # monotonic
+    thread: str
+    attrs: dict[str, Any] = field(default_factory=dict)
+    end: float | None = None
+    error: str | None = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+@dataclass(eq=False)
+class Trace:
+    """One request's timeline."""
+    id: str
+    name: str
+    sampled: bool
+    started_at: float = field(default_factory=time.time)
+    start: float = field(default_factory=time.monotonic)
+    spans: list[Span] = field(default_factory=list)
+    payloads: list[dict[str, Any]] = field(default_factory=list)
+    view_id: str = ""
+
+    @property
+    def duration(self) -> float:
+        ends = [s.end for s in self.spans if s.end is not None]
+        return (max(ends) if ends else time.monotonic()) - self.start
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 1),
+            "spans": len(self.spans),
+            "errors": sum(1 for s in self.spans if s.error),
+            "view_id": self.view_id,
+            "sampled": self.sampled,
+        }
+
+    def as_dict(self) -> dict[str, Any]:
+        def ms(t: float | None) -> float | None:
+            return None if t is None else round((t - self.start) * 1000, 1)
+
+        return {
+            **self.summary(),
+            "timeline": [
+                {
+                    "id": s.id, "parent": s.parent, "name": s.name, "thread": s.thread,
+                    "start_ms": ms(s.start), "end_ms": ms(s.end),
+                    "duration_ms": None if s.end is None else round((s.end - s.start) * 1000, 1),
+                    "attrs": s.attrs, "error": s.error,
+                }
+                for s in list(self.spans)
+            ],
+            "payloads": list(self.payloads),
+        }
+
+
+class _NullSpan:
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """
+    Creates traces and keeps the most recent ones.
+
+    Args:
+        enabled: Record spans at all (off: every call is a cheap no-op).
+        capacity: Traces kept in the ring buffer.
+        payload_sample_rate: Fraction of traces whose payloads are captured (redacted).
+        max_spans: Spans kept per trace (protects against runaway loops).
+    """
+
+    def __init__(self, enabled: bool = True, capacity: int = 200, payload_sample_rate: float = 0.0,
+                 max_spans: int = 200):
+        self.enabled = enabled
+        self.capacity = capacity
+        self.payload_sample_rate = payload_sample_rate
+        self.max_spans = max_spans
+
+        self._lock = threading.Lock()
+        self._traces: OrderedDict[str, Trace] = OrderedDict()
+        self._views: OrderedDict[str, str] = OrderedDict()  # view_id -> trace id
+        self._span_ids = itertools.count(1)
+
+    @staticmethod
+    def current() -> Trace | None:
+        return _current_trace.get()
+
+    @contextmanager
+    def trace(self, name: str, view_id: str = "", **attrs) -> Iterator[Span | _NullSpan]:
+        """
+        Root span of a request. Reuses the active trace, else the trace bound
+        to `view_id`, else starts a new one.
+        """
+        if not self.enabled:
+            yield _NULL_SPAN
+            return
+        trace = _current_trace.get() or (self._for_view(view_id) if view_id else None)
+        if trace is None:
+            trace = self._new_trace(name)
+        token = _current_trace.set(trace)
+        try:
+            with self.span(name, **attrs) as span:
+                yield span
+        finally:
+            _current_trace.reset(token)
+
+    @contextmanager
+    def span(self, name: str, **attrs) -> Iterator[Span | _NullSpan]:
+        """Timed span on the active trace (no-op outside a trace)."""
+        trace = _current_trace.get()
+        if trace is None or len(trace.spans) >= self.max_spans:
+            yield _NULL_SPAN
+            return
+        span = Span(
+            id=next(self._span_ids), parent=_current_span.get(), name=name,
+            start=time.monotonic(), thread=threading.current_thread().name, attrs=attrs,
+        )
+        trace.spans.append(span)
+        token = _current_span.set(span.id)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"[:300]
+            raise
+        finally:
+            span.end = time.monotonic()
+            _current_span.reset(token)
+
+    def capture(self, name: str, payload: Any):
+        """Store a redacted copy of `payload` if the active trace is sampled."""
+        trace = _current_trace.get()
+        if trace is None or not trace.sampled:
+            return
+        trace.payloads.append({
+            "name": name,
+            "at_ms": round((time.monotonic() - trace.start) * 1000, 1),
+            "span": _current_span.get(),
+            "payload": redact(payload),
+        })
+
+    def bind_view(self, view_id: str):
+        """Attach `view_id` to the active trace, for later interactions on that modal."""
+        trace = _current_trace.get()
+        if trace is None or not view_id:
+            return
+        trace.view_id = view_id
+        with self._lock:
+            self._views[view_id] = trace.id
+            while len(self._views) > self.capacity:
+                self._views.popitem(last=False)
+
+    def get(self, trace_id: str) -> Trace | None:
+        with self._lock:
+            return self._traces.get(trace_id)
+
+    def recent(self, limit: int = 50, slowest: bool = False) -> list[Trace]:
+        """Newest traces first, or the slowest ones."""
+        with self._lock:
+            traces = list(self._traces.values())
+        if slowest:
+            traces.sort(key=lambda t: t.duration, reverse=True)
+        else:
+            traces.reverse()
+        return traces[:limit]
+
+    def _new_trace(self, name: str) -> Trace:
+        sampled = self.payload_sample_rate > 0 and random.random() < self.payload_sample_rate
+        trace = Trace(id=secrets.token_hex(8), name=name, sampled=sampled)
+        with self._lock:
+            self._traces[trace.id] = trace
+            while len(self._traces) > self.capacity:
+                self._traces.popitem(last=False)
+        return trace
+
+    def _for_view(self, view_id: str) -> Trace | None:
+        with self._lock:
+            trace_id = self._views.get(view_id)
+            return self._traces.get(trace_id) if trace_id else None
+
+
+tracer = Tracer()
+
+
+def configure(enabled: bool = True, capacity: int = 200, payload_sample_rate: float = 0.0):
+    """Apply settings to the process-wide tracer."""
+    tracer.enabled = enabled
+    tracer.capacity = capacity
+    tracer.payload_sample_rate = payload_sample_rate
@@ -0,0 +1,174 @@
+""" Sentence-level translation memory.
+- Input is split into sentence/line segments.
+- Each segment is looked up by the hash of its normalized text. Only exact
+  hits are reused: a near match can differ by a single word ("no", "not")
+  that flips the meaning, so it goes to the LLM like any other miss.
+- Only runs of unmatched segments go to the LLM; results are stitched back
+  in order and learned segment by segment when the output lines up.
+"""
+import contextvars
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from rephrasely.src.rephrase_cache import normalize_text
+
+# Split after sentence punctuation or at line breaks, keeping the separators
+_SEGMENT_SPLIT = re.compile(r"((?<=[.!?…])\s+|\s*\n\s*)")
+
+
+def split_segments(text: str) -> list[tuple[str, str]]:
+    """Split text into (segment, separator_after) pairs; joining them gives the text back."""
+    parts = _SEGMENT_SPLIT.split(text or "")
+    pairs = []
+    for i in range(0, len(parts), 2):
+        segment = parts[i]
+        sep = parts[i + 1] if i + 1 < len(parts) else ""
+        if segment:
+            pairs.append((segment, sep))
+        elif pairs:
+            # Empty segment (e.g. leading separator): fold its separator into the previous one
+            pairs[-1] = (pairs[-1][0], pairs[-1][1] + sep)
+        elif sep:
+            pairs.append(("", sep))
+    return pairs
+
+
+class TranslationMemory:
+    """
+    Segment store with exact (normalized text hash) lookup.
+
+    Args:
+        max_entries: Segments kept (least recently used are evicted).
+        max_parallel: Concurrent LLM calls for separate unmatched runs.
+    """
+
+    def __init__(self, max_entries: int = 20000, max_parallel: int = 4):
+        self.max_entries = max_entries
+        self.max_parallel = max_parallel
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[str, str]] = OrderedDict()
+
+        self.segments = 0
+        self.exact_hits = 0
+        self.llm_segments = 0
+
+    @staticmethod
+    def _key(segment: str) -> str:
+        return hashlib.sha1(normalize_text(segment).encode("utf-8")).hexdigest()
+
+    def lookup(self, segment: str) -> str | None:
+        """Return the stored translation for `segment` (exact match only)."""
+        key = self._key(segment)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return entry[1]
+
+    def add(self, source: str, target: str):
+        """Remember the translation of one segment."""
+        if not source.strip() or not target.strip():
+            return
+        key = self._key(source)
+        with self._lock:
+            self._entries[key] = (source, target)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def rephrase(self, text: str, translate: Callable[..., str],
+                 on_delta: Callable[[str], None] | None = None,
+                 learn: Callable[[], bool] | None = None) -> str:
+        """
+        Translate `text`, reusing stored segments.
+
+        `translate(run_text, on_delta=None)` is called once per run of
+        consecutive unmatched segments. `on_delta` is only forwarded when
+        the whole text is a single unmatched run (nothing to stitch).
+        `learn()` is asked after each translation; False keeps its output
+        out of the memory (e.g. it was written with a channel's private
+        messages in the prompt, and the memory is shared by every channel).
+        """
+        learn = learn or (lambda: True)
+        pairs = split_segments(text)
+        results: list[str | None] = []
+        for segment, _ in pairs:
+            results.append(self.lookup(segment) if segment.strip() else segment)
+
+        # Group consecutive misses into runs: (first index, last index)
+        runs: list[tuple[int, int]] = []
+        for i, result in enumerate(results):
+            if result is not None:
+                continue
+            if runs and runs[-1][1] == i - 1:
+                runs[-1] = (runs[-1][0], i)
+            else:
+                runs.append((i, i))
+
+        with self._lock:
+            self.segments += sum(1 for segment, _ in pairs if segment.strip())
+            self.llm_segments += sum(end - start + 1 for start, end in runs)
+
+        if len(runs) == 1 and runs[0] == (0, len(pairs) - 1):
+            output = translate(text, on_delta=on_delta)
+            if learn():
+                self._learn(pairs, output)
+            return output
+
+        def run_text(start: int, end: int) -> str:
+            # Separators inside the run stay; the trailing one is stitched back later
+            return "".join(seg + sep for seg, sep in pairs[start:end]) + pairs[end][0]
+
+        run_outputs: dict[int, str] = {}
+        if runs:
+            with ThreadPoolExecutor(max_workers=min(self.max_parallel, len(runs))) as pool:
+                # One context copy per run, so each LLM call joins the caller's trace
+                futures = [
+                    pool.submit(contextvars.copy_context().run, translate, run_text(*r)) for r in runs
+                ]
+                outputs = [future.result() for future in futures]
+            learned = learn()
+            for (start, end), output in zip(runs, outputs):
+                if learned:
+                    self._learn(pairs[start:end + 1], output)
+                run_outputs[start] = output
+
+        # Stitch: stored segments and run outputs, each followed by its separator
+        pieces = []
+        run_end = {start: end for start, end in runs}
+        i = 0
+        while i < len(pairs):
+            if i in run_end:
+                end = run_end[i]
+                pieces.append(run_outputs[i] + pairs[end][1])
+                i = end + 1
+            else:
+                pieces.append(results[i] + pairs[i][1])
+                i += 1
+        return "".join(pieces).strip()
+
+    def stats(self) -> dict[str, Any]:
+        """Segment counters and hit ratio."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "segments": self.segments,
+                "exact_hits": self.exact_hits,
+                "llm_segments": self.llm_segments,
+                "hit_ratio": self.exact_hits / self.segments if self.segments else 0.0,
+            }
+
+    def _learn(self, pairs: list[tuple[str, str]], output: str):
+        """Store per-segment translations when the output splits the same way."""
+        sources = [seg for seg, _ in pairs if seg.strip()]
+        targets = [seg for seg, _ in split_segments(output) if seg.strip()]
+        if len(sources) == len(targets):
+            for source, target in zip(sources, targets):
+                self.add(source, target)
@@ -0,0 +1,84 @@
+""" Several rephrase variants (e.g. formal / neutral / casual) from one LLM call.
+The model is asked for a JSON object mapping each tone to its text;
+`parse_variants` accepts that, fenced or wrapped JSON, or "Tone: text" lines.
+"""
+import json
+import re
+
+DEFAULT_TONES = ("formal", "neutral", "casual")
+
+VARIANTS_INSTRUCTIONS = (
+    "Write one version of the improved text for each of these tones: {tones}. "
+    "Answer with only a JSON object whose keys are exactly those tones and whose "
+    "values are the rewritten texts."
+)
+
+
+class VariantsParseError(ValueError):
+    """Raised when no variant could be recovered from the model output."""
+
+
+def variants_prompt(prompt: str, tones: tuple[str, ...]) -> str:
+    """User prompt asking for one version per tone."""
+    return f"{VARIANTS_INSTRUCTIONS.format(tones=', '.join(tones))}\n\n{prompt}"
+
+
+def variants_schema(tones: tuple[str, ...]) -> dict:
+    """JSON schema for structured-output capable APIs."""
+    return {
+        "type": "object",
+        "properties": {tone: {"type": "string"} for tone in tones},
+        "required": list(tones),
+        "additionalProperties": False,
+    }
+
+
+def _json_object(text: str) -> dict | None:
+    """Find a JSON object in text: plain, inside ``` fences, or embedded."""
+    candidates = [text.strip()]
+    fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL)
+    if fenced:
+        candidates.append(fenced.group(1).strip())
+    start, end = text.find("{"), text.rfind("}")
+    if 0 <= start < end:
+        candidates.append(text[start:end + 1])
+    for candidate in candidates:
+        try:
+            obj = json.loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(obj, dict):
+            return obj
+    return None
+
+
+def parse_variants(text: str, tones: tuple[str, ...]) -> dict[str, str]:
+    """
+    Map each tone to its text. Missing tones are dropped; if nothing parses,
+    the whole output is used as the first tone's text.
+    """
+    variants: dict[str, str] = {}
+    obj = _json_object(text or "")
+    if obj is not None:
+        lowered = {str(k).strip().lower(): v for k, v in obj.items()}
+        for tone in tones:
+            value = lowered.get(tone.lower())
+            if isinstance(value, str) and value.strip():
+                variants[tone] = value.strip()
+
+    if not variants:
+        # "Formal: ...", "**Casual**: ..." style answers
+        pattern = re.compile(
+            rf"^\W*({'|'.join(map(re.escape, tones))})\W*:\s*(.*?)(?=^\W*(?:{'|'.join(map(re.escape, tones))})\W*:|\Z)",
+            re.IGNORECASE | re.MULTILINE | re.DOTALL,
+        )
+        for match in pattern.finditer(text or ""):
+            tone = next(t for t in tones if t.lower() == match.group(1).lower())
+            if match.group(2).strip():
+                variants.setdefault(tone, match.group(2).strip())
+
+    if not variants:
+        if not (text or "").strip():
+            raise VariantsParseError("Empty model output.")
+        variants[tones[0]] = text.strip()
+    return variants
@@ -0,0 +1,165 @@
+""" LLM worker process.
+Leases rephrase jobs from the durable queue (REPHRASELY_JOB_DB) and runs
+them through the same pipeline as the web process, so web and LLM workers
+can be scaled separately on one box. Finished jobs are deleted after
+REPHRASELY_JOB_RETENTION seconds (default one day).
+
+    REPHRASELY_JOB_DB=/var/lib/rephrasely/jobs.db python -m rephrasely.src.worker --threads 4
+"""
+import argparse
+import logging
+import signal
+import threading
+from typing import Callable
+
+from rephrasely.src.cancellation import CancelToken
+from rephrasely.src.job_queue import DurableJobQueue, QueuedJob, worker_id
+from rephrasely.src.metrics import QUEUE_WAIT_SECONDS
+from rephrasely.src.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    Threads that lease and run jobs until stopped.
+
+    Args:
+        queue: The shared durable queue.
+        run: `run(job, cancel_token)` doing the actual work.
+        threads: Jobs run concurrently by this process.
+        model: Only lease jobs queued for this model (None = any).
+        poll_interval: Seconds to sleep when the queue is empty.
+        heartbeat_interval: Seconds between lease extensions / cancel checks.
+        retention: Finished jobs older than this many seconds are deleted.
+        purge_interval: Seconds between those deletions (0 disables them).
+    """
+
+    def __init__(self, queue: DurableJobQueue, run: Callable[[QueuedJob, CancelToken], None],
+                 threads: int = 1, model: str | None = None, poll_interval: float = 0.5,
+                 heartbeat_interval: float = 1.0, retention: float = 24 * 3600,
+                 purge_interval: float = 3600):
+        self.queue = queue
+        self.run = run
+        self.threads = max(1, threads)
+        self.model = model
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = min(heartbeat_interval, queue.visibility_timeout / 3)
+        self.retention = retention
+        self.purge_interval = purge_interval
+
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def start(self):
+        for i in range(self.threads):
+            t = threading.Thread(target=self._loop, name=f"rephrasely-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        if self.purge_interval > 0:
+            t = threading.Thread(target=self._purge_loop, name="rephrasely-purge", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        """Stop leasing new jobs; jobs already running are finished."""
+        self._stop.set()
+
+    def join(self):
+        for t in self._threads:
+            t.join()
+
+    def _loop(self):
+        owner = worker_id()
+        while not self._stop.is_set():
+            try:
+                job = self.queue.lease(owner, model=self.model)
+            # pylint: disable=broad-except
+            except Exception:
+                logger.exception("Leasing a job failed")
+                job = None
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            self._run_job(job, owner)
+
+    def _purge_loop(self):
+        """Keep the queue file from growing with finished jobs."""
+        while not self._stop.wait(self.purge_interval):
+            try:
+                purged = self.queue.purge(self.retention)
+            # pylint: disable=broad-except
+            except Exception:
+                logger.exception("Purging finished jobs failed")
+                continue
+            if purged:
+                logger.info("Purged %d finished job(s)", purged)
+
+    def _run_job(self, job: QueuedJob, owner: str):
+        QUEUE_WAIT_SECONDS.labels("durable").observe(job.wait_time)
+        token = CancelToken()
+        done = threading.Event()
+
+        def keep_alive():
+            while not done.wait(self.heartbeat_interval):
+                if not self.queue.heartbeat(job.id, owner):
+                    # Cancelled (modal closed) or the lease went to another worker
+                    token.cancel()
+                    return
+
+        threading.Thread(target=keep_alive, name=f"lease-{job.id}", daemon=True).start()
+        try:
+            self.run(job, token)
+        # pylint: disable=broad-except
+        except Exception as e:
+            logger.exception("Job %s failed (attempt %d)", job.id, job.attempts)
+            self.queue.fail(job.id, owner, str(e))
+        else:
+            if not token.cancelled:
+                self.queue.complete(job.id, owner)
+        finally:
+            done.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Rephrasely LLM workers.")
+    parser.add_argument(
+        "--threads", type=int,
+        default=settings().get_int("REPHRASELY_WORKER_THREADS", 2),
+        help="Jobs run concurrently by this process.",
+    )
+    parser.add_argument("--model", default=None, help="Only run jobs queued for this model.")
+    parser.add_argument("--poll", type=float, default=0.5, help="Idle poll interval in seconds.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    # pylint: disable=import-outside-toplevel
+    from rephrasely.src.app import _user_token, process_and_update_modal, services
+
+    # Builds the LLM routers, caches and pools from the environment
+    job_queue = services().job_queue
+    if job_queue is None:
+        raise SystemExit("REPHRASELY_JOB_DB must be set to run workers.")
+
+    worker = Worker(
+        job_queue,
+        lambda job, cancel: process_and_update_modal(
+            job.view_id, job.channel, job.text, cancel,
+            slack_token=_user_token(job.team_id, job.user_id),
+        ),
+        threads=args.threads, model=args.model, poll_interval=args.poll,
+        retention=settings().get_float("REPHRASELY_JOB_RETENTION", 24 * 3600),
+        purge_interval=settings().get_float("REPHRASELY_JOB_PURGE_INTERVAL", 3600),
+    )
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: worker.stop())
+
+    logger.info("Worker started with %d thread(s) on %s", worker.threads, job_queue.path)
+    worker.start()
+    worker.join()
+    logger.info("Worker stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+""" WSGI entry point for production servers.
+- `app` is the Flask app from `create_app()`; importing this module only
+  registers routes. Settings (and their file watcher), pools, LLM routers,
+  caches and their threads are loaded in each worker process on first use,
+  so it is safe to import in a pre-forking master (e.g. gunicorn --preload)
+  and workers can be added and removed cheaply.
+- Slash commands ack within Slack's 3s, so give each worker threads
+  rather than more processes for the concurrent requests:
+
+    gunicorn --workers 2 --threads 8 --preload rephrasely.src.wsgi:app
+"""
+from rephrasely.src.app import create_app
+
+app = create_app()
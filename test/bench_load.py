@@ -0,0 +1,378 @@
+""" End-to-end load test against local fake Slack / xAI / Ollama servers.
+Runs the Flask app in-process on a local port, with every outbound call
+pointed at the fakes in fake_servers.py, and drives `/slack/rephrasely` and
+`/slack/interactions` at a target concurrency (or, with --transport socket,
+sends the same requests as Socket Mode envelopes). Per request it measures:
+
+- ack: slash command response / envelope ack time (Slack's limit is 3s)
+- first_update: command sent -> first views.update (streamed partial or result)
+- total: command sent -> editable modal pushed (final views.update)
+- submit_ack: view_submission response / envelope ack time
+- post: view_submission sent -> chat.postMessage received
+
+and reports p50/p95/p99 plus throughput. The fake Slack enforces Slack's
+tier limits per method and token, as the real API does (--slack-rpm
+changes them for both the fake and the client). Results are written as JSON; pass
+an earlier file with --compare to print the difference.
+
+    PYTHONPATH=. python test/bench_load.py --requests 200 --concurrency 20 --out before.json
+    PYTHONPATH=. python test/bench_load.py --requests 200 --concurrency 20 --compare before.json
+    PYTHONPATH=. python test/bench_load.py --transport socket --compare before.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from fake_servers import Behavior, FakeOllama, FakeSlack, FakeSocketMode, FakeXAI  # noqa: E402
+from rephrasely.src.variants import DEFAULT_TONES  # noqa: E402
+
+METRICS = ("ack", "first_update", "total", "submit_ack", "post")
+
+# Spanish sentences (not clean English, so the input tiering never skips the LLM)
+SENTENCES = (
+    "hola equipo, necesito que revisen el despliegue de hoy antes de las cinco",
+    "el cliente pidió cambiar la fecha de entrega para la semana que viene",
+    "no pude correr los tests porque la base de datos de staging estaba caída",
+    "gracias por la ayuda con el módulo de pagos, ya quedó funcionando",
+)
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def summarize(values: list[float]) -> dict[str, float]:
+    return {
+        "count": len(values),
+        "p50": percentile(values, 0.50),
+        "p95": percentile(values, 0.95),
+        "p99": percentile(values, 0.99),
+        "mean": statistics.fmean(values) if values else 0.0,
+        "max": max(values, default=0.0),
+    }
+
+
+def message_text(i: int, words: int) -> str:
+    """A unique input of about `words` words (unique so caches never hit)."""
+    parts, n = [], 0
+    while n < words:
+        sentence = f"{SENTENCES[(i + len(parts)) % len(SENTENCES)]} (ref {i}-{len(parts)})."
+        parts.append(sentence)
+        n += len(sentence.split())
+    return " ".join(parts)
+
+
+def submission_values(view: dict, marker: str) -> dict:
+    """state.values for the final view, with every input replaced by `marker`."""
+    values = {}
+    for block in view.get("blocks", []):
+        if block.get("type") != "input":
+            continue
+        element = block["element"]
+        if element["type"] == "radio_buttons":
+            values[block["block_id"]] = {
+                element["action_id"]: {"selected_option": element["initial_option"]}
+            }
+        else:
+            values[block["block_id"]] = {element["action_id"]: {"value": marker}}
+    return values
+
+
+def configure_environment(args, tmp: str, slack: FakeSlack, xai: FakeXAI, ollama: FakeOllama):
+    """Settings the app reads when it starts; must run before the first request."""
+    os.environ.pop("REPHRASELY_CONFIG", None)
+    os.environ.update({
+        "SLACK_CLIENT_ID": "bench",
+        "SLACK_CLIENT_SECRET": "bench",
+        "XAI_API_KEY": "xai-bench",
+        "OLLAMA_BASE_URL": ollama.url,
+        "REPHRASELY_PROVIDERS": args.providers,
+        "REPHRASELY_TOKEN_DB": os.path.join(tmp, "tokens.db"),
+        "REPHRASELY_WORKERS": str(args.workers),
+        "REPHRASELY_QUEUE_SIZE": str(args.queue_size),
+        "REPHRASELY_STREAM_INTERVAL": str(args.stream_interval),
+        "REPHRASELY_TM": "1" if args.translation_memory else "0",
+        "REPHRASELY_CACHE_DB": "",
+    })
+    if args.variants:
+        os.environ["REPHRASELY_VARIANTS"] = ",".join(DEFAULT_TONES)
+    else:
+        os.environ.pop("REPHRASELY_VARIANTS", None)
+
+
+def slack_rate_limits(slack_rpm: int) -> dict[str, int]:
+    """Per-method limits for the fake Slack: the client's tiers, or `slack_rpm` for every method."""
+    # pylint: disable=import-outside-toplevel
+    from rephrasely.src.slack_client import METHOD_TIERS, TIER_LIMITS
+
+    return {method: slack_rpm or TIER_LIMITS[tier] for method, tier in METHOD_TIERS.items()}
+
+
+def start_app(slack: FakeSlack, xai: FakeXAI, slack_rpm: int | None, users: int):
+    """Create the app, point it at the fakes and serve it; returns (module, base_url, server)."""
+    # pylint: disable=import-outside-toplevel
+    from werkzeug.serving import make_server
+
+    from rephrasely.src import app as app_module
+    from rephrasely.src import grok_llm_rephrasely, slack_client
+
+    grok_llm_rephrasely.XAI_CHAT_URL = xai.chat_url
+    app_module.slack.base_url = slack.api_url
+    if slack_rpm:
+        # Same limit on both sides, e.g. lifted to measure the app rather than the buckets
+        for tier in slack_client.TIER_LIMITS:
+            slack_client.TIER_LIMITS[tier] = slack_rpm
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, app_module.create_app(), threaded=True)
+    # Every simulated user has authorized the app
+    tokens = app_module.services().tokens
+    for user in range(users):
+        tokens.put("T0001", f"U{user:04d}", f"xoxp-bench-{user}")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return app_module, f"http://127.0.0.1:{server.server_port}", server
+
+
+def start_socket_mode(app_module, slack: FakeSlack, socket_mode: FakeSocketMode, connections: int):
+    """Connect the app to the fake over Socket Mode; returns the runner."""
+    # pylint: disable=import-outside-toplevel
+    from rephrasely.src.socket_mode import SocketModeRunner
+
+    slack.socket_url = socket_mode.ws_url
+    runner = SocketModeRunner(
+        "xapp-bench", app_module.run_slash_command, app_module.run_interaction,
+        connections=connections, api_url=slack.api_url,
+    )
+    runner.start()
+    socket_mode.wait_connections(connections, timeout=10)
+    return runner
+
+
+class Transport:
+    """Delivers a slash command or an interaction and returns (ack seconds, error or "")."""
+
+    def __init__(self, base_url: str, session: requests.Session, socket_mode: FakeSocketMode | None):
+        self.base_url = base_url
+        self.session = session
+        self.socket_mode = socket_mode
+
+    def command(self, form: dict) -> tuple[float, str]:
+        if self.socket_mode is not None:
+            return self._envelope("slash_commands", form)
+        start = time.monotonic()
+        resp = self.session.post(f"{self.base_url}/slack/rephrasely", data=form, timeout=30)
+        error = "" if resp.status_code == 200 else f"command HTTP {resp.status_code}"
+        return time.monotonic() - start, error
+
+    def interaction(self, payload: dict) -> tuple[float, str]:
+        if self.socket_mode is not None:
+            return self._envelope("interactive", payload)
+        start = time.monotonic()
+        resp = self.session.post(f"{self.base_url}/slack/interactions",
+                                 data={"payload": json.dumps(payload)}, timeout=30)
+        elapsed = time.monotonic() - start
+        if resp.status_code != 200 or resp.content:
+            return elapsed, f"submission rejected: HTTP {resp.status_code} {resp.text[:200]}"
+        return elapsed, ""
+
+    def _envelope(self, envelope_type: str, payload: dict) -> tuple[float, str]:
+        start = time.monotonic()
+        envelope_id = self.socket_mode.send(envelope_type, payload)
+        ack = self.socket_mode.wait_ack(envelope_id, timeout=30)
+        if ack is None:
+            return time.monotonic() - start, f"{envelope_type} never acked"
+        acked, response = ack
+        if response:
+            return acked - start, f"{envelope_type} rejected: {json.dumps(response)[:200]}"
+        return acked - start, ""
+
+
+def run_one(i: int, args, transport: Transport, slack: FakeSlack) -> dict:
+    """One full user flow: /re -> modal result -> submit -> message posted."""
+    trigger_id = f"trigger-{i}"
+    result: dict = {"i": i, "ok": False}
+    start = time.monotonic()
+    result["ack"], error = transport.command({
+        "trigger_id": trigger_id,
+        "channel_id": f"C{i % args.channels:04d}",
+        "user_id": f"U{i % args.users:04d}",
+        "team_id": "T0001",
+        "text": message_text(i, args.words),
+    })
+    if error:
+        result["error"] = error
+        return result
+
+    view_id = slack.wait_final_view(trigger_id, args.timeout)
+    if view_id is None:
+        result["error"] = "no final views.update"
+        return result
+    result["first_update"] = slack.first_update[view_id] - start
+    result["total"] = slack.final_update[view_id] - start
+
+    marker = f"bench-{i}"
+    view = dict(slack.final_view[view_id], id=view_id, hash=f"bench{i}")
+    view["state"] = {"values": submission_values(view, marker)}
+    payload = {"type": "view_submission", "user": {"id": f"U{i % args.users:04d}", "team_id": "T0001"},
+               "view": view}
+    submitted = time.monotonic()
+    result["submit_ack"], error = transport.interaction(payload)
+    if error:
+        result["error"] = error
+        return result
+
+    posted = slack.wait_posted(marker, args.timeout)
+    if posted is None:
+        result["error"] = "message never posted"
+        return result
+    result["post"] = posted - submitted
+    result["ok"] = True
+    return result
+
+
+def compare(current: dict, baseline: dict):
+    print(f"\nvs {baseline.get('label') or baseline.get('timestamp')}:")
+    for name in METRICS:
+        for q in ("p50", "p95", "p99"):
+            old = baseline["latency"].get(name, {}).get(q)
+            new = current["latency"][name][q]
+            if old:
+                print(f"  {name:>12} {q}: {old * 1000:8.1f} -> {new * 1000:8.1f} ms ({(new - old) / old:+.0%})")
+    old, new = baseline.get("throughput", 0), current["throughput"]
+    if old:
+        print(f"  {'throughput':>12}: {old:8.2f} -> {new:8.2f} req/s ({(new - old) / old:+.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end load test.")
+    parser.add_argument("--requests", type=int, default=100, help="User flows to run.")
+    parser.add_argument("--concurrency", type=int, default=10, help="Flows in flight at once.")
+    parser.add_argument("--words", type=int, default=30, help="Approximate words per input.")
+    parser.add_argument("--channels", type=int, default=10)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--transport", choices=("http", "socket"), default="http",
+                        help="Deliver requests to the HTTP routes or over Socket Mode.")
+    parser.add_argument("--socket-connections", type=int, default=2,
+                        help="Socket Mode connections (--transport socket).")
+    parser.add_argument("--providers", default="grok", help="REPHRASELY_PROVIDERS, e.g. 'grok,ollama'.")
+    parser.add_argument("--workers", type=int, default=4, help="REPHRASELY_WORKERS.")
+    parser.add_argument("--queue-size", type=int, default=256, help="REPHRASELY_QUEUE_SIZE.")
+    parser.add_argument("--stream-interval", type=float, default=1.0, help="REPHRASELY_STREAM_INTERVAL.")
+    parser.add_argument("--variants", action="store_true", help="Enable tone variants for short texts.")
+    parser.add_argument("--translation-memory", action="store_true")
+    parser.add_argument("--slack-rpm", type=int, default=0,
+                        help="Per-method, per-token requests/minute for the client and the fake "
+                             "Slack (default: Slack's real tier limits).")
+    parser.add_argument("--slack-latency", type=float, default=0.05)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="LLM time to first token.")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--tokens", type=int, default=40)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--ratelimit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds to wait per step.")
+    parser.add_argument("--label", default="", help="Free text stored with the results.")
+    parser.add_argument("--out", default="", help="Results file (default bench_results/load-<time>.json).")
+    parser.add_argument("--compare", default="", help="Earlier results file to compare against.")
+    args = parser.parse_args()
+
+    faults = {"jitter": args.jitter, "error_rate": args.error_rate, "ratelimit_rate": args.ratelimit_rate}
+    llm = Behavior(latency=args.llm_latency, token_delay=args.token_delay, tokens=args.tokens, **faults)
+    slack = FakeSlack(Behavior(latency=args.slack_latency, **faults), seed=args.seed,
+                      rate_limits=slack_rate_limits(args.slack_rpm)).start()
+    xai = FakeXAI(llm, seed=args.seed).start()
+    ollama = FakeOllama(llm, seed=args.seed).start()
+    socket_mode = None
+    if args.transport == "socket":
+        # No injected latency: the HTTP requests don't pay an ingress hop here either
+        socket_mode = FakeSocketMode(seed=args.seed).start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_environment(args, tmp, slack, xai, ollama)
+        app_module, base_url, server = start_app(slack, xai, args.slack_rpm, args.users)
+
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency)
+        session.mount("http://", adapter)
+        runner = None
+        if socket_mode is not None:
+            runner = start_socket_mode(app_module, slack, socket_mode, args.socket_connections)
+        transport = Transport(base_url, session, socket_mode)
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(lambda i: run_one(i, args, transport, slack),
+                                    range(args.requests)))
+        elapsed = time.monotonic() - started
+        server.shutdown()
+        if runner is not None:
+            runner.stop()
+
+        services = app_module.services()
+        app_stats = {
+            "executor": services.executor.stats(),
+            "slack": app_module.slack.stats(),
+            "router": services.router.stats(),
+            "outbox": services.outbox.stats(),
+        }
+
+    ok = [r for r in results if r["ok"]]
+    errors: dict[str, int] = {}
+    for r in results:
+        if not r["ok"]:
+            errors[r["error"]] = errors.get(r["error"], 0) + 1
+
+    report = {
+        "label": args.label,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "requests": len(results),
+        "succeeded": len(ok),
+        "failed": len(results) - len(ok),
+        "errors": errors,
+        "elapsed": elapsed,
+        "throughput": len(ok) / elapsed if elapsed else 0.0,
+        "latency": {name: summarize([r[name] for r in results if name in r]) for name in METRICS},
+        "fake_servers": {"slack": {**slack.stats(), "calls": slack.calls},
+                         "xai": xai.stats(), "ollama": ollama.stats()},
+        "app": app_stats,
+    }
+
+    print(f"{len(ok)}/{len(results)} flows OK in {elapsed:.1f}s "
+          f"({report['throughput']:.2f} req/s, concurrency {args.concurrency}, {args.transport})")
+    for name in METRICS:
+        s = report["latency"][name]
+        print(f"  {name:>12}: p50 {s['p50'] * 1000:8.1f}  p95 {s['p95'] * 1000:8.1f}  "
+              f"p99 {s['p99'] * 1000:8.1f}  max {s['max'] * 1000:8.1f} ms")
+    for error, count in errors.items():
+        print(f"  failed ({count}): {error}")
+    print(f"  slack calls: {slack.calls}")
+
+    out = Path(args.out or f"bench_results/load-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2, default=str))
+    print(f"Results written to {out}")
+
+    if args.compare:
+        compare(report, json.loads(Path(args.compare).read_text()))
+
+
+if __name__ == "__main__":
+    main()
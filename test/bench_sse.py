@@ -0,0 +1,137 @@
+""" Microbenchmark: decoding recorded xAI chat/completions streams.
+Replays the streams in test/data/*.sse through a `requests.Response` (so
+both paths pay the same requests/urllib3-style iteration) and compares the
+old line-based loop of grok_chat_stream with the incremental SSE decoder.
+Chunks are delivered either one SSE event per chunk (what the network
+usually gives) or split at random offsets.
+
+    PYTHONPATH=. python test/bench_sse.py --streams 200
+"""
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+
+import requests
+
+from rephrasely.src.sse import ContentDelta, ParseError, chat_events, iter_events
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+
+
+class _ReplayRaw:
+    """Stands in for urllib3's response: `stream()` yields the recorded chunks."""
+
+    def __init__(self, chunks: list[bytes]):
+        self.chunks = chunks
+
+    def stream(self, chunk_size=None, decode_content=True):  # pylint: disable=unused-argument
+        yield from self.chunks
+
+    def close(self):
+        pass
+
+
+def _response(chunks: list[bytes]) -> requests.Response:
+    resp = requests.Response()
+    resp.raw = _ReplayRaw(chunks)
+    resp.status_code = 200
+    resp.encoding = "utf-8"
+    return resp
+
+
+def legacy_deltas(resp: requests.Response) -> list[str]:
+    """The streaming loop grok_chat_stream used before the SSE decoder."""
+    out = []
+    for raw_line in resp.iter_lines(decode_unicode=True):
+        if not raw_line:
+            continue
+        line = raw_line.strip()
+        if line.startswith("data:"):
+            line = line[len("data:"):].strip()
+        if line == "[DONE]":
+            break
+        try:
+            obj = json.loads(line)
+            delta = obj.get("choices", [{}])[0].get("delta", {}).get("content", "")
+            if not delta:
+                delta = obj.get("choices", [{}])[0].get("text", "")
+            if not delta:
+                delta = obj.get("choices", [{}])[0].get("message", {}).get("content", "")
+        except Exception:  # pylint: disable=broad-except
+            delta = line
+        if delta:
+            out.append(delta)
+    return out
+
+
+def decoder_deltas(resp: requests.Response) -> list[str]:
+    out = []
+    for event in chat_events(iter_events(resp.iter_content(chunk_size=None))):
+        if isinstance(event, ContentDelta):
+            out.append(event.text)
+        elif isinstance(event, ParseError):
+            pass
+    return out
+
+
+def split_events(data: bytes) -> list[bytes]:
+    return [part + b"\n\n" for part in data.split(b"\n\n") if part]
+
+
+def split_random(data: bytes, rng: random.Random, max_size: int = 96) -> list[bytes]:
+    chunks, i = [], 0
+    while i < len(data):
+        n = rng.randint(1, max_size)
+        chunks.append(data[i:i + n])
+        i += n
+    return chunks
+
+
+def run(name: str, parse, streams: list[list[bytes]], tokens: int, repeat: int) -> float:
+    """Best of `repeat` passes over all streams."""
+    elapsed = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for chunks in streams:
+            parse(_response(chunks))
+        elapsed = min(elapsed, time.perf_counter() - start)
+    per_token = elapsed / (tokens * len(streams)) * 1e6
+    print(f"  {name:<10} {elapsed * 1000:8.1f} ms  {per_token:6.2f} µs/token  "
+          f"{tokens * len(streams) / elapsed:10.0f} tokens/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SSE stream decoding.")
+    parser.add_argument("--streams", type=int, default=200, help="Replays per recorded stream.")
+    parser.add_argument("--repeat", type=int, default=5, help="Passes per measurement (best is kept).")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    for path in sorted(DATA_DIR.glob("*.sse")):
+        data = path.read_bytes()
+        expected = decoder_deltas(_response([data]))
+        tokens = len(expected)
+        print(f"{path.name}: {len(data)} bytes, {tokens} content deltas")
+        for label, chunking in (("per event", lambda: split_events(data)),
+                                ("random", lambda: split_random(data, rng))):
+            streams = [chunking() for _ in range(args.streams)]
+            print(f" chunks: {label}")
+            legacy = run("legacy", legacy_deltas, streams, tokens, args.repeat)
+            decoder = run("decoder", decoder_deltas, streams, tokens, args.repeat)
+            print(f"  speedup    {legacy / decoder:.2f}x")
+
+            legacy_text = "".join(legacy_deltas(_response(streams[0])))
+            decoder_text = "".join(decoder_deltas(_response(streams[0])))
+            if decoder_text != "".join(expected):
+                raise SystemExit(f"decoder output changed with {label} chunking")
+            if legacy_text != decoder_text:
+                extra = legacy_text[len(decoder_text):] if legacy_text.startswith(decoder_text) else ""
+                print(f"  legacy output differs: {extra[:80]!r}…" if extra else "  legacy output differs")
+
+
+if __name__ == "__main__":
+    main()
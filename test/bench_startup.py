@@ -0,0 +1,119 @@
+""" Cold-start benchmark: what a freshly started worker process costs.
+Each run is a new interpreter that imports the WSGI app (`module:attr`,
+like a WSGI server would), then serves its first request through Flask's
+test client, and reports:
+
+- import: time until the app object exists (the process can accept requests)
+- first_request: time to serve the first request (a view_closed
+  interaction, which needs the job registry but no network)
+- rss_ready / rss_served: peak RSS after each step
+- threads_ready / threads_served: live threads after each step
+
+Runs are repeated and the median kept. Results are written as JSON; pass
+an earlier file with --compare to print the difference.
+
+    PYTHONPATH=. python test/bench_startup.py --out startup.json
+    PYTHONPATH=. python test/bench_startup.py --target rephrasely.src.app:app --out before.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+METRICS = ("import", "first_request", "rss_ready", "rss_served", "threads_ready", "threads_served")
+
+# Runs inside the measured interpreter; prints one JSON line
+_PROBE = """
+import importlib, json, resource, threading, time
+start = time.perf_counter()
+module, _, attr = {target!r}.partition(":")
+app = getattr(importlib.import_module(module), attr or "app")
+ready = time.perf_counter()
+rss_ready = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+threads_ready = threading.active_count()
+payload = json.dumps({{"type": "view_closed", "view": {{"id": "VBENCH"}}}})
+response = app.test_client().post("/slack/interactions", data={{"payload": payload}})
+served = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({{
+    "import": ready - start,
+    "first_request": served - ready,
+    "rss_ready": rss_ready / 1024,
+    "rss_served": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "threads_ready": threads_ready,
+    "threads_served": threading.active_count(),
+}}))
+"""
+
+
+def run_once(target: str, env: dict[str, str]) -> dict[str, float]:
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(target=target)],
+        env=env, capture_output=True, text=True, check=True, timeout=120,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def compare(current: dict, baseline: dict):
+    print(f"\nvs {baseline.get('label') or baseline.get('target')}:")
+    for name in METRICS:
+        old, new = baseline["median"].get(name), current["median"][name]
+        if old:
+            print(f"  {name:>15}: {old:9.2f} -> {new:9.2f} ({(new - old) / old:+.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure worker cold-start time and memory.")
+    parser.add_argument("--target", default="rephrasely.src.wsgi:app", help="WSGI app as module:attr.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--label", default="", help="Free text stored with the results.")
+    parser.add_argument("--out", default="", help="Results file (default bench_results/startup-<time>.json).")
+    parser.add_argument("--compare", default="", help="Earlier results file to compare against.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.pop("REPHRASELY_CONFIG", None)
+        env.update({
+            "PYTHONPATH": os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")])),
+            "SLACK_CLIENT_ID": "bench",
+            "SLACK_CLIENT_SECRET": "bench",
+            "REPHRASELY_TOKEN_DB": os.path.join(tmp, "tokens.db"),
+            "REPHRASELY_CACHE_DB": "",
+        })
+        run_once(args.target, env)  # warm the OS file cache and .pyc files
+        runs = [run_once(args.target, env) for _ in range(args.runs)]
+
+    median = {name: statistics.median(r[name] for r in runs) for name in METRICS}
+    report = {
+        "label": args.label,
+        "target": args.target,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "runs": runs,
+        "median": median,
+    }
+
+    print(f"{args.target}: median of {args.runs} runs")
+    print(f"  import        {median['import'] * 1000:8.1f} ms   rss {median['rss_ready']:6.1f} MB"
+          f"   threads {median['threads_ready']:.0f}")
+    print(f"  first request {median['first_request'] * 1000:8.1f} ms   rss {median['rss_served']:6.1f} MB"
+          f"   threads {median['threads_served']:.0f}")
+
+    out = Path(args.out or f"bench_results/startup-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {out}")
+
+    if args.compare:
+        compare(report, json.loads(Path(args.compare).read_text()))
+
+
+if __name__ == "__main__":
+    main()
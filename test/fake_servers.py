@@ -0,0 +1,645 @@
+""" Local stand-ins for the Slack Web API, xAI chat/completions and Ollama.
+- Every server injects configurable latency, jitter, 5xx errors and 429s
+  (with Retry-After), so the app's retry/backoff paths are exercised too.
+- FakeSlack enforces per-method, per-token rate limits (Slack's tiers in
+  bench_load.py) with 429 + Retry-After, and records when each view is opened, first updated and finally
+  updated (the editable view, the one with a "submit"), and when each
+  message is posted, so a driver can wait for and time those events.
+- FakeXAI streams SSE like /v1/chat/completions; FakeOllama streams NDJSON
+  like /api/generate. Both answer variant (JSON) prompts with JSON.
+- FakeSocketMode is a WebSocket endpoint speaking Slack's Socket Mode
+  protocol (hello, envelopes, acks, disconnect); FakeSlack hands out its
+  URL from apps.connections.open.
+
+Used by bench_load.py; can also be started on its own:
+
+    python test/fake_servers.py --latency 0.05 --error-rate 0.01
+"""
+import argparse
+import base64
+import hashlib
+import itertools
+import json
+import math
+import random
+import re
+import socket
+import struct
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Iterable
+from urllib.parse import parse_qs, urlparse
+
+
+@dataclass
+class Behavior:
+    """
+    Fault and latency injection for one fake server.
+
+    Args:
+        latency: Base seconds before the response starts (time to first byte/token).
+        jitter: Extra uniformly random seconds added to `latency`.
+        error_rate: Fraction of requests answered with HTTP 500.
+        ratelimit_rate: Fraction of requests answered with HTTP 429.
+        retry_after: Retry-After header (seconds) sent with 429s.
+        token_delay: Seconds between streamed tokens (LLM servers only).
+        tokens: Tokens generated per answer, before max_tokens (LLM servers only).
+    """
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    ratelimit_rate: float = 0.0
+    retry_after: int = 1
+    token_delay: float = 0.0
+    tokens: int = 40
+
+
+class _FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # socketserver's default listen backlog of 5 refuses connections under load
+    request_queue_size = 256
+
+    def __init__(self, handler, behavior: Behavior, seed: int | None):
+        super().__init__(("127.0.0.1", 0), handler)
+        self.behavior = behavior
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.requests = 0
+        self.injected_errors = 0
+        self.injected_429s = 0
+
+    def handle_error(self, request, client_address):
+        # Clients drop keep-alive connections (e.g. right after "[DONE]"); not worth a traceback
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+
+    server: _FakeServer
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def do_GET(self):
+        self._serve(None)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if "json" in (self.headers.get("Content-Type") or ""):
+            body = json.loads(raw or b"{}")
+        else:
+            body = {k: v[0] for k, v in parse_qs(raw.decode()).items()}
+        self._serve(body)
+
+    def _serve(self, body: dict | None):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if not self._inject_fault():
+            self.handle_call(url.path, body if body is not None else params)
+
+    def _inject_fault(self) -> bool:
+        """Sleep the configured latency; maybe answer with a 500 or a 429 instead."""
+        behavior = self.server.behavior
+        with self.server.random_lock:
+            self.server.requests += 1
+            delay = behavior.latency + self.server.random.uniform(0, behavior.jitter)
+            roll = self.server.random.random()
+            if roll < behavior.ratelimit_rate:
+                self.server.injected_429s += 1
+            elif roll < behavior.ratelimit_rate + behavior.error_rate:
+                self.server.injected_errors += 1
+        if delay > 0:
+            time.sleep(delay)
+        if roll < behavior.ratelimit_rate:
+            self.send_json({"ok": False, "error": "ratelimited"}, status=429,
+                           headers={"Retry-After": str(behavior.retry_after)})
+            return True
+        if roll < behavior.ratelimit_rate + behavior.error_rate:
+            self.send_json({"ok": False, "error": "internal_error"}, status=500)
+            return True
+        return False
+
+    def handle_call(self, path: str, body: dict):
+        raise NotImplementedError
+
+    def send_json(self, obj: Any, status: int = 200, headers: dict[str, str] | None = None):
+        data = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_chunks(self, content_type: str, chunks: Iterable[bytes]):
+        """Chunked transfer encoding, flushing each chunk as it is produced."""
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for chunk in chunks:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled the generation and closed the stream
+            self.close_connection = True
+
+
+class FakeServerBase:
+    """Starts a handler class on a free local port in a background thread."""
+
+    handler: type[_Handler] = _Handler
+
+    def __init__(self, behavior: Behavior | None = None, seed: int | None = None):
+        self.behavior = behavior or Behavior()
+        self.httpd = _FakeServer(self.handler, self.behavior, seed)
+        self.httpd.fake = self
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeServerBase":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "requests": self.httpd.requests,
+            "injected_errors": self.httpd.injected_errors,
+            "injected_429s": self.httpd.injected_429s,
+        }
+
+
+# ---------------------------------------------------------------- Slack
+
+
+class _SlackHandler(_Handler):
+    def handle_call(self, path: str, body: dict):
+        method = path.rsplit("/", 1)[-1]
+        retry_after = self.server.fake.throttle(method, self.headers.get("Authorization", ""))
+        if retry_after:
+            self.send_json({"ok": False, "error": "ratelimited"}, status=429,
+                           headers={"Retry-After": str(retry_after)})
+            return
+        self.send_json(self.server.fake.call(method, body))
+
+
+class FakeSlack(FakeServerBase):
+    """
+    Slack Web API at `<url>/api/<method>`. Timestamps are time.monotonic().
+
+    Args:
+        rate_limits: Requests per minute per method, enforced per token like
+            Slack does (bursts up to one minute's worth); methods not listed
+            are unlimited.
+    """
+
+    handler = _SlackHandler
+
+    def __init__(self, behavior: Behavior | None = None, seed: int | None = None,
+                 rate_limits: dict[str, int] | None = None):
+        super().__init__(behavior, seed)
+        self.rate_limits = rate_limits or {}
+        self._buckets: dict[tuple[str, str], tuple[float, float]] = {}  # -> (tokens, updated)
+        self.throttled = 0
+        self._cond = threading.Condition()
+        self._ids = itertools.count(1)
+        self.calls: dict[str, int] = {}
+        self.view_by_trigger: dict[str, str] = {}
+        self.opened: dict[str, float] = {}
+        self.first_update: dict[str, float] = {}
+        self.final_update: dict[str, float] = {}
+        self.final_view: dict[str, dict] = {}
+        self.posted: list[tuple[float, str, str]] = []  # (time, channel, text)
+        self.socket_url = ""  # returned by apps.connections.open
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.url}/api"
+
+    def throttle(self, method: str, auth: str) -> int:
+        """Take one request from the (method, token) budget; Retry-After seconds if exhausted, else 0."""
+        per_minute = self.rate_limits.get(method)
+        if not per_minute:
+            return 0
+        now = time.monotonic()
+        rate = per_minute / 60.0
+        with self._cond:
+            tokens, updated = self._buckets.get((method, auth), (float(per_minute), now))
+            tokens = min(float(per_minute), tokens + (now - updated) * rate)
+            if tokens < 1:
+                self._buckets[(method, auth)] = (tokens, now)
+                self.throttled += 1
+                return max(1, math.ceil((1 - tokens) / rate))
+            self._buckets[(method, auth)] = (tokens - 1, now)
+            return 0
+
+    def stats(self) -> dict[str, int]:
+        return {**super().stats(), "throttled": self.throttled}
+
+    def call(self, method: str, body: dict) -> dict:
+        now = time.monotonic()
+        with self._cond:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            if method == "views.open":
+                view_id = f"V{next(self._ids):06d}"
+                self.view_by_trigger[body.get("trigger_id", "")] = view_id
+                self.opened[view_id] = now
+                result = {"ok": True, "view": {"id": view_id, "hash": "h0"}}
+            elif method == "views.update":
+                view_id = body.get("view_id", "")
+                view = body.get("view", {})
+                self.first_update.setdefault(view_id, now)
+                if "submit" in view:
+                    self.final_update[view_id] = now
+                    self.final_view[view_id] = view
+                result = {"ok": True, "view": {"id": view_id, "hash": f"h{next(self._ids)}"}}
+            elif method == "chat.postMessage":
+                self.posted.append((now, body.get("channel", ""), body.get("text", "")))
+                result = {"ok": True, "channel": body.get("channel"), "ts": f"{time.time():.6f}"}
+            elif method == "apps.connections.open":
+                result = {"ok": True, "url": self.socket_url} if self.socket_url else {
+                    "ok": False, "error": "invalid_auth"}
+            elif method == "conversations.history":
+                result = {"ok": True, "messages": [], "has_more": False}
+            else:
+                result = {"ok": True}
+            self._cond.notify_all()
+        return result
+
+    def wait_for(self, predicate: Callable[[], Any], timeout: float) -> Any:
+        """Block until `predicate()` (called under the lock) is truthy; return it or None."""
+        with self._cond:
+            return self._cond.wait_for(predicate, timeout=timeout) or None
+
+    def wait_final_view(self, trigger_id: str, timeout: float) -> str | None:
+        """view_id once the editable (final) view for `trigger_id` was pushed."""
+        def ready():
+            view_id = self.view_by_trigger.get(trigger_id)
+            return view_id if view_id in self.final_update else None
+        return self.wait_for(ready, timeout)
+
+    def wait_posted(self, marker: str, timeout: float) -> float | None:
+        """Time at which a message containing `marker` was posted."""
+        return self.wait_for(
+            lambda: next((t for t, _, text in self.posted if marker in text), None), timeout
+        )
+
+
+# ---------------------------------------------------------------- Socket Mode
+
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_OP_TEXT, _OP_CLOSE, _OP_PING, _OP_PONG = 0x1, 0x8, 0x9, 0xA
+
+
+class _WebSocket:
+    """Server side of one WebSocket connection (unfragmented frames only)."""
+
+    def __init__(self, handler: BaseHTTPRequestHandler):
+        self.rfile = handler.rfile
+        self.sock = handler.connection
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def send(self, payload: bytes, opcode: int = _OP_TEXT):
+        n = len(payload)
+        if n < 126:
+            header = struct.pack("!BB", 0x80 | opcode, n)
+        elif n < 1 << 16:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, n)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+        with self.lock:
+            if not self.closed:
+                self.sock.sendall(header + payload)
+
+    def recv(self) -> tuple[int, bytes] | None:
+        """Next (opcode, payload), or None once the client is gone."""
+        head = self.rfile.read(2)
+        if len(head) < 2:
+            return None
+        opcode, n = head[0] & 0x0F, head[1] & 0x7F
+        if n == 126:
+            n = struct.unpack("!H", self.rfile.read(2))[0]
+        elif n == 127:
+            n = struct.unpack("!Q", self.rfile.read(8))[0]
+        mask = self.rfile.read(4) if head[1] & 0x80 else b"\0\0\0\0"
+        data = self.rfile.read(n)
+        return opcode, bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+
+    def close(self):
+        try:
+            self.send(b"", _OP_CLOSE)
+        except OSError:
+            pass
+        with self.lock:
+            self.closed = True
+
+
+class _SocketModeHandler(_Handler):
+    def do_GET(self):
+        key = self.headers.get("Sec-WebSocket-Key")
+        if (self.headers.get("Upgrade") or "").lower() != "websocket" or not key:
+            self.send_json({"error": "not a websocket request"}, status=400)
+            return
+        accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+        self.send_response(101, "Switching Protocols")
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+        self.server.fake.serve(_WebSocket(self))
+
+
+class FakeSocketMode(FakeServerBase):
+    """
+    Socket Mode WebSocket endpoint. `send()` delivers an envelope to one of
+    the open connections (round robin) and `wait_ack()` returns the app's
+    ack; `drop_connections()` / `request_disconnect()` exercise reconnects.
+    Behavior latency delays each envelope.
+    """
+
+    handler = _SocketModeHandler
+
+    def __init__(self, behavior: Behavior | None = None, seed: int | None = None):
+        super().__init__(behavior, seed)
+        self._cond = threading.Condition()
+        self._ids = itertools.count(1)
+        self._next = 0
+        self.sockets: list[_WebSocket] = []
+        self.connects = 0
+        self.acks: dict[str, tuple[float, dict | None]] = {}  # envelope_id -> (time, payload)
+
+    @property
+    def ws_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"ws://{host}:{port}/link/?ticket=fake"
+
+    def serve(self, ws: _WebSocket):
+        with self._cond:
+            self.sockets.append(ws)
+            self.connects += 1
+            self._cond.notify_all()
+        try:
+            ws.send(json.dumps({
+                "type": "hello", "num_connections": len(self.sockets),
+                "connection_info": {"app_id": "AFAKE"}, "debug_info": {"host": "fake"},
+            }).encode())
+            while True:
+                frame = ws.recv()
+                if frame is None:
+                    break
+                opcode, data = frame
+                if opcode == _OP_PING:
+                    ws.send(data, _OP_PONG)
+                elif opcode == _OP_CLOSE:
+                    ws.close()
+                    break
+                elif opcode == _OP_TEXT:
+                    self._on_ack(json.loads(data))
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self._cond:
+                if ws in self.sockets:
+                    self.sockets.remove(ws)
+                self._cond.notify_all()
+
+    def _on_ack(self, message: dict):
+        with self._cond:
+            self.acks[message.get("envelope_id", "")] = (time.monotonic(), message.get("payload"))
+            self._cond.notify_all()
+
+    def send(self, envelope_type: str, payload: dict) -> str:
+        """Deliver an envelope ("slash_commands", "interactive", ...); returns its id."""
+        behavior = self.behavior
+        with self.httpd.random_lock:
+            delay = behavior.latency + self.httpd.random.uniform(0, behavior.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        envelope_id = f"E{next(self._ids):08d}"
+        message = json.dumps({
+            "envelope_id": envelope_id, "type": envelope_type, "payload": payload,
+            "accepts_response_payload": envelope_type == "interactive", "retry_attempt": 0,
+            "retry_reason": "",
+        }).encode()
+        while True:
+            ws = self.wait_for(lambda: self._pick(), timeout=10)
+            if ws is None:
+                raise ConnectionError("no Socket Mode connection")
+            try:
+                ws.send(message)
+                return envelope_id
+            except OSError:
+                with self._cond:
+                    if ws in self.sockets:
+                        self.sockets.remove(ws)
+
+    def _pick(self) -> _WebSocket | None:
+        if not self.sockets:
+            return None
+        self._next += 1
+        return self.sockets[self._next % len(self.sockets)]
+
+    def wait_for(self, predicate: Callable[[], Any], timeout: float) -> Any:
+        with self._cond:
+            return self._cond.wait_for(predicate, timeout=timeout) or None
+
+    def wait_ack(self, envelope_id: str, timeout: float) -> tuple[float, dict | None] | None:
+        """(time, response payload) of the envelope's ack."""
+        return self.wait_for(lambda: self.acks.get(envelope_id), timeout)
+
+    def wait_connections(self, count: int, timeout: float) -> bool:
+        return bool(self.wait_for(lambda: len(self.sockets) >= count, timeout))
+
+    def drop_connections(self):
+        """Close every connection from the server side, as a network failure would."""
+        with self._cond:
+            sockets = list(self.sockets)
+        for ws in sockets:
+            ws.close()
+            try:
+                ws.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def request_disconnect(self, reason: str = "refresh_requested"):
+        """Ask every client to reconnect, as Slack does before recycling a host."""
+        with self._cond:
+            sockets = list(self.sockets)
+        for ws in sockets:
+            ws.send(json.dumps({"type": "disconnect", "reason": reason}).encode())
+
+
+# ---------------------------------------------------------------- LLMs
+
+
+_TONES = re.compile(r"for each of these tones: ([^.]*)\.")
+
+
+def _answer(prompt: str, response_format: dict | None = None) -> tuple[str, bool]:
+    """
+    Deterministic answer text for a prompt, and whether it is a JSON variants answer.
+    """
+    tones = None
+    if response_format:
+        schema = response_format.get("json_schema", {}).get("schema", response_format)
+        tones = list(schema.get("properties", {})) or None
+    if tones is None:
+        match = _TONES.search(prompt)
+        if match:
+            tones = [t.strip() for t in match.group(1).split(",") if t.strip()]
+    last_line = prompt.strip().rsplit("\n", 1)[-1]
+    if tones:
+        return json.dumps({tone: f"({tone}) {last_line}" for tone in tones}), True
+    return f"Rephrased: {last_line}", False
+
+
+def _tokens(text: str, count: int) -> list[str]:
+    """Split `text` into about `count` pieces, padding with filler words."""
+    words = text.split(" ")
+    while len(words) < count:
+        words.append("lorem")
+    return [w if i == 0 else " " + w for i, w in enumerate(words)]
+
+
+class _XAIHandler(_Handler):
+    def handle_call(self, path: str, body: dict):
+        if not path.endswith("/chat/completions"):
+            self.send_json({"error": "not found"}, status=404)
+            return
+        behavior = self.server.behavior
+        prompt = (body.get("messages") or [{}])[-1].get("content", "")
+        text, is_json = _answer(prompt, body.get("response_format"))
+        limit = body.get("max_tokens") or behavior.tokens
+        pieces = [text] if is_json else _tokens(text, behavior.tokens)[:limit]
+
+        if not body.get("stream"):
+            time.sleep(behavior.token_delay * len(pieces))
+            self.send_json({
+                "id": "fake", "model": body.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(pieces)},
+                             "finish_reason": "stop"}],
+                "usage": {"completion_tokens": len(pieces)},
+            })
+            return
+
+        def events():
+            for i, piece in enumerate(pieces):
+                if i:
+                    time.sleep(behavior.token_delay)
+                chunk = {"choices": [{"index": 0, "delta": {"content": piece}}]}
+                yield f"data: {json.dumps(chunk)}\n\n".encode()
+            done = {"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                    "usage": {"completion_tokens": len(pieces)}}
+            yield f"data: {json.dumps(done)}\n\ndata: [DONE]\n\n".encode()
+
+        self.send_chunks("text/event-stream", events())
+
+
+class FakeXAI(FakeServerBase):
+    """xAI chat/completions at `<url>/v1/chat/completions`."""
+
+    handler = _XAIHandler
+
+    @property
+    def chat_url(self) -> str:
+        return f"{self.url}/v1/chat/completions"
+
+
+class _OllamaHandler(_Handler):
+    def handle_call(self, path: str, body: dict):
+        fake = self.server.fake
+        if path == "/api/ps":
+            self.send_json({"models": [{"name": m, "expires_at": None} for m in sorted(fake.loaded)]})
+            return
+        if path != "/api/generate":
+            self.send_json({"error": "not found"}, status=404)
+            return
+
+        behavior = self.server.behavior
+        fake.loaded.add(body.get("model", ""))
+        if not body.get("prompt"):
+            # Preload: load the model and return right away
+            self.send_json({"model": body.get("model"), "response": "", "done": True})
+            return
+
+        schema = body.get("format") if isinstance(body.get("format"), dict) else None
+        text, is_json = _answer(body["prompt"], schema)
+        limit = (body.get("options") or {}).get("num_predict") or behavior.tokens
+        pieces = [text] if is_json else _tokens(text, behavior.tokens)[:limit]
+        stats = {"eval_count": len(pieces), "eval_duration": int(behavior.token_delay * len(pieces) * 1e9)}
+
+        if not body.get("stream", True):
+            time.sleep(behavior.token_delay * len(pieces))
+            self.send_json({"model": body.get("model"), "response": "".join(pieces), "done": True,
+                            "done_reason": "stop", **stats})
+            return
+
+        def lines():
+            for i, piece in enumerate(pieces):
+                if i:
+                    time.sleep(behavior.token_delay)
+                yield (json.dumps({"response": piece, "done": False}) + "\n").encode()
+            yield (json.dumps({"response": "", "done": True, "done_reason": "stop", **stats}) + "\n").encode()
+
+        self.send_chunks("application/x-ndjson", lines())
+
+
+class FakeOllama(FakeServerBase):
+    """Ollama /api/generate (stream and not) and /api/ps."""
+
+    handler = _OllamaHandler
+
+    def __init__(self, behavior: Behavior | None = None, seed: int | None = None):
+        super().__init__(behavior, seed)
+        self.loaded: set[str] = set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run fake Slack, xAI and Ollama servers.")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--ratelimit-rate", type=float, default=0.0)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    def behavior(**extra):
+        return Behavior(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                        ratelimit_rate=args.ratelimit_rate, **extra)
+
+    slack = FakeSlack(behavior()).start()
+    xai = FakeXAI(behavior(token_delay=args.token_delay)).start()
+    ollama = FakeOllama(behavior(token_delay=args.token_delay)).start()
+    socket_mode = FakeSocketMode(behavior()).start()
+    slack.socket_url = socket_mode.ws_url
+    print(f"Slack:  {slack.api_url}\nxAI:    {xai.chat_url}\nOllama: {ollama.url}\n"
+          f"Socket: {socket_mode.ws_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()